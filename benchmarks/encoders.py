@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark JSON encoder backends.
+
+Encodes representative CRUD, error, and HAL link payloads using `make_response`
+under each installed backend.
+
+Usage:
+
+    python benchmarks/encoders.py
+
+"""
+from timeit import repeat
+from uuid import uuid4
+
+from microcosm.api import create_object_graph
+
+from microcosm_flask.conventions.encoding import make_response
+from microcosm_flask.encoders import iter_json_backends
+
+
+def make_item(index):
+    item_id = str(uuid4())
+    return {
+        "id": item_id,
+        "firstName": "Alice",
+        "lastName": "Smith-{}".format(index),
+        "email": None,
+        "age": index,
+        "_links": {
+            "self": {
+                "href": "http://localhost/api/person/{}".format(item_id),
+            },
+        },
+    }
+
+
+PAYLOADS = {
+    "crud": {
+        "count": 1000,
+        "offset": 0,
+        "limit": 100,
+        "items": [make_item(index) for index in range(100)],
+        "_links": {
+            "self": {"href": "http://localhost/api/person?offset=0&limit=100"},
+            "next": {"href": "http://localhost/api/person?offset=100&limit=100"},
+        },
+    },
+    "error": {
+        "code": 422,
+        "message": "Validation error",
+        "retryable": False,
+        "context": {
+            "errors": [{
+                "message": "Could not validate field: firstName",
+                "field": "firstName",
+                "reasons": ["Missing data for required field."],
+            }],
+        },
+    },
+    "hal": {
+        "_links": {
+            "self": {"href": "http://localhost/api/?offset=0&limit=20"},
+            "search": [
+                {
+                    "href": "http://localhost/api/resource{}?offset=0&limit=20".format(index),
+                    "type": "resource{}".format(index),
+                }
+                for index in range(50)
+            ],
+        },
+    },
+}
+
+
+def make_graph(json_encoder):
+    def loader(metadata):
+        return dict(
+            flask=dict(
+                json_encoder=json_encoder,
+            ),
+        )
+
+    return create_object_graph(name="benchmark", testing=False, loader=loader)
+
+
+def main():
+    number = 500
+    for json_encoder in iter_json_backends():
+        graph = make_graph(json_encoder)
+        for name in sorted(PAYLOADS):
+            for headers in [{}, {"X-Response-Skip-Null": "true"}]:
+                with graph.flask.test_request_context(headers=headers):
+                    best = min(repeat(lambda: make_response(PAYLOADS[name]), number=number, repeat=5))
+                print("{:>10} {:>6} {:>10}: {:8.1f} us/response".format(  # noqa
+                    json_encoder,
+                    name,
+                    "skip-null" if headers else "",
+                    best / number * 1000000,
+                ))
+
+
+if __name__ == "__main__":
+    main()
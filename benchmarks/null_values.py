@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark omitting null values from search responses.
+
+Compares dumping a 1000-item `PaginatedList` and then removing null values (the
+`X-Response-Skip-Null` header) against a compiled schema that omits null values as it dumps.
+
+Reports time per dump along with the blocks held by the result and the peak memory allocated
+while computing it (via `tracemalloc`).
+
+Usage:
+
+    python benchmarks/null_values.py
+
+"""
+from timeit import repeat
+from tracemalloc import get_traced_memory, start, stop, take_snapshot
+from uuid import uuid4
+
+from marshmallow import fields, Schema
+from microcosm.api import create_object_graph
+
+from microcosm_flask.conventions.encoding import remove_null_values
+from microcosm_flask.conventions.serialization import compile_schema
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+from microcosm_flask.paging import Page, PaginatedList, make_paginated_list_schema
+
+
+SIZE = 1000
+
+
+class Item(object):
+    def __init__(self, index):
+        self.id = uuid4()
+        self.name = "item-{}".format(index)
+        self.description = None
+        self.rank = index if index % 3 else None
+        self.enabled = index % 2 == 0
+        self.tags = ["foo", "bar"]
+
+
+class ItemSchema(Schema):
+    id = fields.UUID(required=True)
+    name = fields.String(required=True)
+    description = fields.String()
+    rank = fields.Integer()
+    enabled = fields.Boolean()
+    tags = fields.List(fields.String())
+
+
+def measure_allocations(func):
+    """
+    Measure the blocks held by the result of a function and the peak memory used computing it.
+
+    """
+    start()
+    before = take_snapshot()
+    current, _ = get_traced_memory()
+    result = func()
+    _, peak = get_traced_memory()
+    after = take_snapshot()
+    stop()
+    del result
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return blocks, peak - current
+
+
+def main():
+    graph = create_object_graph(name="benchmark", testing=True)
+    ns = Namespace(subject=Item)
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search():
+        pass
+
+    schema = make_paginated_list_schema(ns, ItemSchema())()
+    compiled_schema = compile_schema(schema)
+
+    targets = [
+        ("Schema.dump + remove", lambda: remove_null_values(schema.dump(paginated_list).data)),
+        ("compiled + remove", lambda: remove_null_values(compiled_schema.dump(paginated_list).data)),
+        ("compiled without nulls", lambda: compiled_schema.without_nulls.dump(paginated_list).data),
+    ]
+
+    with graph.flask.test_request_context():
+        items = [Item(index) for index in range(SIZE)]
+        paginated_list = PaginatedList(ns, Page(0, SIZE), items, SIZE)
+        number = 10
+
+        for name, target in targets:
+            best = min(repeat(target, number=number, repeat=5))
+            blocks, peak = measure_allocations(target)
+            print("{:>24}: {:8.3f} ms/dump {:8} blocks {:8.1f} KiB peak".format(  # noqa
+                name,
+                best / number * 1000,
+                blocks,
+                peak / 1024.0,
+            ))
+
+
+if __name__ == "__main__":
+    main()
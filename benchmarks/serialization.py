@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Benchmark compiled response schemas against `Schema.dump()`.
+
+Dumps `PaginatedList` payloads of varying sizes using a representative item schema.
+
+Usage:
+
+    python benchmarks/serialization.py
+
+"""
+from timeit import repeat
+from uuid import uuid4
+
+from marshmallow import fields, Schema
+from microcosm.api import create_object_graph
+
+from microcosm_flask.conventions.serialization import compile_schema
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+from microcosm_flask.paging import Page, PaginatedList, make_paginated_list_schema
+
+
+SIZES = [20, 100, 1000]
+
+
+class Item(object):
+    def __init__(self, index):
+        self.id = uuid4()
+        self.name = "item-{}".format(index)
+        self.description = None
+        self.rank = index
+        self.enabled = index % 2 == 0
+        self.tags = ["foo", "bar"]
+
+
+class ItemSchema(Schema):
+    id = fields.UUID(required=True)
+    name = fields.String(required=True)
+    description = fields.String()
+    rank = fields.Integer()
+    enabled = fields.Boolean()
+    tags = fields.List(fields.String())
+
+
+def main():
+    graph = create_object_graph(name="benchmark", testing=True)
+    ns = Namespace(subject=Item)
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search():
+        pass
+
+    schema = make_paginated_list_schema(ns, ItemSchema())()
+    compiled_schema = compile_schema(schema)
+
+    with graph.flask.test_request_context():
+        for size in SIZES:
+            items = [Item(index) for index in range(size)]
+            paginated_list = PaginatedList(ns, Page(0, size), items, size)
+            number = max(1, 10000 // size)
+
+            for name, target in [("Schema.dump", schema), ("compiled", compiled_schema)]:
+                best = min(repeat(lambda: target.dump(paginated_list), number=number, repeat=5))
+                print("{:>5} items {:>12}: {:8.3f} ms/dump".format(size, name, best / number * 1000))  # noqa
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Benchmark round-tripping sync dumps through each file format.
+
+Writes and then reads back 100k resources using YAML (with the pure Python and, if available,
+libyaml loader and dumper) and JSONL (uncompressed and compressed).
+
+Usage:
+
+    python benchmarks/sync_formats.py
+
+"""
+from os.path import getsize, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+import yaml
+
+from microcosm_flask.sync import formats
+
+
+COUNT = 100000
+
+
+def make_resources(count):
+    for index in range(count):
+        href = "http://localhost/api/foo/{}".format(index)
+        yield href, dict(
+            id=index,
+            name="foo-{}".format(index),
+            enabled=index % 2 == 0,
+            tags=["foo", "bar"],
+            _links=dict(
+                self=dict(href=href),
+                parent=dict(href="http://localhost/api/bar/{}".format(index // 10)),
+            ),
+        )
+
+
+def round_trip(path):
+    start_time = time()
+    formats.dump_path(make_resources(COUNT), path)
+    dump_time = time() - start_time
+
+    start_time = time()
+    count = sum(1 for _ in formats.load_path(path))
+    load_time = time() - start_time
+
+    assert count == COUNT
+    return dump_time, load_time
+
+
+def main():
+    directory = mkdtemp()
+    try:
+        cases = [
+            ("resources.jsonl", True),
+            ("resources.jsonl.gz", True),
+            ("resources.yaml", True),
+        ]
+        if formats.ZstdCompressor is not None:
+            cases.insert(2, ("resources.jsonl.zst", True))
+        if formats.SafeLoader is not yaml.SafeLoader:
+            cases.append(("resources.yaml", False))
+
+        for name, enable_libyaml in cases:
+            if not enable_libyaml:
+                formats.SafeDumper, formats.SafeLoader = yaml.SafeDumper, yaml.SafeLoader
+            path = join(directory, name)
+            dump_time, load_time = round_trip(path)
+            label = name if enable_libyaml else "{} (pure python)".format(name)
+            print("{:>32}: dump {:7.2f}s load {:7.2f}s size {:6.1f} MB".format(  # noqa
+                label,
+                dump_time,
+                load_time,
+                getsize(path) / 1e6,
+            ))
+    finally:
+        rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
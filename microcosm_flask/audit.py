@@ -4,23 +4,31 @@ Audit log support for Flask routes.
 """
 from collections import namedtuple
 from functools import wraps
-from logging import getLogger
 from json import loads
-from traceback import format_exc
+from random import random
+from sys import exc_info
 
 from flask import current_app, g, request
 from microcosm.api import defaults
+from werkzeug.exceptions import InternalServerError
+
+from microcosm_flask.audit_sink import AuditSink
+from microcosm_flask.conventions.encoding import RESPONSE_DATA
 from microcosm_flask.errors import (
     extract_context,
     extract_error_message,
     extract_status_code,
 )
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.timing import TIMINGS
 from microcosm_logging.timing import elapsed_time
 
 
 AuditOptions = namedtuple("AuditOptions", [
     "include_request_body",
     "include_response_body",
+    "sink",
+    "sampler",
 ])
 
 
@@ -44,6 +52,45 @@ def should_skip_logging(func):
     return getattr(func, SKIP_LOGGING, False)
 
 
+class AuditSampler(object):
+    """
+    Choose which successful requests to log; unsuccessful requests are always logged.
+
+    Sample rates may be configured by endpoint (e.g. "foo.search.v1"), by namespace subject
+    (e.g. "foo"), or by operation name (e.g. "search"); the most specific match wins.
+
+    """
+    def __init__(self, sample_rate=1.0, sample_rates=None):
+        self.sample_rate = float(sample_rate)
+        self.sample_rates = dict(sample_rates or {})
+        self.rates = {}
+
+    def rate_for(self, endpoint):
+        """
+        Resolve (and cache) the sample rate for an endpoint.
+
+        """
+        try:
+            return self.rates[endpoint]
+        except KeyError:
+            pass
+
+        try:
+            operation, ns = Namespace.parse_endpoint(endpoint or "")
+            keys = [endpoint, ns.subject_name, operation.value.name]
+        except (IndexError, ValueError, InternalServerError):
+            # endpoint follows a different convention
+            keys = [endpoint]
+
+        rates = [self.sample_rates[key] for key in keys if key in self.sample_rates]
+        rate = float(rates[0]) if rates else self.sample_rate
+        return self.rates.setdefault(endpoint, rate)
+
+    def sample(self, endpoint):
+        rate = self.rate_for(endpoint)
+        return rate >= 1.0 or random() < rate
+
+
 def audit(func):
     """
     Record a Flask route function in the audit log.
@@ -56,6 +103,8 @@ def audit(func):
         options = AuditOptions(
             include_request_body=True,
             include_response_body=True,
+            sink=AuditSink(),
+            sampler=AuditSampler(),
         )
         return _audit_request(options, func, None, *args, **kwargs)
 
@@ -66,10 +115,15 @@ def _audit_request(options, func, request_context, *args, **kwargs):  # noqa: C9
     """
     Run a request function under audit.
 
-    """
-    logger = getLogger("audit")
+    Stack traces are formatted by the sink (which may defer the work to another thread).
 
+    """
     response = None
+    error_info = None
+
+    # decide up front so that unsampled requests skip the work of capturing bodies;
+    # errors are always logged
+    sampled = options.sampler.sample(request.endpoint)
 
     # always include these fields
     audit_dict = dict(
@@ -78,13 +132,9 @@ def _audit_request(options, func, request_context, *args, **kwargs):  # noqa: C9
         method=request.method,
     )
 
-    # include request body on debug (if any)
-    if all((
-        current_app.debug,
-        options.include_request_body,
-        request.get_json(force=True, silent=True),
-    )):
-        request_body = request.get_json(force=True)
+    # include request body on debug (if any); Flask caches the parsed body for `load_request_data`
+    if current_app.debug and options.include_request_body:
+        request_body = request.get_json(force=True, silent=True)
     else:
         request_body = None
 
@@ -105,9 +155,12 @@ def _audit_request(options, func, request_context, *args, **kwargs):  # noqa: C9
             success=success,
             message=extract_error_message(error)[:2048],
             context=extract_context(error),
-            stack_trace=None if success else format_exc(limit=10),
+            stack_trace=None,
             status_code=status_code,
         )
+        if not success:
+            sampled = True
+            error_info = exc_info()
         raise
     else:
         body, status_code = parse_response(response)
@@ -117,41 +170,60 @@ def _audit_request(options, func, request_context, *args, **kwargs):  # noqa: C9
             status_code=status_code,
         )
 
+        if isinstance(status_code, int) and status_code >= 400:
+            sampled = True
+
         # include response body on debug (if any)
         if all((
+                sampled,
                 current_app.debug,
                 options.include_response_body,
                 body,
         )):
-            try:
-                response_body = loads(body)
-            except (TypeError, ValueError):
-                # not json
-                audit_dict["response_body"] = body
+            # prefer the data dumped by `dump_response_data` to decoding the response
+            response_body = getattr(request, RESPONSE_DATA, None)
+            if response_body is None:
+                try:
+                    response_body = loads(body)
+                except (TypeError, ValueError):
+                    # not json
+                    audit_dict["response_body"] = body
 
         return response
     finally:
         # determine whether to show/hide body based on the g values set during func
         if not g.get("hide_body"):
             if request_body:
-                for field in g.get("hide_request_fields", []):
-                    try:
-                        del request_body[field]
-                    except KeyError:
-                        pass
-                audit_dict["request_body"] = request_body
+                audit_dict["request_body"] = hide_fields(request_body, g.get("hide_request_fields"))
 
             if response_body:
-                for field in g.get("hide_response_fields", []):
-                    try:
-                        del response_body[field]
-                    except KeyError:
-                        pass
-                audit_dict["response_body"] = response_body
+                audit_dict["response_body"] = hide_fields(response_body, g.get("hide_response_fields"))
+
+        # include phase timings recorded by conventions (if any)
+        timings = g.get(TIMINGS)
+        if timings:
+            audit_dict["timings"] = dict(timings)
 
         # always log at INFO; a raised exception can be an error or expected behavior (e.g. 404)
-        if not should_skip_logging(func):
-            logger.info(audit_dict)
+        if sampled and not should_skip_logging(func):
+            options.sink.emit(audit_dict, error_info)
+
+
+def hide_fields(data, fields):
+    """
+    Remove hidden fields from request or response data.
+
+    The data may be shared (e.g. with `load_request_data`), so fields are removed from a copy.
+
+    """
+    if not fields or not isinstance(data, dict):
+        return data
+
+    return {
+        key: value
+        for key, value in data.items()
+        if key not in fields
+    }
 
 
 def parse_response(response):
@@ -160,11 +232,14 @@ def parse_response(response):
 
     The returned value from a Flask view could be:
         * a tuple of (response, status) or (response, status, headers)
-        * a Response object
+        * a Response object (possibly streamed, in which case the body is omitted)
         * a string
     """
     if isinstance(response, tuple) and len(response) > 1:
         return response[0], response[1]
+    if getattr(response, "is_streamed", False):
+        # do not consume (and buffer) streamed content
+        return None, response.status_code
     try:
         return response.data, response.status_code
     except AttributeError:
@@ -174,6 +249,8 @@ def parse_response(response):
 @defaults(
     include_request_body=True,
     include_response_body=True,
+    sample_rate=1.0,
+    sample_rates=dict(),
 )
 def configure_audit_decorator(graph):
     """
@@ -184,9 +261,23 @@ def configure_audit_decorator(graph):
         @graph.audit
         def login(username, password):
             ...
+
+    Successful requests may be sampled; for example, to log 1% of successful searches:
+
+        audit=dict(
+            sample_rates=dict(
+                search=0.01,
+            ),
+        )
+
     """
     include_request_body = graph.config.audit.include_request_body
     include_response_body = graph.config.audit.include_response_body
+    sink = graph.audit_sink
+    sampler = AuditSampler(
+        sample_rate=graph.config.audit.sample_rate,
+        sample_rates=graph.config.audit.sample_rates,
+    )
 
     def _audit(func):
         @wraps(func)
@@ -194,6 +285,8 @@ def configure_audit_decorator(graph):
             options = AuditOptions(
                 include_request_body=include_request_body,
                 include_response_body=include_response_body,
+                sink=sink,
+                sampler=sampler,
             )
             return _audit_request(options, func, graph.request_context,  *args, **kwargs)
 
@@ -0,0 +1,261 @@
+"""
+Audit log sinks.
+
+By default, audit records are formatted and logged on the request thread. The asynchronous
+sink instead puts a compact record on a bounded in-memory queue; a background worker formats
+the records (including stack traces) and logs them in batches.
+
+When the queue is full, records are either dropped (and counted) or the request thread blocks
+until there is room, depending on the configured overflow policy. Queued records are flushed
+on shutdown, after which records are logged synchronously; the number of dropped records is
+logged on shutdown.
+
+Formatting stack traces may be rate limited (by a token bucket) so that a burst of errors
+cannot dominate CPU usage; records over the limit omit their stack trace.
+
+"""
+from atexit import register
+from logging import getLogger
+from threading import Condition, Lock, Thread
+from traceback import format_exception
+
+from microcosm.api import defaults
+from six.moves.queue import Empty, Full, Queue
+
+from microcosm_flask.timing import clock as monotonic_clock
+
+
+OVERFLOW_POLICIES = ("block", "drop")
+
+# marks the end of the queue
+STOP = object()
+
+
+def format_record(audit_dict, exc_info=None):
+    """
+    Format an audit record, including the stack trace (if any).
+
+    """
+    if exc_info is not None:
+        audit_dict["stack_trace"] = "".join(format_exception(*exc_info, limit=10))
+    return audit_dict
+
+
+class TokenBucket(object):
+    """
+    A token bucket rate limiter.
+
+    Tokens accumulate at a fixed rate up to a maximum burst; each permitted event consumes one.
+    The number of rejected events is counted.
+
+    """
+    def __init__(self, rate, burst, clock=monotonic_clock):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated_at = clock()
+        self.rejected = 0
+        self.lock = Lock()
+
+    def consume(self):
+        """
+        Consume a token, if available.
+
+        :returns: whether the event is permitted
+
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                self.rejected += 1
+                return False
+            self.tokens -= 1
+            return True
+
+
+class AuditSink(object):
+    """
+    Log audit records synchronously.
+
+    """
+    def __init__(self, logger=None, stack_traces=None):
+        """
+        :param logger: the audit logger
+        :param stack_traces: an optional `TokenBucket` limiting the rate of stack trace formatting
+
+        """
+        self.logger = logger or getLogger("audit")
+        self.stack_traces = stack_traces
+        self.dropped = 0
+
+    @property
+    def suppressed_stack_traces(self):
+        """
+        The number of stack traces omitted because of the rate limit.
+
+        """
+        return 0 if self.stack_traces is None else self.stack_traces.rejected
+
+    def limit_stack_trace(self, exc_info):
+        """
+        Discard the exception info (and so the stack trace) if over the rate limit.
+
+        """
+        if exc_info is None or self.stack_traces is None or self.stack_traces.consume():
+            return exc_info
+        return None
+
+    def emit(self, audit_dict, exc_info=None):
+        """
+        Log an audit record.
+
+        :param audit_dict: the audit record
+        :param exc_info: an optional `sys.exc_info()` tuple to format as the stack trace
+
+        """
+        self.logger.info(format_record(audit_dict, self.limit_stack_trace(exc_info)))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncAuditSink(AuditSink):
+    """
+    Log audit records in batches from a background worker.
+
+    """
+    def __init__(self, queue_size, batch_size, overflow_policy="drop", logger=None, stack_traces=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError("Unsupported overflow policy: {}".format(overflow_policy))
+
+        super(AsyncAuditSink, self).__init__(logger, stack_traces)
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.queue = Queue(maxsize=queue_size)
+        self.lock = Lock()
+        # signalled when no emits are queueing records
+        self.idle = Condition(self.lock)
+        self.producers = 0
+        self.closed = False
+
+        self.worker = Thread(target=self.run, name="audit-sink")
+        self.worker.daemon = True
+        self.worker.start()
+
+        register(self.close)
+
+    def emit(self, audit_dict, exc_info=None):
+        # apply the limit before queueing so that discarded tracebacks are released early
+        exc_info = self.limit_stack_trace(exc_info)
+
+        # register as a producer so that close waits for this record before stopping the worker
+        with self.lock:
+            closed = self.closed
+            if not closed:
+                self.producers += 1
+
+        if closed:
+            self.logger.info(format_record(audit_dict, exc_info))
+            return
+
+        try:
+            if self.overflow_policy == "block":
+                self.queue.put((audit_dict, exc_info))
+            else:
+                self.queue.put_nowait((audit_dict, exc_info))
+        except Full:
+            with self.lock:
+                self.dropped += 1
+        finally:
+            with self.lock:
+                self.producers -= 1
+                if not self.producers:
+                    self.idle.notify_all()
+
+    def flush(self):
+        """
+        Wait until all queued records have been logged.
+
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Log any queued records and stop the worker.
+
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            # blocked producers make progress as the worker drains the queue
+            while self.producers:
+                self.idle.wait()
+        self.queue.put(STOP)
+        self.worker.join()
+
+        if self.dropped:
+            self.logger.warning("Dropped {} audit records on queue overflow".format(self.dropped))
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def run(self):
+        running = True
+        while running:
+            batch = self.next_batch()
+            for record in batch:
+                if record is STOP:
+                    running = False
+                    continue
+                try:
+                    self.logger.info(format_record(*record))
+                except Exception:
+                    self.logger.warning("Unable to log audit record", exc_info=True)
+            for _ in batch:
+                self.queue.task_done()
+
+
+@defaults(
+    batch_size=100,
+    enable_async=False,
+    overflow_policy="drop",
+    queue_size=10000,
+    stack_trace_burst=10,
+    stack_trace_rate=None,
+)
+def configure_audit_sink(graph):
+    """
+    Configure the sink for audit records.
+
+    Stack traces are rate limited if `stack_trace_rate` (per second) is set.
+
+    """
+    config = graph.config.audit_sink
+
+    if config.stack_trace_rate is None:
+        stack_traces = None
+    else:
+        stack_traces = TokenBucket(rate=config.stack_trace_rate, burst=config.stack_trace_burst)
+
+    if not config.enable_async:
+        return AuditSink(stack_traces=stack_traces)
+
+    return AsyncAuditSink(
+        queue_size=config.queue_size,
+        batch_size=config.batch_size,
+        overflow_policy=config.overflow_policy,
+        stack_traces=stack_traces,
+    )
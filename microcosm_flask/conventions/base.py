@@ -2,6 +2,7 @@
 Convention base class.
 
 """
+from microcosm_flask.conventions.serialization import compile_schema, is_compilable, SkipNoneSchema
 from microcosm_flask.operations import Operation
 
 
@@ -57,6 +58,21 @@ class Convention(object):
             else:
                 configure_func(ns, self._make_definition(definition))
 
+    def compile_schema(self, schema):
+        """
+        Resolve the object used to dump responses for a schema.
+
+        Response schemas are compiled at registration time if enabled via the
+        route decorator's `compile_schemas` configuration; otherwise, they are dumped by
+        marshmallow, omitting null values (if requested) as they are dumped where possible.
+
+        """
+        if schema is None:
+            return schema
+        if not self.graph.config.route.compile_schemas:
+            return SkipNoneSchema(schema) if is_compilable(schema) else schema
+        return compile_schema(schema)
+
     def _find_func(self, operation):
         """
         Find the function to use to configure the given operation.
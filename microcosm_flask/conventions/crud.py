@@ -2,6 +2,8 @@
 Conventions for canonical CRUD endpoints.
 
 """
+from functools import partial
+
 from inflection import pluralize
 
 from microcosm_flask.conventions.base import Convention
@@ -11,11 +13,21 @@ from microcosm_flask.conventions.encoding import (
     load_request_data,
     merge_data,
     require_response_data,
+    stream_response_data,
 )
 from microcosm_flask.conventions.registry import qs, request, response
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.operations import Operation
-from microcosm_flask.paging import Page, PaginatedList, make_paginated_list_schema
+from microcosm_flask.paging import (
+    CursorPage,
+    CursorPaginatedList,
+    is_cursor_page_schema,
+    make_cursor_paginated_list_schema,
+    make_paginated_list_schema,
+    Page,
+    PaginatedList,
+)
+from microcosm_flask.timing import timing
 
 
 class CRUDConvention(Convention):
@@ -35,19 +47,45 @@ class CRUDConvention(Convention):
 
         The definition's request_schema will be used to process query string arguments.
 
+        If the request_schema is an `OptionalCountPageSchema`, the count may be skipped (None)
+        or estimated; the search function should then return up to `limit + 1` items.
+
+        If streaming is enabled (via `route.enable_streaming`), items may be any iterable
+        (e.g. a generator); items are then dumped and written to the response one at a time.
+
+        If the request_schema is a `CursorPageSchema`, the search is cursor paginated: the
+        search function receives a `cursor` (the keyset of the previous page's last item,
+        if any) instead of an `offset`, should return up to `limit + 1` items (the extra item
+        signals a next page), and may return a count of None.
+
         :param ns: the namespace
         :param definition: the endpoint definition
 
         """
-        paginated_list_schema = make_paginated_list_schema(ns, definition.response_schema)()
+        if is_cursor_page_schema(definition.request_schema):
+            paginated_list_schema = make_cursor_paginated_list_schema(ns, definition.response_schema)()
+            page_cls = CursorPage
+            paginated_list_cls = partial(
+                CursorPaginatedList,
+                cursor_keys=definition.request_schema.__cursor_keys__,
+            )
+        else:
+            paginated_list_schema = make_paginated_list_schema(ns, definition.response_schema)()
+            page_cls = self.page_cls
+            paginated_list_cls = PaginatedList
+
+        response_schema = self.compile_schema(paginated_list_schema)
+        item_schema = self.compile_schema(definition.response_schema)
+        enable_streaming = self.graph.config.route.enable_streaming
 
         @self.graph.route(ns.collection_path, Operation.Search, ns)
         @qs(definition.request_schema)
         @response(paginated_list_schema)
         def search(**path_data):
             request_data = load_query_string_data(definition.request_schema)
-            page = self.page_cls.from_query_string(request_data)
-            return_value = definition.func(**merge_data(path_data, request_data))
+            page = page_cls.from_query_string(request_data)
+            with timing("func"):
+                return_value = definition.func(**merge_data(path_data, request_data))
 
             if len(return_value) == 3:
                 items, count, context = return_value
@@ -55,7 +93,7 @@ class CRUDConvention(Convention):
                 context = {}
                 items, count = return_value
 
-            response_data = PaginatedList(
+            response_data = paginated_list_cls(
                 ns=ns,
                 page=page,
                 items=items,
@@ -64,7 +102,9 @@ class CRUDConvention(Convention):
                 operation=Operation.Search,
                 **context
             )
-            return dump_response_data(paginated_list_schema, response_data)
+            if enable_streaming:
+                return stream_response_data(item_schema, response_data)
+            return dump_response_data(response_schema, response_data)
 
         search.__doc__ = "Search the collection of all {}".format(pluralize(ns.subject_name))
 
@@ -80,13 +120,16 @@ class CRUDConvention(Convention):
         :param definition: the endpoint definition
 
         """
+        response_schema = self.compile_schema(definition.response_schema)
+
         @self.graph.route(ns.collection_path, Operation.Create, ns)
         @request(definition.request_schema)
         @response(definition.response_schema)
         def create(**path_data):
             request_data = load_request_data(definition.request_schema)
-            response_data = definition.func(**merge_data(path_data, request_data))
-            return dump_response_data(definition.response_schema, response_data, Operation.Create.value.default_code)
+            with timing("func"):
+                response_data = definition.func(**merge_data(path_data, request_data))
+            return dump_response_data(response_schema, response_data, Operation.Create.value.default_code)
 
         create.__doc__ = "Create a new {}".format(ns.subject_name)
 
@@ -103,14 +146,16 @@ class CRUDConvention(Convention):
 
         """
         operation = Operation.UpdateBatch
+        response_schema = self.compile_schema(definition.response_schema)
 
         @self.graph.route(ns.collection_path, operation, ns)
         @request(definition.request_schema)
         @response(definition.response_schema)
         def update_batch(**path_data):
             request_data = load_request_data(definition.request_schema)
-            response_data = definition.func(**merge_data(path_data, request_data))
-            return dump_response_data(definition.response_schema, response_data, operation.value.default_code)
+            with timing("func"):
+                response_data = definition.func(**merge_data(path_data, request_data))
+            return dump_response_data(response_schema, response_data, operation.value.default_code)
 
         update_batch.__doc__ = "Update a batch of {}".format(ns.subject_name)
 
@@ -126,11 +171,14 @@ class CRUDConvention(Convention):
         :param definition: the endpoint definition
 
         """
+        response_schema = self.compile_schema(definition.response_schema)
+
         @self.graph.route(ns.instance_path, Operation.Retrieve, ns)
         @response(definition.response_schema)
         def retrieve(**path_data):
-            response_data = require_response_data(definition.func(**path_data))
-            return dump_response_data(definition.response_schema, response_data)
+            with timing("func"):
+                response_data = require_response_data(definition.func(**path_data))
+            return dump_response_data(response_schema, response_data)
 
         retrieve.__doc__ = "Retrieve a {} by id".format(ns.subject_name)
 
@@ -148,7 +196,8 @@ class CRUDConvention(Convention):
         """
         @self.graph.route(ns.instance_path, Operation.Delete, ns)
         def delete(**path_data):
-            require_response_data(definition.func(**path_data))
+            with timing("func"):
+                require_response_data(definition.func(**path_data))
             return "", Operation.Delete.value.default_code
 
         delete.__doc__ = "Delete a {} by id".format(ns.subject_name)
@@ -165,6 +214,8 @@ class CRUDConvention(Convention):
         :param definition: the endpoint definition
 
         """
+        response_schema = self.compile_schema(definition.response_schema)
+
         @self.graph.route(ns.instance_path, Operation.Replace, ns)
         @request(definition.request_schema)
         @response(definition.response_schema)
@@ -173,8 +224,9 @@ class CRUDConvention(Convention):
             # Replace/put should create a resource if not already present, but we do not
             # enforce these semantics at the HTTP layer. If `func` returns falsey, we
             # will raise a 404.
-            response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
-            return dump_response_data(definition.response_schema, response_data)
+            with timing("func"):
+                response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
+            return dump_response_data(response_schema, response_data)
 
         replace.__doc__ = "Create or update a {} by id".format(ns.subject_name)
 
@@ -190,14 +242,17 @@ class CRUDConvention(Convention):
         :param definition: the endpoint definition
 
         """
+        response_schema = self.compile_schema(definition.response_schema)
+
         @self.graph.route(ns.instance_path, Operation.Update, ns)
         @request(definition.request_schema)
         @response(definition.response_schema)
         def update(**path_data):
             # NB: using partial here means that marshmallow will not validate required fields
             request_data = load_request_data(definition.request_schema, partial=True)
-            response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
-            return dump_response_data(definition.response_schema, response_data)
+            with timing("func"):
+                response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
+            return dump_response_data(response_schema, response_data)
 
         update.__doc__ = "Update some or all of a {} by id".format(ns.subject_name)
 
@@ -2,7 +2,18 @@
 Adapter between conventional crud functions and the `microcosm_postgres.store.Store` interface.
 
 """
+from itertools import islice
+from logging import getLogger
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+
+from werkzeug.exceptions import default_exceptions, InternalServerError
+
+from microcosm_flask.conventions.encoding import with_context
+from microcosm_flask.errors import extract_error_message, extract_status_code
 from microcosm_flask.naming import name_for
+from microcosm_flask.paging import CountMode
 
 
 class CRUDStoreAdapter(object):
@@ -12,9 +23,28 @@ class CRUDStoreAdapter(object):
     Does NOT impose transactions; use the `microcosm_postgres.context.transactional` decorator.
 
     """
-    def __init__(self, graph, store):
+    def __init__(self, graph, store, concurrent_count=False, count_timeout=None, pool_size=4):
+        """
+        :param concurrent_count: count search results on a thread pool while fetching items
+        :param count_timeout: seconds to wait for a concurrent count before omitting it
+        :param pool_size: the number of threads used for concurrent counts; while this many
+                          counts (including timed out ones) are still running, searches omit
+                          the count rather than queue behind them
+
+        Concurrent counts run on a pool thread, outside the request's session and transaction
+        (e.g. a `microcosm_postgres` session, which is bound to the request thread). The store's
+        `count` must then open its own session (and may see a different snapshot than the search).
+
+        """
         self.graph = graph
         self.store = store
+        self.concurrent_count = concurrent_count
+        self.count_timeout = count_timeout
+        self.pool_size = pool_size
+        self.pool = None
+        self.pool_lock = Lock()
+        self.running_counts = 0
+        self.logger = getLogger("microcosm_flask.crud_adapter")
 
     @property
     def identifier_key(self):
@@ -37,10 +67,88 @@ class CRUDStoreAdapter(object):
         identifier = kwargs.pop(self.identifier_key)
         return self.store.retrieve(identifier)
 
-    def search(self, offset, limit, **kwargs):
-        items = self.store.search(offset=offset, limit=limit, **kwargs)
-        count = self.store.count(**kwargs)
-        return items, count
+    def search(self, offset, limit, count=CountMode.exact, **kwargs):
+        """
+        Search with offset pagination.
+
+        Unless the count mode (see `OptionalCountPageSchema`) is exact, the count query is
+        skipped (or estimated) and one extra item is fetched to detect a next page.
+
+        """
+        if count is CountMode.exact and self.concurrent_count:
+            return self.search_with_concurrent_count(offset, limit, **kwargs)
+
+        if count is CountMode.exact:
+            items = self.store.search(offset=offset, limit=limit, **kwargs)
+            return items, self.store.count(**kwargs)
+
+        items = self.store.search(offset=offset, limit=limit + 1, **kwargs)
+        if count is CountMode.estimate:
+            return items, self.estimate_count(**kwargs)
+        return items, None
+
+    def search_with_concurrent_count(self, offset, limit, **kwargs):
+        """
+        Search while counting concurrently, so that latency is that of the slower query.
+
+        One extra item is fetched so that, if the count times out, the response can fall back
+        to an unknown count (and still detect a next page). Timed out counts keep running; if
+        every pool thread is busy, the count is omitted without being submitted.
+
+        """
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ThreadPool(processes=self.pool_size)
+            saturated = self.running_counts >= self.pool_size
+            if not saturated:
+                self.running_counts += 1
+
+        if saturated:
+            self.logger.warning("All {} count threads are busy; omitting count".format(self.pool_size))
+            return self.store.search(offset=offset, limit=limit + 1, **kwargs), None
+
+        pending_count = self.pool.apply_async(self.run_count, kwds=kwargs)
+        items = self.store.search(offset=offset, limit=limit + 1, **kwargs)
+
+        try:
+            count = pending_count.get(self.count_timeout)
+        except TimeoutError:
+            self.logger.warning("Count timed out after {}s; omitting count".format(self.count_timeout))
+            return items, None
+
+        return islice(items, limit), count
+
+    def run_count(self, **kwargs):
+        """
+        Count (on a pool thread), tracking the number of running counts.
+
+        """
+        try:
+            return self.store.count(**kwargs)
+        finally:
+            with self.pool_lock:
+                self.running_counts -= 1
+
+    def estimate_count(self, **kwargs):
+        """
+        Estimate the count using the store's `estimate_count` (if any).
+
+        """
+        estimate_count = getattr(self.store, "estimate_count", None)
+        if estimate_count is None:
+            return None
+        return estimate_count(**kwargs)
+
+    def search_by_cursor(self, cursor, limit, **kwargs):
+        """
+        Search using cursor pagination (for use with a `CursorPageSchema`).
+
+        The store's search must filter by the `cursor` keyset (if any) and order by the same
+        keys. One extra item is fetched to detect a next page; no count is computed.
+
+        """
+        items = self.store.search(cursor=cursor, limit=limit + 1, **kwargs)
+        return items, None
 
     def update(self, **kwargs):
         identifier = kwargs.pop(self.identifier_key)
@@ -49,7 +157,15 @@ class CRUDStoreAdapter(object):
 
     def update_batch(self, **kwargs):
         """
-        Simplistic batch update operation implemented in terms of `replace()`.
+        Batch update operation.
+
+        If the store supports bulk replacement (via `replace_many` or `upsert_many`, which
+        accept a list of models and may return the replaced models), the whole batch is replaced
+        in one call; if the call fails, every item is reported in the error context.
+
+        Otherwise, items are replaced one at a time (in terms of `replace()`). Replacement stops
+        at the first failing item (as later calls would fail within an aborted transaction);
+        the failing item is reported (by index and id) in the error context.
 
         Assumes that:
 
@@ -59,6 +175,22 @@ class CRUDStoreAdapter(object):
 
         """
         items = kwargs.pop("items")
+        replace_many = getattr(self.store, "replace_many", None) or getattr(self.store, "upsert_many", None)
+
+        if replace_many is not None:
+            models = [
+                self.store.model_class(**item)
+                for item in items
+            ]
+            try:
+                replaced = replace_many(models)
+            except Exception as error:
+                raise make_batch_error(
+                    [(index, item.get("id")) for index, item in enumerate(items)],
+                    error,
+                    len(items),
+                )
+            return dict(items=models if replaced is None else replaced)
 
         def transform(item):
             """
@@ -69,9 +201,43 @@ class CRUDStoreAdapter(object):
             item[self.identifier_key] = item.pop("id")
             return item
 
-        return dict(
-            items=[
-                self.replace(**transform(item))
-                for item in items
-            ],
-        )
+        results = []
+        for index, item in enumerate(items):
+            identifier = item.get("id")
+            try:
+                results.append(self.replace(**transform(item)))
+            except Exception as error:
+                raise make_batch_error([(index, identifier)], error, len(items))
+
+        return dict(items=results)
+
+
+def make_batch_error(failed_items, error, total):
+    """
+    Wrap the error of (one or more) items in a batch with an `ErrorContextSchema` context.
+
+    The error's status code is that of the item error.
+
+    :param failed_items: (index, identifier) pairs of the items that could not be updated
+
+    """
+    status_code = extract_status_code(error)
+    error_class = default_exceptions.get(status_code, InternalServerError)
+    if len(failed_items) == 1:
+        description = "Could not update item {} of {} items".format(failed_items[0][0], total)
+    else:
+        description = "Could not update {} items".format(total)
+
+    message = extract_error_message(error)
+    return with_context(
+        error_class(description),
+        [
+            dict(
+                message=message,
+                code=status_code,
+                index=index,
+                id=None if identifier is None else str(identifier),
+            )
+            for index, identifier in failed_items
+        ],
+    )
@@ -2,10 +2,16 @@
 A discovery endpoint provides links to other endpoints.
 
 """
+from flask import request
+
 from microcosm.api import defaults
+from microcosm_flask.caching import LRUCache
 from microcosm_flask.conventions.base import Convention
-from microcosm_flask.conventions.encoding import load_query_string_data, make_response
-from microcosm_flask.conventions.registry import iter_endpoints
+from microcosm_flask.conventions.encoding import (
+    encode_response_data,
+    load_query_string_data,
+    make_conditional_response,
+)
 from microcosm_flask.linking import Link, Links
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.paging import Page, PageSchema
@@ -28,6 +34,10 @@ def iter_links(operations, page):
 
 class DiscoveryConvention(Convention):
 
+    def __init__(self, graph):
+        super(DiscoveryConvention, self).__init__(graph)
+        self.discovery_cache = LRUCache(graph.config.discovery_convention.cache_size)
+
     @property
     def matching_operations(self):
         return {
@@ -42,10 +52,7 @@ class DiscoveryConvention(Convention):
         Evaluated as a property to defer evaluation.
 
         """
-        def match_func(operation, ns, rule):
-            return operation in self.matching_operations
-
-        return list(iter_endpoints(self.graph, match_func))
+        return self.graph.endpoint_registry.find(operations=self.matching_operations)
 
     def configure_discover(self, ns, definition):
         """
@@ -60,18 +67,39 @@ class DiscoveryConvention(Convention):
             page = Page.from_query_string(load_query_string_data(page_schema))
             page.offset = 0
 
+            return make_conditional_response(self.encode_discovery(ns, page))
+
+    def encode_discovery(self, discovery_ns, page):
+        """
+        Build and encode the discovery document, reusing a cached encoding if possible.
+
+        Links depend only on the registered endpoints, the page, and the request's url root
+        (including any forwarded port).
+
+        """
+        key = (
+            self.graph.endpoint_registry.version,
+            request.url_root,
+            request.headers.get("X-Forwarded-Port"),
+            tuple(page.to_tuples()),
+            bool(request.headers.get("X-Response-Skip-Null")),
+        )
+        body = self.discovery_cache.get(key)
+        if body is None:
             response_data = dict(
                 _links=Links({
-                    "self": Link.for_(Operation.Discover, ns, qs=page.to_tuples()),
+                    "self": Link.for_(Operation.Discover, discovery_ns, qs=page.to_tuples()),
                     "search": [
-                        link for link in iter_links(self.find_matching_endpoints(ns), page)
+                        link for link in iter_links(self.find_matching_endpoints(discovery_ns), page)
                     ],
                 }).to_dict()
             )
-            return make_response(response_data)
+            body = self.discovery_cache.set(key, encode_response_data(response_data))
+        return body
 
 
 @defaults(
+    cache_size=128,
     name="hal",
     operations=[
         "search",
@@ -2,10 +2,22 @@
 Support for encoding and decoding request/response content.
 
 """
-from flask import jsonify, request
+from hashlib import sha1
+
+from flask import current_app, jsonify, request, stream_with_context
+from flask.json import dumps
 from werkzeug import Headers
 from werkzeug.exceptions import NotFound, UnprocessableEntity
 
+from microcosm_flask.encoders import JSON_ENCODER
+from microcosm_flask.paging import CursorPaginatedList
+from microcosm_flask.timing import timing
+
+
+# key used to share dumped response data (e.g. with the audit log) via `flask.request`;
+# unlike `flask.g`, the request cannot be shared by requests within one application context
+RESPONSE_DATA = "_microcosm_flask_response_data"
+
 
 def with_headers(error, headers):
     setattr(error, "headers", headers)
@@ -27,8 +39,9 @@ def load_request_data(request_schema, partial=False):
     HTTP 400 and 415 errors.
 
     """
-    json_data = request.get_json(force=True) or {}
-    request_data = request_schema.load(json_data, partial=partial)
+    with timing("load"):
+        json_data = request.get_json(force=True) or {}
+        request_data = request_schema.load(json_data, partial=partial)
     if request_data.errors:
         # pass the validation errors back in the context
         raise with_context(
@@ -48,8 +61,8 @@ def load_query_string_data(request_schema):
     Schemas are assumed to be compatible with the `PageSchema`.
 
     """
-    query_string_data = request.args
-    request_data = request_schema.load(query_string_data)
+    with timing("load"):
+        request_data = request_schema.load(request.args)
     if request_data.errors:
         # pass the validation errors back in the context
         raise with_context(UnprocessableEntity("Validation error"), dict(errors=request_data.errors))
@@ -57,14 +70,40 @@ def load_query_string_data(request_schema):
 
 
 def remove_null_values(data):
+    """
+    Remove null values from (nested) dictionaries.
+
+    Containers are copied only if they (transitively) contain null values; otherwise the
+    original object is returned as-is.
+
+    """
     if isinstance(data, dict):
-        return {
-            key: remove_null_values(value)
-            for key, value in data.items()
-            if value is not None
-        }
+        result = data
+        for key, value in data.items():
+            if value is None:
+                if result is data:
+                    result = dict(data)
+                del result[key]
+                continue
+            cleaned = remove_null_values(value)
+            if cleaned is value:
+                continue
+            if result is data:
+                result = dict(data)
+            result[key] = cleaned
+        return result
     if type(data) in (list, tuple):
-        return type(data)(map(remove_null_values, data))
+        result = None
+        for index, value in enumerate(data):
+            cleaned = remove_null_values(value)
+            if cleaned is value:
+                continue
+            if result is None:
+                result = list(data)
+            result[index] = cleaned
+        if result is None:
+            return data
+        return result if type(data) is list else tuple(result)
     return data
 
 
@@ -77,11 +116,84 @@ def dump_response_data(response_schema, response_data, status_code=200, headers=
     This is friendlier to client and test software, even at the cost of not distinguishing
     HTTP 400 and 406 errors.
 
+    Compiled schemas omit null values as they dump (if requested), avoiding a second pass.
+
+    The dumped data is saved on the request so that it need not be decoded again for logging.
+
+    """
+    skip_null = request.headers.get("X-Response-Skip-Null")
+    without_nulls = getattr(response_schema, "without_nulls", None)
+
+    with timing("dump"):
+        if response_schema and skip_null and without_nulls is not None:
+            response_data = without_nulls.dump(response_data).data
+        else:
+            if response_schema:
+                response_data = response_schema.dump(response_data).data
+            if skip_null:
+                # swagger does not currently support null values; remove these conditionally
+                response_data = remove_null_values(response_data)
+
+    setattr(request, RESPONSE_DATA, response_data)
+    return build_response(response_data, status_code, headers)
+
+
+def encode_json(data):
+    """
+    Encode data as a JSON string using the configured encoder backend.
+
+    """
+    encode = current_app.extensions.get(JSON_ENCODER, dumps)
+    return encode(data)
+
+
+def stream_response_data(item_schema, paginated_list, status_code=200, headers=None):
     """
-    if response_schema:
-        response_data = response_schema.dump(response_data).data
+    Dumps a paginated list as a streamed JSON response.
+
+    Items are dumped, encoded, and flushed one at a time so that only one item is held in memory;
+    the list's envelope (count, offset or cursor, limit, and links) is written last, as whether
+    there is a next page may only be known once the items have been read.
+
+    Items may be any iterable (including a generator returned by a search function).
+
+    """
+    skip_null = request.headers.get("X-Response-Skip-Null")
+
+    without_nulls = getattr(item_schema, "without_nulls", None)
+
+    def dump_item(item):
+        if skip_null and without_nulls is not None:
+            return without_nulls.dump(item).data
+        item_data = item_schema.dump(item).data if item_schema else item
+        return remove_null_values(item_data) if skip_null else item_data
 
-    return make_response(response_data, status_code, headers)
+    def generate():
+        yield '{"items": ['
+        for index, item in enumerate(paginated_list.items):
+            yield ("," if index else "") + encode_json(dump_item(item))
+
+        envelope = dict(
+            count=paginated_list.count,
+            limit=paginated_list.limit,
+            _links=paginated_list._links,
+        )
+        if isinstance(paginated_list, CursorPaginatedList):
+            envelope["cursor"] = paginated_list.page.to_dict().get("cursor")
+        else:
+            envelope["offset"] = paginated_list.offset
+        if skip_null:
+            envelope = remove_null_values(envelope)
+
+        # append the envelope without its opening brace
+        yield "], " + encode_json(envelope)[1:]
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        status=status_code,
+        headers=headers,
+        mimetype="application/json",
+    )
 
 
 def make_response(response_data, status_code=200, headers=None):
@@ -89,17 +201,64 @@ def make_response(response_data, status_code=200, headers=None):
         # swagger does not currently support null values; remove these conditionally
         response_data = remove_null_values(response_data)
 
+    return build_response(response_data, status_code, headers)
+
+
+def build_response(response_data, status_code=200, headers=None):
+    """
+    Build a JSON response from response data as-is.
+
+    """
     headers = headers or {}
     if "Content-Type" not in headers:
         # Specify JSON as the response content type by default
         headers["Content-Type"] = "application/json"
 
-    response = jsonify(response_data)
+    encode = current_app.extensions.get(JSON_ENCODER)
+    if encode is not None:
+        with timing("encode"):
+            body = encode(response_data)
+        return current_app.response_class(body, status=status_code, headers=headers)
+
+    with timing("encode"):
+        response = jsonify(response_data)
     response.headers = Headers(headers)
     response.status_code = status_code
     return response
 
 
+def encode_response_data(response_data):
+    """
+    Encode response data as JSON bytes.
+
+    Used for responses that are computed once and served many times.
+
+    """
+    if request.headers.get("X-Response-Skip-Null"):
+        # swagger does not currently support null values; remove these conditionally
+        response_data = remove_null_values(response_data)
+
+    return encode_json(response_data).encode("utf-8")
+
+
+def make_conditional_response(body, status_code=200, headers=None):
+    """
+    Make a response from pre-encoded JSON content.
+
+    Sets a strong ETag derived from the content and evaluates conditional request headers
+    (e.g. `If-None-Match`) so that unchanged content is answered with a 304.
+
+    """
+    response = current_app.response_class(
+        body,
+        status=status_code,
+        headers=headers,
+        mimetype="application/json",
+    )
+    response.set_etag(sha1(body).hexdigest())
+    return response.make_conditional(request)
+
+
 def merge_data(path_data, request_data):
     """
     Merge data from the URI path and the request.
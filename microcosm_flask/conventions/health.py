@@ -4,7 +4,14 @@ Health check convention.
 Reports service health and basic information from the "/api/health" endpoint,
 using HTTP 200/503 status codes to indicate healthiness.
 
+Checks run concurrently on a bounded thread pool, each with a timeout. Results may be cached
+for a TTL and, for a further period, served stale while they are refreshed in the background.
+
 """
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+from threading import Lock, Thread
+
 from microcosm.api import defaults
 from microcosm_flask.audit import skip_logging
 from microcosm_flask.conventions.base import Convention
@@ -12,11 +19,13 @@ from microcosm_flask.conventions.encoding import make_response
 from microcosm_flask.errors import extract_error_message
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.operations import Operation
+from microcosm_flask.timing import clock
 
 
 class HealthResult(object):
-    def __init__(self, error=None):
+    def __init__(self, error=None, latency=None):
         self.error = error
+        self.latency = latency
 
     def __nonzero__(self):
         return self.error is None
@@ -28,18 +37,26 @@ class HealthResult(object):
         return "ok" if self.error is None else self.error
 
     def to_dict(self):
-        return {
+        dct = {
             "ok": bool(self),
             "message": str(self),
         }
+        if self.latency is not None:
+            dct["latency"] = self.latency
+        return dct
 
     @classmethod
     def evaluate(cls, func, graph):
+        start_time = clock()
         try:
             func(graph)
-            return cls()
+            return cls(latency=clock() - start_time)
         except Exception as error:
-            return cls(extract_error_message(error))
+            return cls(extract_error_message(error), latency=clock() - start_time)
+
+    @classmethod
+    def timed_out(cls, timeout):
+        return cls("timed out after {}s".format(timeout), latency=timeout)
 
 
 class Health(object):
@@ -51,22 +68,83 @@ class Health(object):
 
     The overall health is OK if all checks are OK.
 
+    Checks are evaluated concurrently (within an application context) unless the pool size
+    is zero. A check that is still running from an earlier request is awaited rather than
+    started again, so slow checks do not pile up; a check that has since been replaced is
+    started afresh.
+
     """
     def __init__(self, graph):
         self.graph = graph
         self.name = graph.metadata.name
         self.checks = {}
 
+        config = graph.config.health_convention
+        self.cache_ttl = config.cache_ttl
+        self.pool_size = config.pool_size
+        self.stale_ttl = config.stale_ttl
+        self.timeout = config.timeout
+
+        self.pool = None
+        # running (or completed) evaluations by check function
+        self.pending = {}
+        self.cached = None
+        self.lock = Lock()
+        self.pending_lock = Lock()
+        self.refresh_lock = Lock()
+
     def to_dict(self):
         """
         Encode the name, the status of all checks, and the current overall status.
 
+        Uses cached results if they are fresh enough (or stale and being refreshed).
+
         """
-        # evaluate checks
-        checks = {
-            key: HealthResult.evaluate(func, self.graph)
-            for key, func in self.checks.items()
-        }
+        if not self.cache_ttl:
+            return self.evaluate()
+
+        cached = self.cached
+        if cached is not None:
+            age = clock() - cached[0]
+            if age < self.cache_ttl:
+                return cached[1]
+            if age < self.cache_ttl + self.stale_ttl:
+                self.refresh_in_background()
+                return cached[1]
+
+        with self.lock:
+            if self.cached is not cached:
+                # refreshed by another request in the meantime
+                return self.cached[1]
+            return self.refresh()
+
+    def refresh(self):
+        dct = self.evaluate()
+        self.cached = (clock(), dct)
+        return dct
+
+    def refresh_in_background(self):
+        # at most one refresh at a time
+        if not self.refresh_lock.acquire(False):
+            return
+
+        def refresh():
+            try:
+                with self.lock:
+                    self.refresh()
+            finally:
+                self.refresh_lock.release()
+
+        thread = Thread(target=refresh, name="health-refresh")
+        thread.daemon = True
+        thread.start()
+
+    def evaluate(self):
+        """
+        Evaluate all checks.
+
+        """
+        checks = self.evaluate_checks()
         dct = dict(
             # return the service name helps for routing debugging
             name=self.name,
@@ -79,6 +157,45 @@ class Health(object):
             }
         return dct
 
+    def evaluate_check(self, func):
+        with self.graph.flask.app_context():
+            return HealthResult.evaluate(func, self.graph)
+
+    def evaluate_checks(self):
+        checks = dict(self.checks)
+        if not checks:
+            return {}
+
+        if not self.pool_size:
+            return {
+                key: HealthResult.evaluate(func, self.graph)
+                for key, func in checks.items()
+            }
+
+        with self.pending_lock:
+            if self.pool is None:
+                self.pool = ThreadPool(processes=self.pool_size)
+
+            pending, running = {}, {}
+            for key, func in checks.items():
+                if func not in running:
+                    result = self.pending.get(func)
+                    if result is None or result.ready():
+                        result = self.pool.apply_async(self.evaluate_check, (func,))
+                    running[func] = result
+                pending[key] = running[func]
+            # forget evaluations of checks that have been removed or replaced
+            self.pending = running
+
+        deadline = clock() + self.timeout
+        results = {}
+        for key, result in pending.items():
+            try:
+                results[key] = result.get(max(deadline - clock(), 0))
+            except TimeoutError:
+                results[key] = HealthResult.timed_out(self.timeout)
+        return results
+
 
 class HealthConvention(Convention):
 
@@ -97,7 +214,11 @@ class HealthConvention(Convention):
 
 
 @defaults(
+    cache_ttl=0.0,
     path_prefix="",
+    pool_size=4,
+    stale_ttl=0.0,
+    timeout=5.0,
 )
 def configure_health(graph):
     """
@@ -0,0 +1,51 @@
+"""
+Metrics convention.
+
+Exposes request metrics (see `microcosm_flask.metrics`) from the "/api/metrics" endpoint
+in the Prometheus text format.
+
+"""
+from microcosm.api import defaults
+from microcosm_flask.audit import skip_logging
+from microcosm_flask.conventions.base import Convention
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+
+
+# the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsConvention(Convention):
+
+    def configure_retrieve(self, ns, definition):
+
+        @self.graph.route(ns.singleton_path, Operation.Retrieve, ns)
+        @skip_logging
+        def current_metrics():
+            return self.graph.flask.response_class(
+                self.graph.metrics.to_prometheus(),
+                status=200,
+                content_type=CONTENT_TYPE,
+            )
+
+
+@defaults(
+    name="metrics",
+    path_prefix="",
+)
+def configure_metrics_convention(graph):
+    """
+    Configure the metrics endpoint.
+
+    Metrics are only recorded for routes if `route.enable_metrics` is set.
+
+    """
+    ns = Namespace(
+        path=graph.config.metrics_convention.path_prefix,
+        subject=graph.config.metrics_convention.name,
+    )
+
+    convention = MetricsConvention(graph)
+    convention.configure(ns, retrieve=tuple())
+    return ns.subject
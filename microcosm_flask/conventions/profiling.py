@@ -0,0 +1,70 @@
+"""
+Profiling convention.
+
+Exposes request profiles (see `microcosm_flask.profiling`): "/api/profile" lists recent
+profiles and "/api/profile/<profile_id>" renders a profile as text.
+
+Profiles are listed with a query (rather than a search) operation: the listing is not
+paginated and should not be advertised by the (default) discovery and swagger conventions.
+
+"""
+from microcosm.api import defaults
+from werkzeug.exceptions import NotFound
+
+from microcosm_flask.audit import skip_logging
+from microcosm_flask.conventions.base import Convention
+from microcosm_flask.conventions.encoding import make_response
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+
+
+class ProfilingConvention(Convention):
+
+    def configure_query(self, ns, definition):
+
+        @self.graph.route(ns.collection_path, Operation.Query, ns)
+        @skip_logging
+        def search_profiles():
+            return make_response(dict(
+                items=[
+                    profile.to_dict()
+                    for profile in self.graph.profiler.store.all()
+                ],
+            ))
+
+    def configure_retrieve(self, ns, definition):
+
+        @self.graph.route(ns.instance_path, Operation.Retrieve, ns)
+        @skip_logging
+        def retrieve_profile(**path_data):
+            profile = self.graph.profiler.store.get(path_data["{}_id".format(ns.subject_name)])
+            if profile is None:
+                raise NotFound
+            return self.graph.flask.response_class(
+                profile.render(),
+                status=200,
+                content_type="text/plain; charset=utf-8",
+            )
+
+
+@defaults(
+    enable_basic_auth=True,
+    name="profile",
+    path_prefix="",
+)
+def configure_profiling_convention(graph):
+    """
+    Configure the profiling endpoints.
+
+    Profiles describe the internals of the service, so basic auth is enabled by default.
+
+    """
+    ns = Namespace(
+        path=graph.config.profiling_convention.path_prefix,
+        subject=graph.config.profiling_convention.name,
+        enable_basic_auth=graph.config.profiling_convention.enable_basic_auth,
+    )
+
+    convention = ProfilingConvention(graph)
+    convention.configure(ns, query=tuple(), retrieve=tuple())
+    return ns.subject
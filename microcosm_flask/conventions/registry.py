@@ -1,19 +1,168 @@
 """
-Support for registering function metadata.
+Support for registering function metadata and convention-based endpoints.
 
 """
-from microcosm_flask.namespaces import Namespace
+from collections import defaultdict
+from operator import itemgetter
+
 from werkzeug.exceptions import InternalServerError
 
+from microcosm_flask.namespaces import Namespace
+
 
 REQUEST = "__request__"
 RESPONSE = "__response__"
 QS = "__qs__"
 
 
+class EndpointRegistry(object):
+    """
+    An index of convention-based endpoints.
+
+    Endpoints are registered by the route decorator as they are defined; lookups by operation,
+    subject, version, and path prefix then avoid scanning (and parsing) the whole URL map.
+
+    Convention-named rules that are added without the route decorator (e.g. via
+    `flask.add_url_rule`) are registered from the URL map when lookups next notice that the
+    application's view functions have changed.
+
+    Entries are (`Operation`, `Namespace`, rule, func) tuples; the namespace is the one parsed
+    from the endpoint name (as if from `Namespace.parse_endpoint`).
+
+    The `version` changes whenever endpoints are registered, so that documents derived from
+    the registered endpoints (e.g. swagger and discovery) may be cached by version.
+
+    """
+    def __init__(self, app=None):
+        self.app = app
+        self.view_function_count = 0
+        self.registration_count = 0
+        self.entries = []
+        self.by_endpoint = {}
+        self.by_operation = defaultdict(list)
+        self.by_subject = defaultdict(list)
+        self.by_version = defaultdict(list)
+        self.by_path_prefix = defaultdict(list)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def register(self, rule, func):
+        """
+        Register an endpoint for a (convention-based) rule.
+
+        """
+        operation, ns = Namespace.parse_endpoint(rule.endpoint)
+        entry = (operation, ns, rule, func)
+        self.by_endpoint[rule.endpoint] = entry
+
+        # track the registration order so that lookups across several indexes can be merged
+        indexed = (len(self.entries), entry)
+        self.entries.append(entry)
+        self.by_operation[operation].append(indexed)
+        self.by_subject[ns.subject_name].append(indexed)
+        self.by_version[ns.version].append(indexed)
+        for path_prefix in iter_path_prefixes(rule.rule):
+            self.by_path_prefix[path_prefix].append(indexed)
+        self.registration_count += 1
+        return entry
+
+    @property
+    def version(self):
+        self.refresh()
+        return self.registration_count
+
+    def refresh(self):
+        """
+        Register convention-named rules that were added to the URL map without being registered.
+
+        """
+        if self.app is None or len(self.app.view_functions) == self.view_function_count:
+            return
+
+        for rule in self.app.url_map.iter_rules():
+            if rule.endpoint in self.by_endpoint:
+                continue
+            try:
+                self.register(rule, self.app.view_functions[rule.endpoint])
+            except (IndexError, ValueError, InternalServerError):
+                # operation follows a different convention (e.g. "static")
+                continue
+
+        self.view_function_count = len(self.app.view_functions)
+
+    def get(self, endpoint):
+        """
+        Get the entry for an endpoint (or None).
+
+        """
+        self.refresh()
+        return self.by_endpoint.get(endpoint)
+
+    def find(self, operations=None, subject=None, version=None, path_prefix=None):
+        """
+        Find entries (in registration order).
+
+        :param operations: an optional iterable of matching operations
+        :param subject: an optional subject name
+        :param version: an optional version (e.g. "v1")
+        :param path_prefix: an optional prefix of whole segments of the rule's (full) path
+
+        """
+        self.refresh()
+
+        if path_prefix is not None:
+            path_prefix = path_prefix.rstrip("/") or None
+
+        indexes = []
+        if operations is not None:
+            operations = set(operations)
+            indexes.append([
+                indexed
+                for operation in operations
+                for indexed in self.by_operation.get(operation, ())
+            ])
+        if subject is not None:
+            indexes.append(self.by_subject.get(subject, ()))
+        if version is not None:
+            indexes.append(self.by_version.get(version, ()))
+        if path_prefix is not None:
+            indexes.append(self.by_path_prefix.get(path_prefix, ()))
+
+        if indexes:
+            # start from the smallest index; filter on the rest
+            entries = [entry for _, entry in sorted(min(indexes, key=len), key=itemgetter(0))]
+        else:
+            entries = self.entries
+
+        return [
+            entry
+            for entry in entries
+            if all((
+                operations is None or entry[0] in operations,
+                subject is None or entry[1].subject_name == subject,
+                version is None or entry[1].version == version,
+                path_prefix is None or (entry[2].rule + "/").startswith(path_prefix + "/"),
+            ))
+        ]
+
+
+def iter_path_prefixes(path):
+    """
+    Iterate over the prefixes of whole segments of a path (e.g. "/api", "/api/foo" for "/api/foo").
+
+    """
+    parts = path.rstrip("/").split("/")
+    for index in range(2, len(parts) + 1):
+        yield "/".join(parts[:index])
+
+
 def iter_endpoints(graph, match_func):
     """
-    Iterate through matching endpoints.
+    Iterate through matching (registered) endpoints.
+
+    As `match_func` is arbitrary, every registered endpoint is checked; use
+    `EndpointRegistry.find` to look up endpoints by operation, subject, version, or path prefix.
 
     The `match_func` is expected to have a signature of:
 
@@ -23,17 +172,18 @@ def iter_endpoints(graph, match_func):
     :returns: a generator over (`Operation`, `Namespace`, rule, func) tuples.
 
     """
-    for rule in graph.flask.url_map.iter_rules():
-        try:
-            operation, ns = Namespace.parse_endpoint(rule.endpoint)
-        except (IndexError, ValueError, InternalServerError):
-            # operation follows a different convention (e.g. "static")
-            continue
-        else:
-            # match_func gets access to rule to support path version filtering
-            if match_func(operation, ns, rule):
-                func = graph.flask.view_functions[rule.endpoint]
-                yield operation, ns, rule, func
+    for operation, ns, rule, func in graph.endpoint_registry.find():
+        # match_func gets access to rule to support path version filtering
+        if match_func(operation, ns, rule):
+            yield operation, ns, rule, func
+
+
+def configure_endpoint_registry(graph):
+    """
+    Create the endpoint registry; endpoints are added by the route decorator.
+
+    """
+    return EndpointRegistry(graph.flask)
 
 
 def request(schema):
@@ -5,6 +5,8 @@ For relations, endpoint definitions require that the `Namespace` contain *both*
 a subject and an object.
 
 """
+from functools import partial
+
 from inflection import pluralize
 from marshmallow import Schema
 
@@ -15,11 +17,21 @@ from microcosm_flask.conventions.encoding import (
     load_request_data,
     merge_data,
     require_response_data,
+    stream_response_data,
 )
 from microcosm_flask.conventions.registry import qs, request, response
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.operations import Operation
-from microcosm_flask.paging import Page, PaginatedList, make_paginated_list_schema
+from microcosm_flask.paging import (
+    CursorPage,
+    CursorPaginatedList,
+    is_cursor_page_schema,
+    make_cursor_paginated_list_schema,
+    make_paginated_list_schema,
+    Page,
+    PaginatedList,
+)
+from microcosm_flask.timing import timing
 
 
 class RelationConvention(Convention):
@@ -41,13 +53,16 @@ class RelationConvention(Convention):
         :param definition: the endpoint definition
 
         """
+        response_schema = self.compile_schema(definition.response_schema)
+
         @self.graph.route(ns.relation_path, Operation.CreateFor, ns)
         @request(definition.request_schema)
         @response(definition.response_schema)
         def create(**path_data):
             request_data = load_request_data(definition.request_schema)
-            response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
-            return dump_response_data(definition.response_schema, response_data, Operation.CreateFor.value.default_code)
+            with timing("func"):
+                response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
+            return dump_response_data(response_schema, response_data, Operation.CreateFor.value.default_code)
 
         create.__doc__ = "Create a new {} relative to a {}".format(pluralize(ns.object_name), ns.subject_name)
 
@@ -65,7 +80,8 @@ class RelationConvention(Convention):
         """
         @self.graph.route(ns.relation_path, Operation.DeleteFor, ns)
         def delete(**path_data):
-            require_response_data(definition.func(**path_data))
+            with timing("func"):
+                require_response_data(definition.func(**path_data))
             return "", Operation.DeleteFor.value.default_code
 
         delete.__doc__ = "Delete a {} relative to a {}".format(pluralize(ns.object_name), ns.subject_name)
@@ -89,14 +105,17 @@ class RelationConvention(Convention):
         :param definition: the endpoint definition
 
         """
+        response_schema = self.compile_schema(definition.response_schema)
+
         @self.graph.route(ns.relation_path, Operation.ReplaceFor, ns)
         @request(definition.request_schema)
         @response(definition.response_schema)
         def replace(**path_data):
             request_data = load_request_data(definition.request_schema)
-            response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
+            with timing("func"):
+                response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
             return dump_response_data(
-                definition.response_schema,
+                response_schema,
                 response_data,
                 Operation.ReplaceFor.value.default_code,
             )
@@ -118,14 +137,16 @@ class RelationConvention(Convention):
 
         """
         request_schema = definition.request_schema or Schema()
+        response_schema = self.compile_schema(definition.response_schema)
 
         @self.graph.route(ns.relation_path, Operation.RetrieveFor, ns)
         @qs(request_schema)
         @response(definition.response_schema)
         def retrieve(**path_data):
             request_data = load_query_string_data(request_schema)
-            response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
-            return dump_response_data(definition.response_schema, response_data)
+            with timing("func"):
+                response_data = require_response_data(definition.func(**merge_data(path_data, request_data)))
+            return dump_response_data(response_schema, response_data)
 
         retrieve.__doc__ = "Retrieve {} relative to a {}".format(pluralize(ns.object_name), ns.subject_name)
 
@@ -141,21 +162,42 @@ class RelationConvention(Convention):
 
         The definition's request_schema will be used to process query string arguments.
 
+        If streaming is enabled (via `route.enable_streaming`), items may be any iterable
+        (e.g. a generator); items are then dumped and written to the response one at a time.
+
+        If the request_schema is a `CursorPageSchema`, the search is cursor paginated (see
+        `CRUDConvention.configure_search`).
+
         :param ns: the namespace
         :param definition: the endpoint definition
 
         """
-        paginated_list_schema = make_paginated_list_schema(ns.object_ns, definition.response_schema)()
+        if is_cursor_page_schema(definition.request_schema):
+            paginated_list_schema = make_cursor_paginated_list_schema(ns.object_ns, definition.response_schema)()
+            page_cls = CursorPage
+            paginated_list_cls = partial(
+                CursorPaginatedList,
+                cursor_keys=definition.request_schema.__cursor_keys__,
+            )
+        else:
+            paginated_list_schema = make_paginated_list_schema(ns.object_ns, definition.response_schema)()
+            page_cls = Page
+            paginated_list_cls = self.paginated_list_class
+
+        response_schema = self.compile_schema(paginated_list_schema)
+        item_schema = self.compile_schema(definition.response_schema)
+        enable_streaming = self.graph.config.route.enable_streaming
 
         @self.graph.route(ns.relation_path, Operation.SearchFor, ns)
         @qs(definition.request_schema)
         @response(paginated_list_schema)
         def search(**path_data):
             request_data = load_query_string_data(definition.request_schema)
-            page = Page.from_query_string(request_data)
-            items, count, context = definition.func(**merge_data(path_data, request_data))
+            page = page_cls.from_query_string(request_data)
+            with timing("func"):
+                items, count, context = definition.func(**merge_data(path_data, request_data))
 
-            response_data = self.paginated_list_class(
+            response_data = paginated_list_cls(
                 ns=ns,
                 page=page,
                 items=items,
@@ -164,7 +206,9 @@ class RelationConvention(Convention):
                 operation=Operation.SearchFor,
                 **context
             )
-            return dump_response_data(paginated_list_schema, response_data)
+            if enable_streaming:
+                return stream_response_data(item_schema, response_data)
+            return dump_response_data(response_schema, response_data)
 
         search.__doc__ = "Search for {} relative to a {}".format(pluralize(ns.object_name), ns.subject_name)
 
@@ -0,0 +1,347 @@
+"""
+Compiled serialization for response schemas.
+
+Marshmallow resolves every field's accessor and formatting on every call to `Schema.dump()`.
+For large responses (e.g. paginated lists) this reflection dominates the cost of encoding.
+
+Compiling a schema inspects its fields once and builds a plan of (key, getter) pairs with the
+accessors and formatters resolved ahead of time. Field types without a specialized formatter
+fall back to marshmallow's own field serialization; schemas using features that affect the
+whole dump (processors, prefixes, extra data, custom accessors) are not compiled at all.
+
+Compiled schemas mimic the `Schema.dump()` interface so that they may be passed to
+`dump_response_data` in lieu of the original schema. Objects with values that a compiled plan
+cannot format (e.g. validation errors) are dumped by the original schema instead, one object at
+a time, so that one-shot iterables (such as streamed pages of items) are never iterated twice.
+
+Schemas may also be compiled to omit null values as they are dumped (e.g. for the
+`X-Response-Skip-Null` header) instead of removing them afterwards. Schemas that are not
+compiled are still dumped by marshmallow, but omit null values using a compiled plan (see
+`SkipNoneSchema`); only schemas that cannot be compiled remove null values in a second pass.
+
+"""
+from logging import getLogger
+from uuid import UUID
+
+from marshmallow import fields, Schema, ValidationError
+from marshmallow.schema import MarshalResult
+from marshmallow.utils import ensure_text_type, get_value, is_collection, missing
+from six import string_types, text_type
+
+from microcosm_flask.conventions.encoding import remove_null_values
+
+
+logger = getLogger("microcosm_flask.serialization")
+
+
+def is_compilable(schema):
+    """
+    Can this schema be compiled?
+
+    """
+    return all((
+        isinstance(schema, Schema),
+        not getattr(schema, "_has_processors", False),
+        not schema.prefix,
+        not schema.extra,
+        not schema.opts.fields,
+        not schema.opts.additional,
+        type(schema).get_attribute == Schema.get_attribute,
+        getattr(schema, "__accessor__", None) is None,
+        getattr(schema, "__error_handler__", None) is None,
+    ))
+
+
+def compile_schema(schema, compiled=None, skip_none=False):
+    """
+    Compile a schema (instance), if possible.
+
+    :param compiled: a memo of already compiled schemas (for recursive nesting)
+    :param skip_none: whether to omit null values
+    :returns: a `CompiledSchema` or the original schema if it cannot be compiled
+
+    """
+    if isinstance(schema, CompiledSchema) or not is_compilable(schema):
+        return schema
+
+    if compiled is None:
+        compiled = dict()
+
+    try:
+        return compiled[id(schema), skip_none]
+    except KeyError:
+        return CompiledSchema(schema, compiled, skip_none)
+
+
+def get_attribute(obj, key):
+    """
+    Get a value from an object, preferring the fast paths for models and dictionaries.
+
+    Follows the semantics of `marshmallow.utils.get_value`.
+
+    """
+    if type(obj) is dict:
+        return obj.get(key, missing)
+    if hasattr(obj, "__getitem__"):
+        return get_value(key, obj, missing)
+
+    value = getattr(obj, key, missing)
+    return value() if callable(value) else value
+
+
+def compile_raw_formatter(field, name, compiled, skip_none):
+    return lambda value: value
+
+
+def compile_string_formatter(field, name, compiled, skip_none):
+    def format_string(value):
+        if value is None or type(value) is text_type:
+            return value
+        return ensure_text_type(value)
+    return format_string
+
+
+def compile_uuid_formatter(field, name, compiled, skip_none):
+    def format_uuid(value):
+        if type(value) is UUID:
+            return text_type(value)
+        return field._serialize(value, name, None)
+    return format_uuid
+
+
+def compile_integer_formatter(field, name, compiled, skip_none):
+    if field.as_string:
+        return None
+
+    def format_integer(value):
+        if value is None or type(value) is int:
+            return value
+        return field._serialize(value, name, None)
+    return format_integer
+
+
+def compile_boolean_formatter(field, name, compiled, skip_none):
+    def format_boolean(value):
+        if value is None or value is True or value is False:
+            return value
+        return field._serialize(value, name, None)
+    return format_boolean
+
+
+def compile_nested_formatter(field, name, compiled, skip_none):
+    if isinstance(field.only, string_types):
+        return None
+
+    nested_schema = compile_schema(field.schema, compiled, skip_none)
+    if not isinstance(nested_schema, CompiledSchema):
+        return None
+
+    many = field.schema.many or field.many
+
+    def format_nested(value):
+        if value is None:
+            return None
+        if many:
+            return [nested_schema.dump_item(item)[0] for item in value]
+        return nested_schema.dump_item(value)[0]
+    return format_nested
+
+
+def compile_list_formatter(field, name, compiled, skip_none):
+    if field.container.attribute:
+        return None
+
+    format_item = compile_formatter(field.container, name, compiled, skip_none)
+    if format_item is None:
+        return None
+
+    def format_list(value):
+        if value is None:
+            return None
+        if is_collection(value):
+            return [format_item(item) for item in value]
+        return [format_item(value)]
+    return format_list
+
+
+FORMATTER_COMPILERS = {
+    fields.Boolean: compile_boolean_formatter,
+    fields.Integer: compile_integer_formatter,
+    fields.List: compile_list_formatter,
+    fields.Nested: compile_nested_formatter,
+    fields.Raw: compile_raw_formatter,
+    fields.String: compile_string_formatter,
+    fields.UUID: compile_uuid_formatter,
+}
+
+
+def compile_formatter(field, name, compiled, skip_none):
+    """
+    Compile a function that formats a (non-missing) field value.
+
+    Only exact field types are specialized; subclasses may override serialization.
+
+    :returns: a formatting function or None if the field type is not supported
+
+    """
+    try:
+        compile_func = FORMATTER_COMPILERS[type(field)]
+    except KeyError:
+        return None
+    else:
+        return compile_func(field, name, compiled, skip_none)
+
+
+def compile_opaque_getter(schema, name, field, skip_none):
+    """
+    Compile a function for a field whose values are not formatted by a compiled plan.
+
+    Such values (e.g. from `Method` fields) may contain nested null values.
+
+    """
+    if type(field) is fields.Method and field.serialize_method_name:
+        method = getattr(schema, field.serialize_method_name)
+
+        def get_value(obj):
+            try:
+                return method(obj)
+            except AttributeError:
+                return missing
+    else:
+        # defer to marshmallow
+        def get_value(obj):
+            return field.serialize(name, obj, accessor=schema.get_attribute)
+
+    if not skip_none:
+        return get_value
+
+    return lambda obj: remove_null_values(get_value(obj))
+
+
+def compile_getter(schema, name, field, compiled, skip_none):
+    """
+    Compile a function that returns the serialized value for a field (or `missing`).
+
+    """
+    attribute = field.attribute or name
+    formatter = compile_formatter(field, name, compiled, skip_none)
+
+    if formatter is None or not field._CHECK_ATTRIBUTE or "." in attribute:
+        return compile_opaque_getter(schema, name, field, skip_none)
+
+    if skip_none and type(field) is fields.Raw:
+        formatter = remove_null_values
+
+    def get_field_value(obj):
+        value = get_attribute(obj, attribute)
+        if value is missing:
+            value = field.default() if callable(field.default) else field.default
+            return remove_null_values(value) if skip_none else value
+        return formatter(value)
+    return get_field_value
+
+
+class CompiledSchema(object):
+    """
+    A serialization plan for a schema.
+
+    """
+    def __init__(self, schema, compiled, skip_none=False):
+        self.schema = schema
+        self.dict_class = schema.dict_class
+        self.skip_none = skip_none
+        # register before compiling fields to support recursive nesting
+        compiled[id(schema), skip_none] = self
+        self.plan = [
+            (field.dump_to or name, compile_getter(schema, name, field, compiled, skip_none))
+            for name, field in schema.fields.items()
+            if not field.load_only
+        ]
+        self._without_nulls = self if skip_none else None
+
+    @property
+    def many(self):
+        return self.schema.many
+
+    @property
+    def without_nulls(self):
+        """
+        A variant of this compiled schema that omits null values.
+
+        """
+        if self._without_nulls is None:
+            self._without_nulls = compile_schema(self.schema, skip_none=True)
+        return self._without_nulls
+
+    def dump_one(self, obj):
+        result = self.dict_class()
+        for key, getter in self.plan:
+            value = getter(obj)
+            if value is missing or (value is None and self.skip_none):
+                continue
+            result[key] = value
+        return result
+
+    def dump_item(self, obj):
+        """
+        Serialize a single object, delegating to the original schema on validation errors.
+
+        :returns: a tuple of the serialized data and any errors
+
+        """
+        try:
+            return self.dump_one(obj), {}
+        except ValidationError as error:
+            logger.warning("Unable to dump with compiled {}: {}; falling back".format(
+                type(self.schema).__name__,
+                error,
+            ))
+
+        result = self.schema.dump(obj, many=False)
+        if self.skip_none:
+            return remove_null_values(result.data), result.errors
+        return result.data, result.errors
+
+    def dump(self, obj, many=None):
+        """
+        Serialize an object in the same way as `Schema.dump()`.
+
+        Validation errors are delegated to the original schema (for the failing object only) so
+        that they are reported in the usual way; other errors propagate.
+
+        """
+        many = self.schema.many if many is None else bool(many)
+        if not many:
+            return MarshalResult(*self.dump_item(obj))
+
+        data, errors = [], {}
+        for index, item in enumerate(obj):
+            item_data, item_errors = self.dump_item(item)
+            data.append(item_data)
+            if item_errors:
+                errors[index] = item_errors
+        return MarshalResult(data, errors)
+
+
+class SkipNoneSchema(object):
+    """
+    A schema that dumps with marshmallow, but omits null values as they are dumped.
+
+    The null-omitting plan is compiled on first use.
+
+    """
+    def __init__(self, schema):
+        self.schema = schema
+        self._without_nulls = None
+
+    def __getattr__(self, name):
+        return getattr(self.schema, name)
+
+    @property
+    def without_nulls(self):
+        if self._without_nulls is None:
+            self._without_nulls = compile_schema(self.schema, skip_none=True)
+        return self._without_nulls
+
+    def dump(self, obj, many=None):
+        return self.schema.dump(obj, many=many)
@@ -4,12 +4,11 @@ Swagger (OpenAPI) convention.
 Exposes swagger definitions for matching operations.
 
 """
-from flask import g
+from flask import g, request
 
 from microcosm.api import defaults
 from microcosm_flask.conventions.base import Convention
-from microcosm_flask.conventions.encoding import make_response
-from microcosm_flask.conventions.registry import iter_endpoints
+from microcosm_flask.conventions.encoding import encode_response_data, make_conditional_response
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.operations import Operation
 from microcosm_flask.routing import make_path
@@ -18,6 +17,10 @@ from microcosm_flask.swagger.definitions import build_swagger
 
 class SwaggerConvention(Convention):
 
+    def __init__(self, graph):
+        super(SwaggerConvention, self).__init__(graph)
+        self.swagger_cache = {}
+
     @property
     def matching_operations(self):
         return {
@@ -32,14 +35,31 @@ class SwaggerConvention(Convention):
         Evaluated as a property to defer evaluation.
 
         """
-        def match_func(operation, ns, rule):
-            # only expose endpoints that have the correct path prefix and operation
-            return (
-                rule.rule.startswith(make_path(self.graph, swagger_ns.path)) and
-                operation in self.matching_operations
-            )
+        # only expose endpoints that have the correct path prefix and operation
+        return self.graph.endpoint_registry.find(
+            operations=self.matching_operations,
+            path_prefix=make_path(self.graph, swagger_ns.path),
+        )
+
+    def encode_swagger(self, swagger_ns):
+        """
+        Build and encode the swagger definition, reusing the cached encoding if routes are unchanged.
 
-        return list(iter_endpoints(self.graph, match_func))
+        """
+        key = (self.graph.endpoint_registry.version, bool(request.headers.get("X-Response-Skip-Null")))
+        try:
+            return self.swagger_cache[key]
+        except KeyError:
+            swagger = build_swagger(self.graph, swagger_ns, self.find_matching_endpoints(swagger_ns))
+            body = encode_response_data(swagger)
+            # discard encodings for any previous versions of the endpoint registry
+            self.swagger_cache = {
+                cached_key: cached_body
+                for cached_key, cached_body in self.swagger_cache.items()
+                if cached_key[0] == key[0]
+            }
+            self.swagger_cache[key] = body
+            return body
 
     def configure_discover(self, ns, definition):
         """
@@ -48,9 +68,8 @@ class SwaggerConvention(Convention):
         """
         @self.graph.route(ns.singleton_path, Operation.Discover, ns)
         def discover():
-            swagger = build_swagger(self.graph, ns, self.find_matching_endpoints(ns))
             g.hide_body = True
-            return make_response(swagger)
+            return make_conditional_response(self.encode_swagger(ns))
 
 
 @defaults(
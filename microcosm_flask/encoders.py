@@ -0,0 +1,68 @@
+"""
+JSON encoder backends.
+
+Responses are encoded using Flask's `jsonify` by default. Other backends (including
+C-accelerated encoders, if installed) may be selected using the `flask.json_encoder`
+configuration key.
+
+All backends share Flask's handling of non-JSON types (e.g. UUIDs and dates) and honor
+the `JSON_SORT_KEYS` and `JSON_AS_ASCII` settings, but always produce compact output.
+
+"""
+from functools import partial
+from json import dumps as json_dumps
+
+try:
+    from simplejson import dumps as simplejson_dumps
+except ImportError:
+    simplejson_dumps = None
+
+try:
+    from rapidjson import dumps as rapidjson_dumps
+except ImportError:
+    rapidjson_dumps = None
+
+
+# key used to store the configured encoder in `Flask.extensions`
+JSON_ENCODER = "microcosm_flask.json_encoder"
+
+
+def iter_json_backends():
+    """
+    Iterate over the names of the installed backends.
+
+    """
+    yield "flask"
+    yield "json"
+    if simplejson_dumps is not None:
+        yield "simplejson"
+    if rapidjson_dumps is not None:
+        yield "rapidjson"
+
+
+def make_json_encoder(app, name):
+    """
+    Create an encoding function for a named backend.
+
+    :returns: a function from data to a JSON string or None if Flask's `jsonify` should be used
+    :raises ValueError: if the backend is unknown or not installed
+
+    """
+    if name == "flask":
+        return None
+
+    if name not in iter_json_backends():
+        raise ValueError("Unsupported JSON encoder: {}".format(name))
+
+    options = dict(
+        default=app.json_encoder().default,
+        ensure_ascii=app.config["JSON_AS_ASCII"],
+        sort_keys=app.config["JSON_SORT_KEYS"],
+    )
+
+    if name == "rapidjson":
+        # rapidjson is always compact
+        return partial(rapidjson_dumps, **options)
+
+    dumps = simplejson_dumps if name == "simplejson" else json_dumps
+    return partial(dumps, separators=(",", ":"), **options)
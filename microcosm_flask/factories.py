@@ -7,8 +7,11 @@ from flask import Flask
 from microcosm.api import defaults
 import microcosm.opaque  # noqa
 
+from microcosm_flask.encoders import JSON_ENCODER, make_json_encoder
+
 
 @defaults(
+    json_encoder="flask",
     port=5000,
 )
 def configure_flask(graph):
@@ -29,6 +32,10 @@ def configure_flask(graph):
         if not isinstance(value, dict)
     })
 
+    json_encoder = make_json_encoder(app, graph.config.flask.json_encoder)
+    if json_encoder is not None:
+        app.extensions[JSON_ENCODER] = json_encoder
+
     return app
 
 
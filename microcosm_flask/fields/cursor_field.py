@@ -0,0 +1,57 @@
+"""
+An opaque pagination cursor field.
+
+Cursors encode the keyset (the sort key values) of the last item of a page as URL-safe
+base64 JSON; values that are not JSON types (e.g. UUIDs and datetimes) are encoded as strings.
+
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from json import dumps, loads
+
+from marshmallow.fields import Field, ValidationError
+
+
+def encode_cursor(values):
+    """
+    Encode a list of keyset values as an opaque cursor.
+
+    """
+    data = dumps(list(values), default=str, separators=(",", ":")).encode("utf-8")
+    return urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode an opaque cursor into a list of keyset values.
+
+    :raises ValueError: if the cursor is malformed
+
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = loads(urlsafe_b64decode(str(cursor + padding)).decode("utf-8"))
+    except (DecodeError, TypeError, UnicodeDecodeError):
+        raise ValueError("Malformed cursor")
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+class CursorField(Field):
+    """
+    Marshmallow field for an opaque pagination cursor.
+
+    """
+    def _serialize(self, value, attr, obj):
+        if value is None:
+            return None
+        return encode_cursor(value)
+
+    def _deserialize(self, value, attr, data):
+        if value is None:
+            return None
+        try:
+            return decode_cursor(value)
+        except ValueError:
+            raise ValidationError("Invalid cursor: {}".format(value))
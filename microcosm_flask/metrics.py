@@ -0,0 +1,203 @@
+"""
+In-process request metrics.
+
+Route functions may be instrumented (see `route.enable_metrics`) to record histograms of
+request latency and request/response sizes, along with counts of status codes, by endpoint.
+
+Histograms use fixed, log-linear bucket bounds (linear steps within each power of ten), so
+that recording a sample is a binary search and a counter increment.
+
+Metrics may be exposed in the Prometheus text format via the metrics convention.
+
+"""
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock
+
+from flask import request
+from six import binary_type, text_type
+
+from microcosm_flask.errors import extract_status_code
+from microcosm_flask.timing import clock
+
+
+def log_linear_bounds(low_exponent, high_exponent, steps=(1, 2.5, 5, 7.5)):
+    """
+    Compute bucket bounds with linear steps within each power of ten.
+
+    For example, `log_linear_bounds(-1, 0, (1, 5))` is `[0.1, 0.5, 1.0]`.
+
+    """
+    return [
+        float("{}e{}".format(step, exponent))
+        for exponent in range(low_exponent, high_exponent)
+        for step in steps
+    ] + [float("1e{}".format(high_exponent))]
+
+
+# latency from 100us to 100s
+LATENCY_BOUNDS = log_linear_bounds(-4, 2)
+
+# sizes from 10B to 100MB
+SIZE_BOUNDS = log_linear_bounds(1, 8)
+
+
+class Histogram(object):
+    """
+    A histogram over fixed bucket bounds.
+
+    """
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # the last count is for values greater than all bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def iter_cumulative_counts(self):
+        """
+        Iterate over (bound, count of values less than or equal to bound) pairs.
+
+        The last bound is `None` (i.e. infinity).
+
+        """
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            yield (self.bounds[index] if index < len(self.bounds) else None), total
+
+
+class EndpointMetrics(object):
+    """
+    Metrics for a single endpoint.
+
+    """
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.latency = Histogram(LATENCY_BOUNDS)
+        self.request_size = Histogram(SIZE_BOUNDS)
+        self.response_size = Histogram(SIZE_BOUNDS)
+        self.status_codes = {}
+        self.lock = Lock()
+
+    def observe(self, latency, status_code, request_size=None, response_size=None):
+        with self.lock:
+            self.latency.observe(latency)
+            if request_size is not None:
+                self.request_size.observe(request_size)
+            if response_size is not None:
+                self.response_size.observe(response_size)
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+
+class MetricsRegistry(object):
+    """
+    Metrics for all instrumented endpoints.
+
+    """
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = Lock()
+
+    def for_endpoint(self, endpoint):
+        with self.lock:
+            try:
+                return self.endpoints[endpoint]
+            except KeyError:
+                return self.endpoints.setdefault(endpoint, EndpointMetrics(endpoint))
+
+    def to_prometheus(self):
+        """
+        Encode all metrics in the Prometheus text exposition format.
+
+        """
+        lines = []
+        endpoints = [self.endpoints[endpoint] for endpoint in sorted(self.endpoints)]
+
+        for name, description, attribute in [
+            ("http_request_duration_seconds", "Request latency by endpoint.", "latency"),
+            ("http_request_size_bytes", "Request body size by endpoint.", "request_size"),
+            ("http_response_size_bytes", "Response body size by endpoint.", "response_size"),
+        ]:
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} histogram".format(name))
+            for metrics in endpoints:
+                with metrics.lock:
+                    histogram = getattr(metrics, attribute)
+                    counts = list(histogram.iter_cumulative_counts())
+                    total, count = histogram.sum, histogram.count
+                for bound, cumulative_count in counts:
+                    lines.append('{}_bucket{{endpoint="{}",le="{}"}} {}'.format(
+                        name,
+                        metrics.endpoint,
+                        "+Inf" if bound is None else repr(bound),
+                        cumulative_count,
+                    ))
+                lines.append('{}_sum{{endpoint="{}"}} {}'.format(name, metrics.endpoint, repr(float(total))))
+                lines.append('{}_count{{endpoint="{}"}} {}'.format(name, metrics.endpoint, count))
+
+        lines.append("# HELP http_requests_total Requests by endpoint and status code.")
+        lines.append("# TYPE http_requests_total counter")
+        for metrics in endpoints:
+            with metrics.lock:
+                status_codes = sorted(metrics.status_codes.items())
+            for status_code, count in status_codes:
+                lines.append('http_requests_total{{endpoint="{}",status_code="{}"}} {}'.format(
+                    metrics.endpoint,
+                    status_code,
+                    count,
+                ))
+
+        return "\n".join(lines) + "\n"
+
+
+def describe_response(response):
+    """
+    Get the status code and (if known) content length of a view function's return value.
+
+    """
+    if isinstance(response, tuple):
+        status_code = response[1] if len(response) > 1 and isinstance(response[1], int) else 200
+        return status_code, describe_response(response[0])[1]
+    if hasattr(response, "status_code"):
+        return response.status_code, response.content_length
+    if isinstance(response, binary_type):
+        return 200, len(response)
+    if isinstance(response, text_type):
+        return 200, len(response.encode("utf-8"))
+    return 200, None
+
+
+def instrument(metrics_registry, endpoint, func):
+    """
+    Record metrics for calls to a route function.
+
+    """
+    metrics = metrics_registry.for_endpoint(endpoint)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = clock()
+        try:
+            response = func(*args, **kwargs)
+        except Exception as error:
+            metrics.observe(clock() - start_time, extract_status_code(error), request.content_length)
+            raise
+        status_code, response_size = describe_response(response)
+        metrics.observe(clock() - start_time, status_code, request.content_length, response_size)
+        return response
+
+    return wrapper
+
+
+def configure_metrics(graph):
+    """
+    Create the metrics registry.
+
+    """
+    return MetricsRegistry()
@@ -11,6 +11,7 @@ from flask import request, url_for
 from six.moves.urllib.parse import urlencode, urljoin
 from werkzeug.exceptions import InternalServerError
 
+from microcosm_flask.caching import LRUCache
 from microcosm_flask.naming import (
     collection_path_for,
     instance_path_for,
@@ -19,6 +20,19 @@ from microcosm_flask.naming import (
     singleton_path_for,
 )
 from microcosm_flask.operations import Operation
+from microcosm_flask.url_templates import build_external_url
+
+
+# the caches below are bounded because endpoints may be parsed from arbitrary strings
+
+# interned namespaces by (subject, object_, path, version)
+INTERNED_NAMESPACES = LRUCache(1024)
+
+# parsed (operation, namespace) tuples by endpoint
+PARSED_ENDPOINTS = LRUCache(1024)
+
+# endpoint names by (namespace, operation)
+ENDPOINTS = LRUCache(4096)
 
 
 class Namespace(object):
@@ -30,6 +44,8 @@ class Namespace(object):
     The `Operation` enum defines the legal verbs (according to various conventions); this
     object encapsulates the rest.
 
+    Namespaces are immutable (and hashable) values; derived names and paths are computed once.
+
     """
 
     def __init__(
@@ -49,19 +65,77 @@ class Namespace(object):
         :param version: the version of this namespace
         :param enable_basic_auth: enable basic auth for this namespace if it's not enabled globally
         """
-        self.subject = subject
-        self.object_ = object_
-        self.prefix = path or ""
-        self.controller = controller
-        self.version = version
-        self.enable_basic_auth = enable_basic_auth
+        prefix = path or ""
+        subject_name = name_for(subject)
+        object_name = name_for(object_)
+        path = prefix + "/" + version if version else prefix
+
+        self.__dict__.update(
+            subject=subject,
+            object_=object_,
+            prefix=prefix,
+            controller=controller,
+            version=version,
+            enable_basic_auth=enable_basic_auth,
+            subject_name=subject_name,
+            object_name=object_name,
+            path=path,
+            collection_path=path + collection_path_for(subject_name),
+            instance_path=path + instance_path_for(subject_name),
+            relation_path=path + relation_path_for(subject_name, object_name),
+            singleton_path=path + singleton_path_for(subject_name),
+        )
 
-    @property
-    def path(self):
-        if self.version:
-            return self.prefix + "/" + self.version
-        else:
-            return self.prefix
+    def __setattr__(self, name, value):
+        raise AttributeError("Namespace is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Namespace is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, Namespace):
+            return NotImplemented
+        return all((
+            self.subject == other.subject,
+            self.object_ == other.object_,
+            self.prefix == other.prefix,
+            self.controller is other.controller,
+            self.version == other.version,
+            self.enable_basic_auth == other.enable_basic_auth,
+        ))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((self.subject_name, self.object_name, self.path))
+
+    def __repr__(self):
+        return "Namespace({!r}, object_={!r}, path={!r}, version={!r})".format(
+            self.subject,
+            self.object_,
+            self.prefix,
+            self.version,
+        )
+
+    @classmethod
+    def intern(cls, subject, object_=None, path=None, version=None):
+        """
+        Get a shared Namespace instance for the given values.
+
+        Values that cannot be hashed produce a new instance; the least recently used instances
+        are evicted once the cache is full.
+
+        """
+        key = (cls, subject, object_, path or "", version)
+        try:
+            ns = INTERNED_NAMESPACES.get(key)
+        except TypeError:
+            return cls(subject, object_, path=path, version=version)
+        if ns is None:
+            ns = INTERNED_NAMESPACES.set(key, cls(subject, object_, path=path, version=version))
+        return ns
 
     @property
     def object_ns(self):
@@ -69,37 +143,13 @@ class Namespace(object):
         Create a new namespace for the current namespace's object value.
 
         """
-        return Namespace(
+        return Namespace.intern(
             path=self.path,
             subject=self.object_,
             object_=None,
             version=self.version,
         )
 
-    @property
-    def subject_name(self):
-        return name_for(self.subject)
-
-    @property
-    def object_name(self):
-        return name_for(self.object_)
-
-    @property
-    def collection_path(self):
-        return self.path + collection_path_for(self.subject)
-
-    @property
-    def instance_path(self):
-        return self.path + instance_path_for(self.subject)
-
-    @property
-    def relation_path(self):
-        return self.path + relation_path_for(self.subject, self.object_)
-
-    @property
-    def singleton_path(self):
-        return self.path + singleton_path_for(self.subject)
-
     def endpoint_for(self, operation):
         """
         Create a (unique) endpoint name from an operation and a namespace.
@@ -110,12 +160,16 @@ class Namespace(object):
         Examples: `foo.search`, `bar.search_for.baz`
 
         """
-        return operation.value.pattern.format(
-            subject=self.subject_name,
-            operation=operation.value.name,
-            object_=self.object_name if self.object_ else None,
-            version=self.version or "v1",
-        )
+        key = (self, operation)
+        endpoint = ENDPOINTS.get(key)
+        if endpoint is None:
+            endpoint = ENDPOINTS.set(key, operation.value.pattern.format(
+                subject=self.subject_name,
+                operation=operation.value.name,
+                object_=self.object_name if self.object_ else None,
+                version=self.version or "v1",
+            ))
+        return endpoint
 
     @staticmethod
     def parse_endpoint(endpoint):
@@ -123,6 +177,10 @@ class Namespace(object):
         Convert an endpoint name into an (operation, ns) tuple.
 
         """
+        parsed = PARSED_ENDPOINTS.get(endpoint)
+        if parsed is not None:
+            return parsed
+
         # compute the operation
         parts = endpoint.split(".")
         operation = Operation.from_name(parts[1])
@@ -133,7 +191,7 @@ class Namespace(object):
             raise InternalServerError("Malformed operation endpoint: {}".format(endpoint))
         kwargs = matcher.groupdict()
         del kwargs["operation"]
-        return operation, Namespace(**kwargs)
+        return PARSED_ENDPOINTS.set(endpoint, (operation, Namespace.intern(**kwargs)))
 
     def url_for(self, operation, _external=True, **kwargs):
         """
@@ -143,7 +201,12 @@ class Namespace(object):
             which are passed to flask.url_for.
             In particular, _external=True produces absolute url.
         """
-        return url_for(self.endpoint_for(operation), _external=_external, **kwargs)
+        endpoint = self.endpoint_for(operation)
+        if _external:
+            url = build_external_url(endpoint, kwargs)
+            if url is not None:
+                return url
+        return url_for(endpoint, _external=_external, **kwargs)
 
     def href_for(self, operation, qs=None, **kwargs):
         """
@@ -152,7 +215,10 @@ class Namespace(object):
         :parm qs: the query string dictionary, if any
         :param kwargs: additional arguments for path expansion
         """
-        url = urljoin(request.url_root, self.url_for(operation, **kwargs))
+        url = self.url_for(operation, **kwargs)
+        if "/." in url or "://" not in url:
+            # external urls are already absolute; otherwise resolve against the url root
+            url = urljoin(request.url_root, url)
         qs_character = "?" if url.find("?") == -1 else "&"
 
         return "{}{}".format(
@@ -168,17 +234,19 @@ class Namespace(object):
         Used to transition older APIs that relied on strings/objects/tuples/lists
         to pass subject and object information instead of Namespace instances.
 
+        Namespaces created from values are interned.
+
         """
         if isinstance(value, Namespace):
             return value
         elif isinstance(value, (tuple, list)):
-            return cls(
+            return cls.intern(
                 subject=value[0],
                 object_=value[1],
                 path=path,
             )
         else:
-            return cls(
+            return cls.intern(
                 subject=value,
                 path=path,
             )
@@ -1,11 +1,43 @@
 """
 Pagination support.
 
+Two modes are supported:
+
+ -  offset pagination (`PageSchema`, `Page`, and `PaginatedList`) pages by `offset` and
+    `limit` and reports a total `count`; with `OptionalCountPageSchema`, the count may be
+    skipped or estimated (see `CountMode`)
+ -  cursor (keyset) pagination (`CursorPageSchema`, `CursorPage`, and `CursorPaginatedList`)
+    pages by an opaque `cursor` that encodes the sort keys of the last item of the previous
+    page, so that deep pages cost the same as the first; the `count` is optional
+
 """
+from enum import Enum, unique
+from itertools import islice
+
 from marshmallow import fields, Schema
 
+from microcosm_flask.fields import CursorField, EnumField
+from microcosm_flask.fields.cursor_field import encode_cursor
 from microcosm_flask.linking import Link, Links
 from microcosm_flask.operations import Operation
+from microcosm_flask.timing import timing
+
+
+@unique
+class CountMode(Enum):
+    """
+    How a search computes its total count (the `count` query string option).
+
+    """
+    # count exactly
+    exact = "true"
+    # skip the count
+    skip = "false"
+    # estimate the count (e.g. from database statistics)
+    estimate = "estimate"
+
+    def __str__(self):
+        return self.value
 
 
 class PageSchema(Schema):
@@ -13,6 +45,40 @@ class PageSchema(Schema):
     limit = fields.Integer(missing=20, limit=20)
 
 
+class OptionalCountPageSchema(PageSchema):
+    """
+    Query string schema for offset pagination with an optional count.
+
+    Search functions receive the `count` mode. Unless the mode is exact, they should return
+    up to `limit + 1` items (the extra item signals a next page) and a count of None (if
+    skipped) or an estimate.
+
+    Subclasses may change the endpoint's default mode, e.g.:
+
+        count = EnumField(CountMode, by_value=True, missing=CountMode.skip)
+
+    """
+    count = EnumField(CountMode, by_value=True, missing=CountMode.exact)
+
+
+class CursorPageSchema(Schema):
+    """
+    Query string schema for cursor pagination.
+
+    Subclasses may override the item attributes encoded in cursors (e.g. the sort keys of
+    a search) with `__cursor_keys__`.
+
+    """
+    __cursor_keys__ = ("id",)
+
+    cursor = CursorField(missing=None)
+    limit = fields.Integer(missing=20, default=20)
+
+
+def is_cursor_page_schema(schema):
+    return isinstance(schema, CursorPageSchema)
+
+
 def make_paginated_list_schema(ns, item_schema):
     """
     Generate a paginated list schema.
@@ -27,13 +93,73 @@ def make_paginated_list_schema(ns, item_schema):
 
         offset = fields.Integer(required=True)
         limit = fields.Integer(required=True)
-        count = fields.Integer(required=True)
+        count = fields.Integer(required=True, allow_none=True)
         items = fields.List(fields.Nested(item_schema), required=True)
         _links = fields.Raw()
 
     return PaginatedListSchema
 
 
+def make_cursor_paginated_list_schema(ns, item_schema):
+    """
+    Generate a cursor paginated list schema.
+
+    :param ns: a `Namespace` for the list's item type
+    :param item_schema: a `Schema` for the list's item type
+
+    """
+
+    class CursorPaginatedListSchema(Schema):
+        __alias__ = "{}_cursor_list".format(ns.subject_name)
+
+        cursor = CursorField(allow_none=True)
+        limit = fields.Integer(required=True)
+        count = fields.Integer(allow_none=True)
+        items = fields.List(fields.Nested(item_schema), required=True)
+        _links = fields.Raw()
+
+    return CursorPaginatedListSchema
+
+
+class PageItems(object):
+    """
+    A page of items from a search that fetched (up to) one extra item to signal a next page.
+
+    Items are iterated lazily (once) and the extra item is detected with one item of look-ahead,
+    so that a streamed response never holds the whole page in memory. If `has_next` is needed
+    before the items are iterated, the page is buffered instead.
+
+    """
+    def __init__(self, items, limit):
+        self.iterator = iter(items)
+        self.limit = limit
+        self.buffer = None
+        self.last = None
+        self._has_next = None
+
+    def __iter__(self):
+        if self.buffer is not None:
+            return iter(self.buffer)
+        return self.stream()
+
+    def stream(self):
+        for item in islice(self.iterator, self.limit):
+            self.last = item
+            yield item
+        self._has_next = self.peek()
+
+    def peek(self):
+        return next(self.iterator, self) is not self
+
+    @property
+    def has_next(self):
+        if self._has_next is None:
+            self.buffer = list(islice(self.iterator, self.limit))
+            self.last = self.buffer[-1] if self.buffer else None
+            self._has_next = self.peek()
+        return self._has_next
+
+
 class Page(object):
 
     def __init__(self, offset, limit, **rest):
@@ -58,6 +184,10 @@ class Page(object):
             **dct
         )
 
+    @property
+    def count_mode(self):
+        return self.rest.get("count", CountMode.exact)
+
     def next(self):
         return Page(
             offset=self.offset + self.limit,
@@ -101,22 +231,34 @@ class PaginatedList(object):
                  **extra):
         self.ns = ns
         self.page = page
-        self.items = items
         self.count = count
+        if count is None or page.count_mode is not CountMode.exact:
+            # without an exact count, the search fetches one extra item to signal a next page
+            self.items = PageItems(items, page.limit)
+        else:
+            self.items = items
         self.schema = schema
         self.operation = operation
         self.extra = extra
 
     def to_dict(self):
-        return dict(
+        # the page's query string options (e.g. the count mode) do not override the list's fields
+        dct = self.page.to_dict()
+        dct.update(
             count=self.count,
             items=[
                 self.schema.dump(item).data if self.schema else item
                 for item in self.items
             ],
             _links=self._links,
-            **self.page.to_dict()
         )
+        return dct
+
+    @property
+    def has_next(self):
+        if isinstance(self.items, PageItems):
+            return self.items.has_next
+        return self.page.offset + self.page.limit < self.count
 
     @property
     def offset(self):
@@ -132,10 +274,147 @@ class PaginatedList(object):
 
     @property
     def links(self):
-        links = Links()
-        links["self"] = Link.for_(self.operation, self.ns, qs=self.page.to_tuples(), **self.extra)
-        if self.page.offset + self.page.limit < self.count:
-            links["next"] = Link.for_(self.operation, self.ns, qs=self.page.next().to_tuples(), **self.extra)
-        if self.page.offset > 0:
-            links["prev"] = Link.for_(self.operation, self.ns, qs=self.page.prev().to_tuples(), **self.extra)
+        with timing("links"):
+            links = Links()
+            links["self"] = Link.for_(self.operation, self.ns, qs=self.page.to_tuples(), **self.extra)
+            if self.has_next:
+                links["next"] = Link.for_(self.operation, self.ns, qs=self.page.next().to_tuples(), **self.extra)
+            if self.page.offset > 0:
+                links["prev"] = Link.for_(self.operation, self.ns, qs=self.page.prev().to_tuples(), **self.extra)
+        return links
+
+
+class CursorPage(object):
+
+    def __init__(self, cursor, limit, **rest):
+        """
+        :param cursor: the keyset values of the last item of the previous page (if any)
+
+        """
+        self.cursor = cursor
+        self.limit = limit
+        self.rest = rest
+
+    @classmethod
+    def from_query_string(cls, qs):
+        """
+        Create a page from a query string dictionary (e.g. loaded with `CursorPageSchema`).
+
+        """
+        dct = qs.copy()
+        cursor = dct.pop("cursor", None)
+        limit = dct.pop("limit", None)
+        return cls(
+            cursor=cursor,
+            limit=limit,
+            **dct
+        )
+
+    def next(self, cursor):
+        return CursorPage(
+            cursor=cursor,
+            limit=self.limit,
+            **self.rest
+        )
+
+    def to_dict(self):
+        return dict(self.to_tuples())
+
+    def to_tuples(self):
+        """
+        Convert to tuples for deterministic order when passed to urlencode.
+
+        """
+        cursor = [] if self.cursor is None else [("cursor", encode_cursor(self.cursor))]
+        return cursor + [
+            ("limit", self.limit),
+        ] + [
+            (key, str(self.rest[key]))
+            for key in sorted(self.rest.keys())
+        ]
+
+
+class CursorPaginatedList(object):
+    """
+    A page of items from a cursor paginated search.
+
+    Search functions should return up to `limit + 1` items; the extra item (if any) signals
+    that there is a next page and is not returned. The next page's cursor encodes the
+    `cursor_keys` of the last returned item.
+
+    """
+    def __init__(self,
+                 ns,
+                 page,
+                 items,
+                 count=None,
+                 schema=None,
+                 operation=Operation.Search,
+                 cursor_keys=CursorPageSchema.__cursor_keys__,
+                 **extra):
+        self.ns = ns
+        self.page = page
+        self.items = PageItems(items, page.limit)
+        self.count = count
+        self.schema = schema
+        self.operation = operation
+        self.cursor_keys = cursor_keys
+        self.extra = extra
+
+    def to_dict(self):
+        dct = self.page.to_dict()
+        dct.setdefault("cursor", None)
+        dct.update(
+            count=self.count,
+            items=[
+                self.schema.dump(item).data if self.schema else item
+                for item in self.items
+            ],
+            _links=self._links,
+        )
+        return dct
+
+    @property
+    def has_next(self):
+        return self.items.has_next
+
+    @property
+    def cursor(self):
+        return self.page.cursor
+
+    @property
+    def limit(self):
+        return self.page.limit
+
+    @property
+    def next_cursor(self):
+        """
+        The keyset values of the last item (if there is a next page).
+
+        """
+        if not self.has_next or self.items.last is None:
+            return None
+        item = self.items.last
+        return [
+            item[key] if isinstance(item, dict) else getattr(item, key)
+            for key in self.cursor_keys
+        ]
+
+    @property
+    def _links(self):
+        return self.links.to_dict()
+
+    @property
+    def links(self):
+        with timing("links"):
+            links = Links()
+            links["self"] = Link.for_(self.operation, self.ns, qs=self.page.to_tuples(), **self.extra)
+            next_cursor = self.next_cursor
+            if next_cursor is not None:
+                links["next"] = Link.for_(
+                    self.operation,
+                    self.ns,
+                    qs=self.page.next(next_cursor).to_tuples(),
+                    **self.extra
+                )
         return links
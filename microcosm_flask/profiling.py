@@ -0,0 +1,273 @@
+"""
+Request profiling.
+
+Route functions may be profiled (see `route.enable_profiling`) if a request carries a signed
+`X-Profile` header or is chosen at random (at `profiler.sample_rate`). Profiles are kept in a
+bounded ring buffer and exposed by the profiling convention.
+
+Two kinds of profiler are supported:
+
+ -  `cprofile` runs the route function under `cProfile`; profiles are rendered as pstats text
+ -  `sample` periodically samples the stack of the request thread from a background thread,
+    which has much lower overhead; profiles are rendered as collapsed stacks (as consumed by
+    flame graph tools)
+
+"""
+from collections import deque
+from cProfile import Profile as CProfile
+from functools import wraps
+from hashlib import sha256
+from hmac import compare_digest, new as hmac
+from pstats import Stats
+from random import random
+from sys import _current_frames
+from threading import Event, Lock, Thread
+from time import time
+from uuid import uuid4
+
+from flask import request
+from microcosm.api import defaults
+from six import StringIO
+from six.moves._thread import get_ident
+
+
+PROFILE_HEADER = "X-Profile"
+
+PROFILER_KINDS = ("cprofile", "sample")
+
+
+def sign_request(secret, method, path, timestamp=None):
+    """
+    Compute the `X-Profile` header value that requests profiling of a request.
+
+    The value has the form "<timestamp>:<signature>"; it expires `profiler.max_signature_age`
+    seconds after (or before) the timestamp, so that a captured value cannot be replayed forever.
+
+    :param timestamp: the signing time as epoch seconds (defaults to now)
+
+    """
+    if timestamp is None:
+        timestamp = int(time())
+    message = "{} {} {}".format(method, path, timestamp)
+    return "{}:{}".format(
+        timestamp,
+        hmac(secret.encode("utf-8"), message.encode("utf-8"), sha256).hexdigest(),
+    )
+
+
+class Profile(object):
+    """
+    The profile of a single request.
+
+    """
+    def __init__(self, endpoint, elapsed_time, stats=None, stacks=None):
+        """
+        :param stats: a `cProfile.Profile` (for `cprofile` profiles)
+        :param stacks: a dictionary from collapsed stack to sample count (for `sample` profiles)
+
+        """
+        self.id = uuid4()
+        self.created_at = time()
+        self.endpoint = endpoint
+        self.elapsed_time = elapsed_time
+        self.stats = stats
+        self.stacks = stacks
+
+    @property
+    def format(self):
+        return "pstats" if self.stats is not None else "collapsed"
+
+    def to_dict(self):
+        return dict(
+            id=str(self.id),
+            created_at=self.created_at,
+            endpoint=self.endpoint,
+            elapsed_time=self.elapsed_time,
+            format=self.format,
+        )
+
+    def render(self):
+        """
+        Render the profile as text.
+
+        """
+        if self.stats is not None:
+            stream = StringIO()
+            Stats(self.stats, stream=stream).sort_stats("cumulative").print_stats()
+            return stream.getvalue()
+
+        return "".join(
+            "{} {}\n".format(stack, count)
+            for stack, count in sorted(self.stacks.items())
+        )
+
+
+class ProfileStore(object):
+    """
+    A ring buffer of the most recent profiles.
+
+    """
+    def __init__(self, max_profiles):
+        self.profiles = deque(maxlen=max_profiles)
+        self.lock = Lock()
+
+    def add(self, profile):
+        with self.lock:
+            self.profiles.append(profile)
+
+    def all(self):
+        """
+        List profiles, most recent first.
+
+        """
+        with self.lock:
+            return list(reversed(self.profiles))
+
+    def get(self, profile_id):
+        for profile in self.all():
+            if profile.id == profile_id:
+                return profile
+        return None
+
+
+class StackSampler(object):
+    """
+    Sample the stack of the calling thread at a fixed interval.
+
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = get_ident()
+        self.stacks = {}
+        self.stopped = Event()
+        self.worker = Thread(target=self.run, name="stack-sampler")
+        self.worker.daemon = True
+
+    def start(self):
+        self.worker.start()
+
+    def stop(self):
+        """
+        Stop sampling.
+
+        :returns: a dictionary from collapsed stack to sample count
+
+        """
+        self.stopped.set()
+        self.worker.join()
+        return self.stacks
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = _current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append("{}:{}".format(frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            if names:
+                stack = ";".join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+
+class Profiler(object):
+    """
+    Decide which requests to profile, profile them, and keep the results.
+
+    """
+    def __init__(self,
+                 store,
+                 kind="cprofile",
+                 sample_rate=0.0,
+                 secret=None,
+                 sample_interval=0.005,
+                 max_signature_age=60):
+        if kind not in PROFILER_KINDS:
+            raise ValueError("Unsupported profiler: {}".format(kind))
+
+        self.store = store
+        self.kind = kind
+        self.sample_rate = float(sample_rate)
+        self.secret = secret
+        self.sample_interval = sample_interval
+        self.max_signature_age = max_signature_age
+
+    def should_profile(self):
+        """
+        Profile requests with a valid signature and a random sample of other requests.
+
+        """
+        signature = request.headers.get(PROFILE_HEADER)
+        if signature and self.secret and self.is_valid_signature(str(signature)):
+            return True
+
+        return self.sample_rate > 0 and random() < self.sample_rate
+
+    def is_valid_signature(self, signature):
+        """
+        Check that a signature matches the current request and has not expired.
+
+        """
+        timestamp, _, _ = signature.partition(":")
+        try:
+            timestamp = int(timestamp)
+        except ValueError:
+            return False
+
+        if abs(time() - timestamp) > self.max_signature_age:
+            return False
+
+        return compare_digest(signature, sign_request(self.secret, request.method, request.path, timestamp))
+
+    def profile(self, endpoint, func):
+        """
+        Profile (some) calls to a route function.
+
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.should_profile():
+                return func(*args, **kwargs)
+
+            start_time = time()
+            if self.kind == "sample":
+                sampler = StackSampler(self.sample_interval)
+                sampler.start()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.store.add(Profile(endpoint, time() - start_time, stacks=sampler.stop()))
+
+            profiler = CProfile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                self.store.add(Profile(endpoint, time() - start_time, stats=profiler))
+
+        return wrapper
+
+
+@defaults(
+    kind="cprofile",
+    max_profiles=20,
+    max_signature_age=60,
+    sample_interval=0.005,
+    sample_rate=0.0,
+    secret=None,
+)
+def configure_profiler(graph):
+    """
+    Configure the request profiler.
+
+    Requests are only profiled if `route.enable_profiling` is set; a request may then ask to
+    be profiled with an `X-Profile` header signed by `profiler.secret` (see `sign_request`).
+
+    """
+    config = graph.config.profiler
+    return Profiler(
+        store=ProfileStore(config.max_profiles),
+        kind=config.kind,
+        sample_rate=config.sample_rate,
+        secret=config.secret,
+        sample_interval=config.sample_interval,
+        max_signature_age=config.max_signature_age,
+    )
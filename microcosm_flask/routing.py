@@ -9,18 +9,26 @@ from flask_cors import cross_origin
 from microcosm.api import defaults
 from microcosm_logging.decorators import context_logger
 
+from microcosm_flask.metrics import instrument
+from microcosm_flask.timing import add_server_timing
+
 
 def make_path(graph, path):
     return graph.config.route.path_prefix + path
 
 
 @defaults(
+    compile_schemas=False,
     converters=[
         "uuid",
     ],
     enable_audit=True,
     enable_basic_auth=False,
     enable_cors=True,
+    enable_metrics=False,
+    enable_profiling=False,
+    enable_server_timing=False,
+    enable_streaming=False,
     log_with_context=True,
     path_prefix="/api",
 )
@@ -31,6 +39,11 @@ def configure_route_decorator(graph):
     By default, enables CORS support, assuming that service APIs are not exposed
     directly to browsers except when using API browsing tools.
 
+    If `enable_profiling` is set, requests may be profiled (see `microcosm_flask.profiling`).
+
+    If `enable_server_timing` is set, phase timings recorded by conventions are returned
+    in a `Server-Timing` response header.
+
     Usage:
 
         @graph.route(ns.collection_path, Operation.Search, ns)
@@ -40,6 +53,10 @@ def configure_route_decorator(graph):
     """
     # routes depends on converters
     graph.use(*graph.config.route.converters)
+    endpoint_registry = graph.endpoint_registry
+
+    if graph.config.route.enable_server_timing:
+        graph.app.after_request(add_server_timing)
 
     def route(path, operation, ns):
         """
@@ -67,16 +84,29 @@ def configure_route_decorator(graph):
             # set the opaque component data_func to look at the flask request context
             func = graph.opaque.initialize(graph.request_context)(func)
 
+            endpoint = ns.endpoint_for(operation)
+
+            if graph.config.route.enable_profiling:
+                func = graph.profiler.profile(endpoint, func)
+
             # keep audit decoration last (before registering the route) so that
             # errors raised by other decorators are captured in the audit trail
             if graph.config.route.enable_audit:
                 func = graph.audit(func)
 
+            # measure everything, including the audit trail
+            if graph.config.route.enable_metrics:
+                func = instrument(graph.metrics, endpoint, func)
+
             graph.app.route(
                 make_path(graph, path),
-                endpoint=ns.endpoint_for(operation),
+                endpoint=endpoint,
                 methods=[operation.value.method],
             )(func)
+
+            # index the new rule for discovery and swagger
+            rule = list(graph.app.url_map.iter_rules(endpoint))[-1]
+            endpoint_registry.register(rule, func)
             return func
         return decorator
     return route
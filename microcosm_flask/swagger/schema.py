@@ -8,6 +8,7 @@ from six import string_types
 from marshmallow import fields
 
 from microcosm_flask.fields import (
+    CursorField,
     EnumField,
     LanguageField,
     QueryStringList,
@@ -22,6 +23,7 @@ logger = getLogger("microcosm_flask.swagger")
 
 # see: https://github.com/marshmallow-code/apispec/blob/dev/apispec/ext/marshmallow/swagger.py
 FIELD_MAPPINGS = {
+    CursorField: ("string", None),
     EnumField: (None, None),
     LanguageField: ("string", "language"),
     QueryStringList: ("array", None),
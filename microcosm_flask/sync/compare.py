@@ -1,27 +1,40 @@
 """
-Compare resources from two YAML files.
+Compare resources from two YAML or JSONL files.
 
 Useful for validating that a sync in/out retains the same state.
 
+Files are streamed: only a digest of each resource is kept in memory.
+
 """
 from argparse import ArgumentParser
+from hashlib import sha1
+from json import dumps
+
+from microcosm_flask.sync.formats import load_path
+
 
-from yaml import load_all
+def digest(value):
+    return sha1(dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
 
 
-def to_dict(path):
+def to_digests(path):
     """
-    Normalize each resource as a dictionary for smarter comparison.
+    Normalize each resource as a digest for smarter comparison.
 
     Relies on link sorting performed by the pull script.
 
     """
-    with open(path) as file_:
-        return {
-            key: value
-            for dct in load_all(file_)
-            for key, value in dct.items()
-        }
+    return {
+        key: digest(value)
+        for key, value in load_path(path)
+    }
+
+
+def find(path, key):
+    for other_key, value in load_path(path):
+        if other_key == key:
+            return value
+    return None
 
 
 def main():
@@ -30,27 +43,27 @@ def main():
     parser.add_argument("right")
     args = parser.parse_args()
 
-    left, right = to_dict(args.left), to_dict(args.right)
+    left, right = to_digests(args.left), to_digests(args.right)
 
     left_keys = set(left.keys())
     right_keys = set(right.keys())
     if left_keys != right_keys:
-        print "Only in left:"  # noqa
+        print("Only in left:")  # noqa
         for key in left_keys - right_keys:
-            print " - {}".format(key)  # noqa
-        print "Only in right:"  # noqa
+            print(" - {}".format(key))  # noqa
+        print("Only in right:")  # noqa
         for key in right_keys - left_keys:
-            print " - {}".format(key)  # noqa
+            print(" - {}".format(key))  # noqa
         exit(1)
 
     for key in left.keys():
         if left[key] != right[key]:
-            print "Different values for: {}".format(key)  # noqa
-            print "-" * 20  # noqa
-            print "Left:"  # noqa
-            print left[key]  # noqa
-            print "Right:"  # noqa
-            print right[key]  # noqa
+            print("Different values for: {}".format(key))  # noqa
+            print("-" * 20)  # noqa
+            print("Left:")  # noqa
+            print(find(args.left, key))  # noqa
+            print("Right:")  # noqa
+            print(find(args.right, key))  # noqa
             exit(1)
 
 
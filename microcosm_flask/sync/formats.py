@@ -0,0 +1,114 @@
+"""
+Sync file formats.
+
+Resources are read from and written to files as (href, resource) pairs, either as:
+
+ -  YAML: one document per resource, using the libyaml (C) loader and dumper when available
+ -  JSONL (a `.jsonl` suffix): one JSON object per line, which is much faster to read and write
+
+Either format is streamed record by record and may be compressed with gzip (a `.gz` suffix)
+or zstd (a `.zst` suffix, which requires the `zstd` extra).
+
+"""
+from gzip import GzipFile
+from io import open as io_open, TextIOWrapper
+from json import dumps, loads
+
+from six import text_type
+from yaml import dump_all, load_all
+
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+try:
+    from zstandard import ZstdCompressor, ZstdDecompressor
+except ImportError:
+    ZstdCompressor = ZstdDecompressor = None
+
+
+COMPRESSION_SUFFIXES = (".gz", ".zst")
+
+
+def strip_compression_suffix(path):
+    for suffix in COMPRESSION_SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def is_jsonl(path):
+    return strip_compression_suffix(path).endswith(".jsonl")
+
+
+def open_file(path, mode="r"):
+    """
+    Open a (possibly compressed) file as text for reading ("r") or writing ("w").
+
+    """
+    if path.endswith(".gz"):
+        return TextIOWrapper(GzipFile(path, mode + "b"), encoding="utf-8")
+
+    if path.endswith(".zst"):
+        if ZstdCompressor is None:
+            raise Exception("zstd compression requires the `zstandard` package (the `zstd` extra)")
+        raw = io_open(path, mode + "b")
+        if mode == "r":
+            stream = ZstdDecompressor().stream_reader(raw)
+        else:
+            stream = ZstdCompressor().stream_writer(raw)
+        return TextIOWrapper(stream, encoding="utf-8")
+
+    return io_open(path, mode, encoding="utf-8")
+
+
+def load_yaml(source):
+    for dct in load_all(source, Loader=SafeLoader):
+        for item in dct.items():
+            yield item
+
+
+def dump_yaml(inputs, destination):
+    # emit text (rather than utf-8 encoded bytes, as on python 2) for text streams
+    dump_all(
+        ({href: resource} for href, resource in inputs),
+        destination,
+        Dumper=SafeDumper,
+        encoding=None,
+    )
+
+
+def load_jsonl(source):
+    for line in source:
+        if not line.strip():
+            continue
+        for item in loads(line).items():
+            yield item
+
+
+def dump_jsonl(inputs, destination):
+    for href, resource in inputs:
+        destination.write(text_type(dumps({href: resource}, sort_keys=True)))
+        destination.write(u"\n")
+
+
+def load_path(path):
+    """
+    Stream (href, resource) pairs from a file in the format implied by its path.
+
+    """
+    load = load_jsonl if is_jsonl(path) else load_yaml
+    with open_file(path) as file_:
+        for item in load(file_):
+            yield item
+
+
+def dump_path(inputs, path):
+    """
+    Write (href, resource) pairs to a file in the format implied by its path.
+
+    """
+    dump = dump_jsonl if is_jsonl(path) else dump_yaml
+    with open_file(path, "w") as file_:
+        dump(inputs, file_)
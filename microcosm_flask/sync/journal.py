@@ -0,0 +1,146 @@
+"""
+Checkpoint journal for resumable syncs.
+
+The journal is a SQLite database (in a `--state-dir`) that records:
+
+ -  the crawl frontier: hrefs that have been discovered but not yet fetched
+ -  the crawled hrefs, along with the resources they contained
+ -  the hrefs of resources whose push has been acknowledged
+
+A restarted sync resumes the crawl from the frontier, re-emits the crawled resources, and
+skips resources that were already pushed. The journal is removed once a sync completes.
+
+"""
+from json import dumps, loads
+from logging import getLogger
+from os import makedirs, remove
+from os.path import exists, join
+from sqlite3 import connect
+from threading import Lock
+
+
+logger = getLogger("sync.journal")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync (input TEXT NOT NULL, output TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS frontier (href TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS crawled (href TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS resources (href TEXT PRIMARY KEY, resource TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS pushed (href TEXT PRIMARY KEY);
+"""
+
+
+class Journal(object):
+    """
+    Record the progress of a sync.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.connection = connect(path, check_same_thread=False)
+        # a write-ahead log avoids syncing to disk on every commit (at the risk of losing the
+        # last few commits on power loss, which only means repeating some work)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, state_dir, input, output):
+        """
+        Open the journal for a sync from input to output, which must match a resumed sync.
+
+        """
+        if not exists(state_dir):
+            makedirs(state_dir)
+
+        journal = cls(join(state_dir, "sync.db"))
+        with journal.lock, journal.connection:
+            row = journal.connection.execute("SELECT input, output FROM sync").fetchone()
+            if row is None:
+                journal.connection.execute("INSERT INTO sync VALUES (?, ?)", (input, output))
+
+        if row is None:
+            return journal
+        if tuple(row) != (input, output):
+            journal.close()
+            raise Exception("State dir {} belongs to a sync from {} to {}".format(state_dir, *row))
+
+        logger.info("Resuming sync from: {}".format(journal.path))
+        return journal
+
+    def frontier(self):
+        return self.select_hrefs("frontier")
+
+    def crawled(self):
+        return self.select_hrefs("crawled")
+
+    def pushed(self):
+        return set(self.select_hrefs("pushed"))
+
+    def resources(self, chunk_size=1000):
+        """
+        Iterate over crawled (href, resource) pairs, in crawl order.
+
+        Resources are read in chunks (by rowid) so that they are never all held in memory.
+
+        """
+        rowid = 0
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    "SELECT rowid, href, resource FROM resources WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (rowid, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, href, resource in rows:
+                yield href, loads(resource)
+
+    def record_frontier(self, hrefs):
+        with self.lock, self.connection:
+            self.insert_hrefs("frontier", hrefs)
+
+    def record_crawl(self, href, resources, hrefs):
+        """
+        Record that an href was fetched, yielding resources and hrefs to fetch, atomically.
+
+        """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM frontier WHERE href = ?", (href,))
+            self.insert_hrefs("crawled", [href])
+            self.insert_hrefs("frontier", hrefs)
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?)",
+                [
+                    (resource_href, dumps(resource))
+                    for resource_href, resource in resources
+                ],
+            )
+
+    def record_push(self, hrefs):
+        with self.lock, self.connection:
+            self.insert_hrefs("pushed", hrefs)
+
+    def close(self):
+        self.connection.close()
+
+    def remove(self):
+        """
+        Discard the journal (e.g. after a sync completes).
+
+        """
+        self.close()
+        remove(self.path)
+
+    def select_hrefs(self, table):
+        with self.lock:
+            rows = self.connection.execute("SELECT href FROM {} ORDER BY rowid".format(table)).fetchall()
+        return [href for href, in rows]
+
+    def insert_hrefs(self, table, hrefs):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO {} VALUES (?)".format(table),
+            [(href,) for href in hrefs],
+        )
@@ -9,6 +9,7 @@ from argparse import ArgumentParser
 from logging import basicConfig, DEBUG, ERROR, getLogger, INFO, WARN
 import re
 
+from microcosm_flask.sync.journal import Journal
 from microcosm_flask.sync.pull import pull
 from microcosm_flask.sync.push import push
 from microcosm_flask.sync.toposort import toposorted
@@ -65,6 +66,40 @@ def parse_args():
     parser.add_argument(
         "--enable-sessions",
         action="store_true",
+        help="Reuse connections when pushing to a URL; concurrent pushes always reuse connections",
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=1,
+        help="Number of resources to fetch concurrently when pulling from a URL",
+    )
+    parser.add_argument(
+        "--push-concurrency",
+        type=int,
+        default=1,
+        help="Number of batches to push concurrently when pushing to a URL",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=2,
+        help="Number of attempts to push a batch on connection and gateway errors",
+    )
+    parser.add_argument(
+        "--spill-threshold",
+        type=int,
+        default=10000,
+        help="Number of resources awaiting their parents to keep in memory before spilling to disk",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        help="Directory for spilled resources (defaults to a temporary directory)",
+    )
+    parser.add_argument(
+        "--state-dir",
+        help="Directory for a checkpoint journal; an interrupted sync resumes from its journal",
     )
     parser.add_argument(
         "input",
@@ -90,6 +125,13 @@ def set_relation_patterns(args):
     ]
 
 
+def set_journal(args):
+    if args.state_dir:
+        args.journal = Journal.open(args.state_dir, args.input, args.output)
+    else:
+        args.journal = None
+
+
 def set_verbosity(args):
     verbosity = min(args.verbosity, 3)
     level = {0: ERROR, 1: WARN, 2: INFO, 3: DEBUG}.get(verbosity, WARN)
@@ -103,5 +145,9 @@ def main():
     args = parse_args()
     set_relation_patterns(args)
     set_verbosity(args)
+    set_journal(args)
     data = pull(args)
-    push(args, toposorted(data))
+    push(args, toposorted(data, max_nodes=args.spill_threshold, spill_dir=args.spill_dir))
+    if args.journal is not None:
+        # the sync is complete; a later sync starts over
+        args.journal.remove()
@@ -3,10 +3,15 @@ Pull resource definitions from an input source.
 
 """
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
 from sys import stdin
+from threading import local
 
-from requests import get
-from yaml import load_all
+from requests import Session
+from requests.adapters import HTTPAdapter
+from six.moves.queue import Queue
+
+from microcosm_flask.sync.formats import load_path, load_yaml
 
 
 logger = getLogger("sync.pull")
@@ -54,42 +59,180 @@ def sort_links(resource):
     return resource
 
 
-def pull_json(args, base_url):
+class Spider(object):
     """
-    Pull JSON resources by spidering a base url.
+    Track which resources have been seen and which links to follow while spidering.
 
     """
-    exclude_first = args.exclude_first
-    stack = [base_url]
+    def __init__(self, args):
+        self.relation_patterns = args.relation_patterns
+        self.exclude_first = args.exclude_first
+        self.seen = set()
 
-    seen = set()
-    while stack:
-        uri = stack.pop()
+    def follow(self, href, relation):
+        """
+        Decide whether to fetch a link (once).
+
+        """
+        if href in self.seen or not any(pattern.match(relation) for pattern in self.relation_patterns):
+            return False
+        self.seen.add(href)
+        return True
+
+    def visit(self, data):
+        """
+        Process a fetched resource.
+
+        :returns: a list of (href, resource) pairs to emit and a list of hrefs to fetch
 
-        logger.info("Fetching resource URI: {}".format(uri))
-        response = get(uri)
-        response.raise_for_status()
-        data = response.json()
+        """
+        resources, hrefs = [], []
 
         for href, resource in iter_resources(data):
-            if exclude_first:
+            if self.exclude_first:
                 # skipping the first resource - if it's a discovery resource - avoids
                 # pushing back state that cannot be persisted
-                exclude_first = False
+                self.exclude_first = False
                 continue
             sort_links(resource)
             for relation, links in iter_links(resource):
-                if href not in seen and any(pattern.match(relation) for pattern in args.relation_patterns):
-                    seen.add(href)
-                    stack.append(href)
-            yield href, resource
+                if self.follow(href, relation):
+                    hrefs.append(href)
+            resources.append((href, resource))
 
         for relation, link in iter_links(data):
-            href = link["href"]
             # follow top-level search links and pagination next links
-            if href not in seen and any(pattern.match(relation) for pattern in args.relation_patterns):
-                seen.add(href)
-                stack.append(href)
+            if self.follow(link["href"], relation):
+                hrefs.append(link["href"])
+
+        return resources, hrefs
+
+
+def make_session(pool_size=1):
+    """
+    Create an HTTP session that keeps (up to `pool_size`) connections alive per host.
+
+    """
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_json(session, uri):
+    logger.info("Fetching resource URI: {}".format(uri))
+    response = session.get(uri)
+    response.raise_for_status()
+    return response.json()
+
+
+def resume_crawl(spider, journal, base_url):
+    """
+    Restore the state of a crawl from a journal (if any).
+
+    :returns: the previously crawled (href, resource) pairs and the hrefs to fetch
+
+    """
+    if journal is None:
+        return [], [base_url]
+
+    crawled, frontier = journal.crawled(), journal.frontier()
+    if not crawled and not frontier:
+        journal.record_frontier([base_url])
+        return [], [base_url]
+
+    logger.info("Resuming crawl of {} resources after {} resources".format(len(frontier), len(crawled)))
+    spider.seen.update(crawled)
+    spider.seen.update(frontier)
+    if crawled:
+        spider.exclude_first = False
+    return journal.resources(), frontier
+
+
+def pull_json(args, base_url):
+    """
+    Pull JSON resources by spidering a base url.
+
+    If `args.concurrency` is greater than one, resources are fetched concurrently.
+
+    If `args.journal` is set, the crawl is recorded in (and resumed from) the journal.
+
+    """
+    concurrency = getattr(args, "concurrency", 1)
+    if concurrency > 1:
+        for href, resource in pull_json_concurrently(args, base_url, concurrency):
+            yield href, resource
+        return
+
+    journal = getattr(args, "journal", None)
+    spider = Spider(args)
+    session = make_session()
+    crawled, stack = resume_crawl(spider, journal, base_url)
+
+    for href, resource in crawled:
+        yield href, resource
+
+    while stack:
+        uri = stack.pop()
+        resources, hrefs = spider.visit(fetch_json(session, uri))
+        if journal is not None:
+            journal.record_crawl(uri, resources, hrefs)
+        stack.extend(hrefs)
+        for href, resource in resources:
+            yield href, resource
+
+
+def pull_json_concurrently(args, base_url, concurrency):
+    """
+    Pull JSON resources by spidering a base url with a pool of workers.
+
+    Resources are emitted as they arrive (and so in no particular order).
+
+    Each worker uses its own session because `requests.Session` is not thread-safe.
+
+    """
+    journal = getattr(args, "journal", None)
+    spider = Spider(args)
+    pool = ThreadPool(processes=concurrency)
+    results = Queue()
+    sessions = local()
+
+    def fetch(uri):
+        try:
+            session = getattr(sessions, "session", None)
+            if session is None:
+                session = sessions.session = make_session()
+            results.put((uri, fetch_json(session, uri), None))
+        except Exception as error:
+            results.put((uri, None, error))
+
+    crawled, frontier = resume_crawl(spider, journal, base_url)
+    for href in frontier:
+        pool.apply_async(fetch, (href,))
+    pending = len(frontier)
+
+    try:
+        for href, resource in crawled:
+            yield href, resource
+
+        while pending:
+            uri, data, error = results.get()
+            pending -= 1
+            if error is not None:
+                raise error
+
+            resources, hrefs = spider.visit(data)
+            if journal is not None:
+                journal.record_crawl(uri, resources, hrefs)
+            for href in hrefs:
+                pool.apply_async(fetch, (href,))
+            pending += len(hrefs)
+
+            for href, resource in resources:
+                yield href, resource
+    finally:
+        pool.terminate()
 
 
 def pull_yaml(args, source):
@@ -97,9 +240,8 @@ def pull_yaml(args, source):
     Pull YAML resources from a file-like object.
 
     """
-    for dct in load_all(source):
-        for item in dct.items():
-            yield item
+    for href, resource in load_yaml(source):
+        yield href, resource
 
 
 def pull(args):
@@ -112,6 +254,6 @@ def pull(args):
         for href, resource in pull_json(args, args.input):
             yield href, resource
     else:
-        with open(args.input) as file_:
-            for href, resource in pull_yaml(args, file_):
-                yield href, resource
+        # YAML or JSONL (and possibly compressed) depending on the path
+        for href, resource in load_path(args.input):
+            yield href, resource
@@ -4,17 +4,29 @@ Push resource definitions to an output destination.
 """
 from json import dumps
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
+from random import uniform
 from sys import stdout
+from threading import local
+from time import sleep
 
 import requests
 from requests.exceptions import ConnectionError, HTTPError
+from six.moves.queue import Queue
 from six.moves.urllib.parse import urlparse, urlunparse
-from yaml import safe_dump_all
+
+from microcosm_flask.sync.formats import dump_path, dump_yaml
+from microcosm_flask.sync.pull import make_session
+from microcosm_flask.sync.toposort import iter_parents
 
 
 logger = getLogger("sync.push")
 
 
+# gateway errors are assumed to be transient
+RETRYABLE_STATUS_CODES = (502, 503, 504)
+
+
 def push_yaml(inputs, destination):
     """
     Write inputs to destination as YAML.
@@ -23,49 +35,169 @@ def push_yaml(inputs, destination):
     :param destination: a writable file-like object
 
     """
-    safe_dump_all(({href: resource} for href, resource in inputs), destination)
+    dump_yaml(inputs, destination)
 
 
-def push_json(inputs, base_url, batch_size, enable_sessions=False,  keep_instance_path=False, max_attempts=2):
+def push_json(inputs,
+              base_url,
+              batch_size,
+              enable_sessions=False,
+              keep_instance_path=False,
+              max_attempts=2,
+              concurrency=1,
+              journal=None):
     """
     Write inputs to remote URL as JSON.
 
-    Future implementations could perform paginated PATCH requests to a collection URI
-    if our conventions support it.
+    If `concurrency` is greater than one, batches are pushed in parallel (see
+    `push_json_concurrently`); concurrent pushes always use (per-worker) sessions, so
+    `enable_sessions` only applies to serial pushes.
+
+    If a `journal` is given, resources that it records as pushed are skipped and acknowledged
+    pushes are recorded.
 
     """
+    if journal is not None:
+        pushed = journal.pushed()
+        if pushed:
+            logger.info("Skipping {} pushed resources".format(len(pushed)))
+        inputs = (
+            (href, resource)
+            for href, resource in inputs
+            if href not in pushed
+        )
+
+    if concurrency > 1:
+        return push_json_concurrently(
+            inputs,
+            base_url,
+            batch_size,
+            concurrency,
+            keep_instance_path,
+            max_attempts,
+            journal,
+        )
+
     # either use a session or use plain requests
     session_factory = requests.Session if enable_sessions else lambda: requests
 
     session = session_factory()
     for uri, resources in iter_json_batches(inputs, base_url, batch_size, keep_instance_path):
-        # retry on connection failures
-        last_error = None
-        for attempt in range(max_attempts):
-            try:
-                if batch_size == 1:
-                    push_resource_json(session, uri, resources[0])
-                else:
-                    push_resource_json_batch(session, uri, resources)
-            except ConnectionError as error:
-                logger.info("Connection error for uri: {}: {}".format(uri, error))
-                # on connection failure, recreate the session
-                session = session_factory()
-                last_error = error
-                continue
-            except HTTPError as error:
-                if error.response.status_code in (504, 502):
-                    logger.info("HTTP error for uri: {}: {}".format(uri, error))
-                    # on connection failure, recreate the session
-                    session = session_factory()
-                    last_error = error
-                    continue
-                raise
+        session = push_with_retries(session_factory, session, uri, resources, batch_size, max_attempts)
+        if journal is not None:
+            journal.record_push(iter_hrefs(resources))
+
+
+def push_json_concurrently(inputs,
+                           base_url,
+                           batch_size,
+                           concurrency,
+                           keep_instance_path=False,
+                           max_attempts=2,
+                           journal=None):
+    """
+    Write inputs to remote URL as JSON, pushing up to `concurrency` batches at a time.
+
+    Inputs are expected in dependency order (see `toposorted`); a batch is not pushed until
+    every parent of its resources that is being pushed has been acknowledged.
+
+    Each worker keeps its own session alive (and recreates it after failures) because
+    `requests.Session` is not thread-safe.
+
+    """
+    pool = ThreadPool(processes=concurrency)
+    results = Queue()
+    # hrefs of resources that have been sent but not acknowledged
+    unacknowledged = set()
+    sessions = local()
+
+    def new_session():
+        sessions.session = make_session()
+        return sessions.session
+
+    def push_batch(uri, resources, hrefs):
+        try:
+            session = getattr(sessions, "session", None) or new_session()
+            push_with_retries(new_session, session, uri, resources, batch_size, max_attempts)
+        except Exception as error:
+            results.put((hrefs, error))
+        else:
+            results.put((hrefs, None))
+
+    def acknowledge():
+        hrefs, error = results.get()
+        if error is not None:
+            raise error
+        unacknowledged.difference_update(hrefs)
+        if journal is not None:
+            journal.record_push(hrefs)
+
+    in_flight = 0
+    try:
+        for uri, resources in iter_json_batches(inputs, base_url, batch_size, keep_instance_path):
+            hrefs = list(iter_hrefs(resources))
+            parents = set(
+                parent_href
+                for resource in resources
+                for parent_href in iter_parents(resource)
+            )
+
+            # wait for a free worker and for the batch's parents
+            while in_flight >= concurrency or not parents.isdisjoint(unacknowledged):
+                acknowledge()
+                in_flight -= 1
+
+            unacknowledged.update(hrefs)
+            pool.apply_async(push_batch, (uri, resources, hrefs))
+            in_flight += 1
+
+        while in_flight:
+            acknowledge()
+            in_flight -= 1
+    finally:
+        pool.terminate()
+
+
+def iter_hrefs(resources):
+    for resource in resources:
+        yield resource["_links"]["self"]["href"]
+
+
+def is_retryable(error):
+    if isinstance(error, HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, ConnectionError)
+
+
+def backoff_delay(attempt, base=0.1, cap=10.0):
+    """
+    Compute a retry delay using exponential backoff with (full) jitter.
+
+    """
+    return uniform(0, min(cap, base * 2 ** attempt))
+
+
+def push_with_retries(session_factory, session, uri, resources, batch_size, max_attempts):
+    """
+    Push a batch of resources, retrying (after a backoff) on connection and gateway errors.
+
+    :returns: the session, which is recreated after failures
+
+    """
+    for attempt in range(max_attempts):
+        try:
+            if batch_size == 1:
+                push_resource_json(session, uri, resources[0])
             else:
-                break
+                push_resource_json_batch(session, uri, resources)
+        except (ConnectionError, HTTPError) as error:
+            if not is_retryable(error) or attempt + 1 >= max_attempts:
+                raise
+            logger.info("Retrying uri: {}: {}".format(uri, error))
+            session = session_factory()
+            sleep(backoff_delay(attempt))
         else:
-            # If reached here, all attempts were unsuccessful - raise last error encountered
-            raise last_error
+            return session
 
 
 def iter_json_batches(inputs, base_url, batch_size, keep_instance_path):
@@ -164,7 +296,8 @@ def push(args, inputs):
 
     If the destination is "-", YAML is written to stdout.
     If the destination has a http prefix, JSON is written to a URL.
-    Otherwise, YAML is written to a local file.
+    Otherwise, YAML or JSONL (if the destination has a `.jsonl` suffix) is written to a local
+    file, which is compressed if the destination has a `.gz` or `.zst` suffix.
 
     """
     logger.info("Pushing resources to: {}".format(args.output))
@@ -172,7 +305,15 @@ def push(args, inputs):
     if args.output == "-":
         push_yaml(inputs, stdout)
     elif args.output.startswith("http"):
-        push_json(inputs, args.output, args.batch_size, args.enable_sessions, args.keep_instance_path)
+        push_json(
+            inputs,
+            args.output,
+            args.batch_size,
+            args.enable_sessions,
+            args.keep_instance_path,
+            max_attempts=args.max_attempts,
+            concurrency=args.push_concurrency,
+            journal=getattr(args, "journal", None),
+        )
     else:
-        with open(args.output, "w") as file_:
-            push_yaml(inputs, file_)
+        dump_path(inputs, args.output)
@@ -1,12 +1,20 @@
 """
 Topological sort.
 
+Resources are sorted incrementally (using Kahn's algorithm) so that they may be pushed while
+they are still being pulled: a resource is released as soon as all of its parents have been
+released. Parents that never appear in the input are only known to be missing once the input
+is exhausted, so their children are held until then.
+
+Held resources are kept in memory up to a threshold and then spilled to disk (via `shelve`).
+
 """
-from collections import defaultdict
+from collections import defaultdict, deque
 from logging import getLogger
-
-TEMPORARY = object()
-VISITED = object()
+from os.path import join
+from shelve import open as open_shelf
+from shutil import rmtree
+from tempfile import mkdtemp
 
 
 logger = getLogger("sync.toposort")
@@ -23,43 +31,143 @@ def iter_parents(resource):
             yield links["href"]
 
 
-def toposorted(inputs):
+class TopologicalScheduler(object):
     """
-    Perform a topological sort on the input (href, resource) tuples.
+    Release (href, resource) pairs in dependency order as they are added.
 
-    Uses a DFS.
+    Only hrefs and the edges of held resources are kept in memory indefinitely; at most
+    `max_nodes` held resources are kept in memory, the rest are spilled to disk.
 
     """
-    sorted_items = []
-
-    visited = {}
-
-    nodes = {
-        href: resource
-        for href, resource in inputs
-    }
-
-    children = defaultdict(list)
-    for href, resource in nodes.items():
-        for parent_href in iter_parents(resource):
-            children[parent_href].append(href)
-
-    def visit(href, resource):
-        if visited.get(href) == VISITED:
+    def __init__(self, max_nodes=None, spill_dir=None):
+        """
+        :param max_nodes: the number of held resources to keep in memory (or None for no limit)
+        :param spill_dir: a directory for spilled resources (defaults to a temporary directory)
+
+        """
+        self.max_nodes = max_nodes
+        self.spill_dir = spill_dir
+        self.shelf = None
+        self.temporary_dir = None
+        # hrefs of resources that have been added (and released, unless pending)
+        self.seen = set()
+        # held resources: href to the number of parents that have not been released
+        self.pending = {}
+        # held resources: parent href to child hrefs
+        self.children = defaultdict(list)
+        # held resources that are kept in memory
+        self.resident = {}
+
+    def add(self, href, resource):
+        """
+        Add a resource.
+
+        :returns: an iterable of released (href, resource) pairs
+
+        """
+        if href in self.seen:
+            logger.debug("Ignoring duplicate resource: {}".format(href))
+            return iter(())
+        self.seen.add(href)
+
+        parent_hrefs = set(
+            parent_href
+            for parent_href in iter_parents(resource)
+            if parent_href not in self.seen or parent_href in self.pending
+        )
+        if not parent_hrefs:
+            return self.release(href, resource)
+
+        self.pending[href] = len(parent_hrefs)
+        for parent_href in parent_hrefs:
+            self.children[parent_href].append(href)
+        self.hold(href, resource)
+        return iter(())
+
+    def finish(self):
+        """
+        Release held resources once the input is exhausted.
+
+        Parents that were never added are treated as released.
+
+        :returns: an iterable of released (href, resource) pairs
+
+        """
+        missing = [
+            parent_href
+            for parent_href in self.children
+            if parent_href not in self.seen
+        ]
+        if missing:
+            logger.info("Found {} parents missing from the input".format(len(missing)))
+
+        for parent_href in missing:
+            for item in self.release_children(parent_href):
+                yield item
+
+        if self.pending:
+            raise Exception("Found cycle at {}".format(next(iter(self.pending))))
+
+    def close(self):
+        if self.shelf is not None:
+            self.shelf.close()
+            self.shelf = None
+        if self.temporary_dir is not None:
+            rmtree(self.temporary_dir, ignore_errors=True)
+            self.temporary_dir = None
+
+    def hold(self, href, resource):
+        if self.max_nodes is None or len(self.resident) < self.max_nodes:
+            self.resident[href] = resource
             return
-        if visited.get(href) == TEMPORARY:
-            raise Exception("Found cycle at {}".format(href))
-
-        visited[href] = TEMPORARY
-        for child_href in children[href]:
-            visit(child_href, nodes[child_href])
-        visited[href] = VISITED
-
-        sorted_items.append((href, resource))
 
-    logger.info("Toposorting {} resources".format(len(nodes)))
+        if self.shelf is None:
+            spill_dir = self.spill_dir
+            if spill_dir is None:
+                spill_dir = self.temporary_dir = mkdtemp(prefix="sync-")
+            logger.info("Spilling resources to disk: {}".format(spill_dir))
+            self.shelf = open_shelf(join(spill_dir, "toposort"), flag="n")
+        self.shelf[str(href)] = resource
+
+    def unhold(self, href):
+        if href in self.resident:
+            return self.resident.pop(href)
+        return self.shelf.pop(str(href))
+
+    def release(self, href, resource):
+        """
+        Release a resource and (iteratively) any held resources that were waiting for it.
+
+        """
+        yield href, resource
+        for item in self.release_children(href):
+            yield item
+
+    def release_children(self, href):
+        queue = deque([href])
+        while queue:
+            for child_href in self.children.pop(queue.popleft(), []):
+                self.pending[child_href] -= 1
+                if self.pending[child_href]:
+                    continue
+                del self.pending[child_href]
+                yield child_href, self.unhold(child_href)
+                queue.append(child_href)
+
+
+def toposorted(inputs, max_nodes=None, spill_dir=None):
+    """
+    Perform a topological sort on the input (href, resource) tuples.
 
-    for href, resource in nodes.items():
-        visit(href, resource)
+    Resources are yielded as soon as their parents have been yielded (see `TopologicalScheduler`).
 
-    return reversed(sorted_items)
+    """
+    scheduler = TopologicalScheduler(max_nodes=max_nodes, spill_dir=spill_dir)
+    try:
+        for href, resource in inputs:
+            for item in scheduler.add(href, resource):
+                yield item
+        for item in scheduler.finish():
+            yield item
+    finally:
+        scheduler.close()
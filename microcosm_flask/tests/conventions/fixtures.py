@@ -126,8 +126,10 @@ def person_replace(person_id, **kwargs):
 
 def person_update(person_id, **kwargs):
     if person_id == PERSON_ID_1:
-        for key, value in kwargs.items():
-            setattr(PERSON_1, key, value)
-        return PERSON_1
+        return Person(
+            id=PERSON_1.id,
+            first_name=kwargs.get("first_name", PERSON_1.first_name),
+            last_name=kwargs.get("last_name", PERSON_1.last_name),
+        )
     else:
         return None
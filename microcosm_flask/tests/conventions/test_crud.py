@@ -11,11 +11,15 @@ from hamcrest import (
     is_,
 )
 
+from marshmallow import fields, Schema
+from mock import patch
 from microcosm.api import create_object_graph
 from microcosm_flask.conventions.crud import configure_crud
+from microcosm_flask.conventions.encoding import remove_null_values
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.operations import Operation
-from microcosm_flask.paging import PageSchema
+from microcosm_flask.fields.cursor_field import encode_cursor
+from microcosm_flask.paging import CursorPageSchema, OptionalCountPageSchema, PageSchema
 from microcosm_flask.tests.conventions.fixtures import (
     Address,
     AddressSchema,
@@ -58,8 +62,15 @@ ADDRESS_MAPPINGS = {
 
 class TestCrud(object):
 
+    def loader(self, metadata):
+        """
+        Configuration for the object graph; subclasses override to run the same tests differently.
+
+        """
+        return dict()
+
     def setup(self):
-        self.graph = create_object_graph(name="example", testing=True)
+        self.graph = create_object_graph(name="example", testing=True, loader=self.loader)
         person_ns = Namespace(subject=Person)
         address_ns = Namespace(subject=Address, path=person_ns.instance_path)
         configure_crud(self.graph, Person, PERSON_MAPPINGS)
@@ -219,6 +230,38 @@ class TestCrud(object):
             },
         })
 
+    def test_retrieve_skip_null_omits_nulls_while_dumping(self):
+        ns = Namespace(subject=Person, version="v2")
+        configure_crud(self.graph, ns, {
+            Operation.Retrieve: (
+                lambda person_id: Person(id=person_id, first_name="Alice", last_name=None),
+                PersonSchema(),
+            ),
+        })
+
+        with patch(
+            "microcosm_flask.conventions.encoding.remove_null_values",
+            wraps=remove_null_values,
+        ) as mocked_remove_null_values:
+            response = self.client.get(
+                "/api/v2/person/{}".format(PERSON_ID_1),
+                headers={"X-Response-Skip-Null": "true"},
+            )
+        # the dumped person is not revisited in a second pass
+        assert_that(
+            [args[0] for args, kwargs in mocked_remove_null_values.call_args_list if "id" in args[0]],
+            is_(equal_to([])),
+        )
+        self.assert_response(response, 200, {
+            "id": str(PERSON_ID_1),
+            "firstName": "Alice",
+            "_links": {
+                "self": {
+                    "href": "http://localhost/api/person/{}".format(PERSON_ID_1),
+                }
+            },
+        })
+
     def test_retrieve_not_found(self):
         uri = "/api/person/{}".format(PERSON_ID_2)
         response = self.client.get(uri)
@@ -276,3 +319,143 @@ class TestCrud(object):
         }
         response = self.client.patch(uri, data=dumps(request_data))
         self.assert_response(response, 404)
+
+
+class TestCompiledCrud(TestCrud):
+    """
+    Run the same tests using compiled response schemas.
+
+    """
+    def loader(self, metadata):
+        return dict(
+            route=dict(
+                compile_schemas=True,
+            ),
+        )
+
+
+class TestStreamingCrud(TestCrud):
+    """
+    Run the same tests using streamed search responses.
+
+    """
+    def loader(self, metadata):
+        return dict(
+            route=dict(
+                enable_streaming=True,
+            ),
+        )
+
+    def test_search_generator(self):
+        def search(offset, limit):
+            items = (
+                Person(id=PERSON_ID_1, first_name="Alice", last_name=None)
+                for _ in range(2)
+            )
+            return items, 2
+
+        ns = Namespace(subject=Person, version="v2")
+        configure_crud(self.graph, ns, {
+            Operation.Search: (search, PageSchema(), PersonSchema()),
+        })
+
+        response = self.graph.flask.test_client().get(
+            "/api/v2/person",
+            headers={"X-Response-Skip-Null": "true"},
+        )
+        assert_that(response.is_streamed, is_(equal_to(True)))
+        self.assert_response(response, 200, {
+            "count": 2,
+            "offset": 0,
+            "limit": 20,
+            "items": [{
+                "id": str(PERSON_ID_1),
+                "firstName": "Alice",
+                "_links": {
+                    "self": {
+                        "href": "http://localhost/api/person/{}".format(PERSON_ID_1),
+                    }
+                },
+            }] * 2,
+            "_links": {
+                "self": {
+                    "href": "http://localhost/api/v2/person?offset=0&limit=20",
+                }
+            }
+        })
+
+    def test_search_without_count_is_lazy(self):
+        produced = []
+
+        def search(offset, limit, count):
+            def generate():
+                for index in range(limit + 1):
+                    produced.append(index)
+                    yield Person(id=PERSON_ID_1, first_name="Alice", last_name=None)
+            return generate(), None
+
+        ns = Namespace(subject=Person, version="v2")
+        configure_crud(self.graph, ns, {
+            Operation.Search: (search, OptionalCountPageSchema(), PersonSchema()),
+        })
+
+        response = self.graph.flask.test_client().get(
+            "/api/v2/person?limit=2&count=false",
+            buffered=False,
+        )
+        assert_that(response.is_streamed, is_(equal_to(True)))
+
+        chunks = iter(response.response)
+        body = [next(chunks), next(chunks)]
+        # the first item is written before the rest of the page is read
+        assert_that(produced, is_(equal_to([0])))
+        body.extend(chunks)
+        # the rest of the page and one item of look-ahead are read
+        assert_that(produced, is_(equal_to([0, 1, 2])))
+
+        data = loads(b"".join(body).decode("utf-8"))
+        assert_that(data["count"], is_(equal_to(None)))
+        assert_that(len(data["items"]), is_(equal_to(2)))
+        assert_that(data["_links"]["next"]["href"], is_(equal_to(
+            "http://localhost/api/v2/person?offset=2&limit=2&count=false",
+        )))
+
+
+def test_search_by_cursor():
+    people = [Person(index, "First{}".format(index), "Last{}".format(index)) for index in range(5)]
+
+    def search_by_cursor(cursor, limit):
+        after = int(cursor[0]) if cursor else -1
+        return [person for person in people if person.id > after][:limit + 1], None
+
+    class PersonListSchema(Schema):
+        id = fields.Integer()
+        firstName = fields.String(attribute="first_name")
+
+    graph = create_object_graph(name="example", testing=True)
+    configure_crud(graph, Person, {
+        Operation.Search: (search_by_cursor, CursorPageSchema(), PersonListSchema()),
+    })
+    client = graph.flask.test_client()
+
+    response = client.get("/api/person?limit=2")
+    assert_that(response.status_code, is_(equal_to(200)))
+    data = loads(response.get_data().decode("utf-8"))
+    assert_that([item["id"] for item in data["items"]], is_(equal_to([0, 1])))
+    assert_that(data["cursor"], is_(equal_to(None)))
+    assert_that(data["count"], is_(equal_to(None)))
+    assert_that(data["_links"]["next"]["href"], is_(equal_to(
+        "http://localhost/api/person?cursor={}&limit=2".format(encode_cursor([1])),
+    )))
+
+    response = client.get("/api/person?cursor={}&limit=2".format(encode_cursor([3])))
+    data = loads(response.get_data().decode("utf-8"))
+    assert_that([item["id"] for item in data["items"]], is_(equal_to([4])))
+    assert_that(data["_links"], is_(equal_to({
+        "self": {
+            "href": "http://localhost/api/person?cursor={}&limit=2".format(encode_cursor([3])),
+        },
+    })))
+
+    response = client.get("/api/person?cursor=invalid")
+    assert_that(response.status_code, is_(equal_to(422)))
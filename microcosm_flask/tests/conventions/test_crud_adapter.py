@@ -0,0 +1,216 @@
+"""
+CRUD store adapter tests.
+
+"""
+from threading import Event
+from time import sleep
+
+from hamcrest import (
+    assert_that,
+    calling,
+    equal_to,
+    is_,
+    raises,
+)
+from mock import Mock
+from microcosm.api import create_object_graph
+from werkzeug.exceptions import Conflict, NotFound
+
+from microcosm_flask.conventions.crud_adapter import CRUDStoreAdapter
+from microcosm_flask.paging import CountMode
+
+
+class TestSearch(object):
+
+    def setup(self):
+        self.graph = create_object_graph(name="example", testing=True)
+        self.store = Mock(spec=["search", "count"])
+        self.store.search.return_value = ["1", "2", "3"]
+        self.store.count.return_value = 3
+        self.adapter = CRUDStoreAdapter(self.graph, self.store)
+
+    def test_exact_count(self):
+        assert_that(self.adapter.search(offset=0, limit=3, name="foo"), is_(equal_to((["1", "2", "3"], 3))))
+        self.store.search.assert_called_with(offset=0, limit=3, name="foo")
+        self.store.count.assert_called_with(name="foo")
+
+    def test_skip_count(self):
+        assert_that(
+            self.adapter.search(offset=0, limit=2, count=CountMode.skip),
+            is_(equal_to((["1", "2", "3"], None))),
+        )
+        self.store.search.assert_called_with(offset=0, limit=3)
+        assert_that(self.store.count.called, is_(equal_to(False)))
+
+    def test_estimate_count(self):
+        self.store.estimate_count = Mock(return_value=1000)
+        assert_that(
+            self.adapter.search(offset=0, limit=2, count=CountMode.estimate, name="foo"),
+            is_(equal_to((["1", "2", "3"], 1000))),
+        )
+        self.store.estimate_count.assert_called_with(name="foo")
+        assert_that(self.store.count.called, is_(equal_to(False)))
+
+    def test_search_by_cursor(self):
+        assert_that(
+            self.adapter.search_by_cursor(cursor=["1"], limit=2),
+            is_(equal_to((["1", "2", "3"], None))),
+        )
+        self.store.search.assert_called_with(cursor=["1"], limit=3)
+
+
+class TestConcurrentCount(object):
+
+    def setup(self):
+        self.graph = create_object_graph(name="example", testing=True)
+        self.store = Mock(spec=["search", "count"])
+        self.adapter = CRUDStoreAdapter(self.graph, self.store, concurrent_count=True, count_timeout=0.05)
+
+    def test_count_runs_concurrently(self):
+        counting = Event()
+
+        def count(**kwargs):
+            counting.set()
+            return 3
+
+        def search(**kwargs):
+            # only returns if the count was started concurrently
+            assert_that(counting.wait(1.0), is_(equal_to(True)))
+            return ["1", "2", "3"]
+
+        self.store.count.side_effect = count
+        self.store.search.side_effect = search
+
+        items, count = self.adapter.search(offset=0, limit=2, name="foo")
+        assert_that((list(items), count), is_(equal_to((["1", "2"], 3))))
+        self.store.search.assert_called_with(offset=0, limit=3, name="foo")
+        self.store.count.assert_called_with(name="foo")
+
+    def test_count_timeout(self):
+        self.store.count.side_effect = lambda **kwargs: sleep(0.5)
+        self.store.search.return_value = ["1", "2", "3"]
+
+        assert_that(self.adapter.search(offset=0, limit=2), is_(equal_to((["1", "2", "3"], None))))
+
+    def test_busy_count_threads_are_not_queued_behind(self):
+        finished = Event()
+        self.store.count.side_effect = lambda **kwargs: finished.wait(1.0)
+        self.store.search.return_value = ["1", "2", "3"]
+        adapter = CRUDStoreAdapter(self.graph, self.store, concurrent_count=True, count_timeout=0.05, pool_size=1)
+
+        # the first count times out but keeps running
+        assert_that(adapter.search(offset=0, limit=2), is_(equal_to((["1", "2", "3"], None))))
+        # the second count is omitted without waiting
+        assert_that(adapter.search(offset=0, limit=2), is_(equal_to((["1", "2", "3"], None))))
+        assert_that(self.store.count.call_count, is_(equal_to(1)))
+
+        finished.set()
+        adapter.pool.close()
+        adapter.pool.join()
+        assert_that(adapter.running_counts, is_(equal_to(0)))
+
+
+class Model(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+
+class TestUpdateBatch(object):
+
+    def setup(self):
+        self.graph = create_object_graph(name="example", testing=True)
+
+    def make_items(self):
+        return [dict(id=index, name="name{}".format(index)) for index in range(5)]
+
+    def test_replace_many(self):
+        store = Mock(spec=["model_class", "replace_many"])
+        store.model_class = Model
+        store.replace_many.side_effect = lambda models: models
+        adapter = CRUDStoreAdapter(self.graph, store)
+
+        result = adapter.update_batch(items=self.make_items())
+        assert_that(result["items"], is_(equal_to([Model(**item) for item in self.make_items()])))
+        assert_that(store.replace_many.call_count, is_(equal_to(1)))
+
+    def test_replace_many_returning_no_models(self):
+        store = Mock(spec=["model_class", "replace_many"])
+        store.model_class = Model
+        store.replace_many.return_value = []
+        adapter = CRUDStoreAdapter(self.graph, store)
+
+        result = adapter.update_batch(items=self.make_items())
+        assert_that(result["items"], is_(equal_to([])))
+
+    def test_replace_many_error(self):
+        store = Mock(spec=["model_class", "replace_many"])
+        store.model_class = Model
+        store.replace_many.side_effect = Conflict("Duplicate name")
+        adapter = CRUDStoreAdapter(self.graph, store)
+
+        try:
+            adapter.update_batch(items=self.make_items()[:2])
+        except Conflict as caught:
+            error = caught
+
+        assert_that(error.description, is_(equal_to("Could not update 2 items")))
+        assert_that(error.context["errors"], is_(equal_to([
+            dict(message="Duplicate name", code=409, index=0, id="0"),
+            dict(message="Duplicate name", code=409, index=1, id="1"),
+        ])))
+
+    def test_replace_one_at_a_time(self):
+        store = Mock(spec=["model_class", "replace"])
+        store.model_class = Model
+        store.replace.side_effect = lambda identifier, model: model
+        adapter = CRUDStoreAdapter(self.graph, store)
+
+        result = adapter.update_batch(items=self.make_items())
+        assert_that(result["items"], is_(equal_to([Model(**item) for item in self.make_items()])))
+        assert_that(store.replace.call_count, is_(equal_to(5)))
+
+    def test_item_error(self):
+        def replace(identifier, model):
+            if identifier in (2, 3):
+                raise NotFound("No such item: {}".format(identifier))
+            return model
+
+        store = Mock(spec=["model_class", "replace"])
+        store.model_class = Model
+        store.replace.side_effect = replace
+        adapter = CRUDStoreAdapter(self.graph, store)
+
+        assert_that(
+            calling(adapter.update_batch).with_args(items=self.make_items()),
+            raises(NotFound),
+        )
+        # replacement stops at the first failing item
+        assert_that(store.replace.call_count, is_(equal_to(3)))
+
+        try:
+            adapter.update_batch(items=self.make_items())
+        except NotFound as caught:
+            error = caught
+
+        assert_that(error.description, is_(equal_to("Could not update item 2 of 5 items")))
+        assert_that(error.context["errors"], is_(equal_to([
+            dict(message="No such item: 2", code=404, index=2, id="2"),
+        ])))
+
+    def test_item_error_without_id(self):
+        store = Mock(spec=["model_class", "replace"])
+        store.model_class = Model
+        store.replace.side_effect = NotFound("No such item")
+        adapter = CRUDStoreAdapter(self.graph, store)
+
+        try:
+            adapter.update_batch(items=[dict(id=None, name="name")])
+        except NotFound as caught:
+            error = caught
+
+        assert_that(error.context["errors"], is_(equal_to([
+            dict(message="No such item", code=404, index=0, id=None),
+        ])))
@@ -7,7 +7,9 @@ from json import loads
 from hamcrest import (
     assert_that,
     equal_to,
+    has_length,
     is_,
+    not_,
 )
 
 from microcosm.api import create_object_graph
@@ -41,3 +43,42 @@ def test_discovery():
             },
         }
     })))
+
+
+def test_discovery_is_cached():
+    graph = create_object_graph(name="example", testing=True)
+    graph.use("discovery_convention", "port_forwarding")
+
+    ns = Namespace("foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        pass
+
+    client = graph.flask.test_client()
+
+    response = client.get("/api/")
+    assert_that(response.status_code, is_(equal_to(200)))
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/", headers={"If-None-Match": etag})
+    assert_that(response.status_code, is_(equal_to(304)))
+
+    response = client.get("/api/?limit=10", headers={"X-Forwarded-Port": "8080"})
+    assert_that(response.status_code, is_(equal_to(200)))
+    assert_that(response.headers["ETag"], is_(not_(equal_to(etag))))
+    data = loads(response.get_data().decode("utf-8"))
+    assert_that(data["_links"]["self"], is_(equal_to({
+        "href": "http://localhost:8080/api/?offset=0&limit=10",
+    })))
+
+    other_ns = Namespace("bar")
+
+    @graph.route(other_ns.collection_path, Operation.Search, other_ns)
+    def search_bar():
+        pass
+
+    response = client.get("/api/", headers={"If-None-Match": etag})
+    assert_that(response.status_code, is_(equal_to(200)))
+    data = loads(response.get_data().decode("utf-8"))
+    assert_that(data["_links"]["search"], has_length(2))
@@ -3,16 +3,44 @@ Health check convention tests.
 
 """
 from json import loads
+from threading import Event
+from time import sleep
 
 from hamcrest import (
     assert_that,
     equal_to,
+    instance_of,
     is_,
 )
 
+from mock import patch
+
 from microcosm.api import create_object_graph
 
 
+def make_graph(**kwargs):
+    def loader(metadata):
+        return dict(
+            health_convention=kwargs,
+        )
+
+    graph = create_object_graph(name="example", testing=True, loader=loader)
+    graph.use("health_convention")
+    return graph
+
+
+def get_health(client):
+    """
+    Fetch health, checking (and removing) the latency of each check.
+
+    """
+    response = client.get("/api/health")
+    data = loads(response.get_data().decode("utf-8"))
+    for check in data.get("checks", {}).values():
+        assert_that(check.pop("latency"), is_(instance_of(float)))
+    return response.status_code, data
+
+
 def test_health_check():
     """
     Default health check returns OK.
@@ -44,9 +72,8 @@ def test_health_check_custom_check():
 
     graph.health_convention.checks["foo"] = lambda graph: None
 
-    response = client.get("/api/health")
-    assert_that(response.status_code, is_(equal_to(200)))
-    data = loads(response.get_data().decode("utf-8"))
+    status_code, data = get_health(client)
+    assert_that(status_code, is_(equal_to(200)))
     assert_that(data, is_(equal_to({
         "name": "example",
         "ok": True,
@@ -74,9 +101,8 @@ def test_health_check_custom_check_failed():
 
     graph.health_convention.checks["foo"] = fail
 
-    response = client.get("/api/health")
-    assert_that(response.status_code, is_(equal_to(503)))
-    data = loads(response.get_data().decode("utf-8"))
+    status_code, data = get_health(client)
+    assert_that(status_code, is_(equal_to(503)))
     assert_that(data, is_(equal_to({
         "name": "example",
         "ok": False,
@@ -87,3 +113,106 @@ def test_health_check_custom_check_failed():
             },
         },
     })))
+
+
+def test_health_check_timeout():
+    """
+    Should return 503 if a check does not complete in time, without waiting for it.
+
+    """
+    graph = make_graph(timeout=0.05)
+    client = graph.flask.test_client()
+
+    graph.health_convention.checks["slow"] = lambda graph: sleep(0.5)
+    graph.health_convention.checks["fast"] = lambda graph: None
+
+    response = client.get("/api/health")
+    assert_that(response.status_code, is_(equal_to(503)))
+    data = loads(response.get_data().decode("utf-8"))
+    assert_that(data["checks"]["fast"]["ok"], is_(equal_to(True)))
+    assert_that(data["checks"]["slow"], is_(equal_to({
+        "latency": 0.05,
+        "message": "timed out after 0.05s",
+        "ok": False,
+    })))
+
+
+def test_health_check_replaced_while_running():
+    """
+    Should not report the result of a running check after it has been replaced.
+
+    """
+    graph = make_graph(timeout=0.05)
+    client = graph.flask.test_client()
+    released = Event()
+
+    graph.health_convention.checks["foo"] = lambda graph: released.wait()
+    status_code, data = get_health(client)
+    assert_that(status_code, is_(equal_to(503)))
+
+    def fail(graph):
+        raise Exception("failure!")
+
+    graph.health_convention.checks["foo"] = fail
+    released.set()
+
+    status_code, data = get_health(client)
+    assert_that(status_code, is_(equal_to(503)))
+    assert_that(data["checks"]["foo"]["message"], is_(equal_to("failure!")))
+
+
+def test_health_check_cache_uses_monotonic_clock():
+    """
+    Should expire cached results by the monotonic clock (not the wall clock).
+
+    """
+    graph = make_graph(cache_ttl=1.0)
+    client = graph.flask.test_client()
+    calls = []
+
+    graph.health_convention.checks["foo"] = lambda graph: calls.append(graph)
+
+    with patch("microcosm_flask.conventions.health.clock", return_value=100.0):
+        get_health(client)
+        get_health(client)
+    assert_that(calls, is_(equal_to([graph])))
+
+    with patch("microcosm_flask.conventions.health.clock", return_value=101.5):
+        get_health(client)
+    assert_that(calls, is_(equal_to([graph, graph])))
+
+
+def test_health_check_cached():
+    """
+    Should reuse results within the cache TTL and serve stale results while refreshing.
+
+    """
+    graph = make_graph(cache_ttl=0.05, stale_ttl=60.0)
+    client = graph.flask.test_client()
+    calls = []
+
+    graph.health_convention.checks["foo"] = lambda graph: calls.append(graph)
+
+    for _ in range(3):
+        status_code, data = get_health(client)
+        assert_that(status_code, is_(equal_to(200)))
+    assert_that(calls, is_(equal_to([graph])))
+
+    sleep(0.1)
+
+    def fail(graph):
+        raise Exception("failure!")
+
+    graph.health_convention.checks["foo"] = fail
+
+    # stale results are served while the refresh runs
+    status_code, data = get_health(client)
+    assert_that(status_code, is_(equal_to(200)))
+
+    for _ in range(50):
+        if graph.health_convention.cached[1]["ok"] is False:
+            break
+        sleep(0.01)
+
+    status_code, data = get_health(client)
+    assert_that(status_code, is_(equal_to(503)))
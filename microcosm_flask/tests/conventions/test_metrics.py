@@ -0,0 +1,47 @@
+"""
+Metrics convention tests.
+
+"""
+from hamcrest import (
+    assert_that,
+    contains_string,
+    equal_to,
+    is_,
+)
+
+from microcosm.api import create_object_graph
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+
+
+def test_metrics():
+    def loader(metadata):
+        return dict(
+            route=dict(
+                enable_metrics=True,
+            ),
+        )
+
+    graph = create_object_graph(name="example", testing=True, loader=loader)
+    graph.use("metrics_convention")
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        """
+        Search for foo.
+
+        """
+        return "ok"
+
+    client = graph.flask.test_client()
+    assert_that(client.get("/api/foo").status_code, is_(equal_to(200)))
+
+    response = client.get("/api/metrics")
+    assert_that(response.status_code, is_(equal_to(200)))
+    assert_that(response.headers["Content-Type"], contains_string("text/plain"))
+
+    data = response.get_data().decode("utf-8")
+    assert_that(data, contains_string('http_requests_total{endpoint="foo.search.v1",status_code="200"} 1'))
+    assert_that(data, contains_string('http_response_size_bytes_count{endpoint="foo.search.v1"} 1'))
+    assert_that(graph.flask.view_functions["foo.search.v1"].__doc__, contains_string("Search for foo."))
@@ -0,0 +1,108 @@
+"""
+Profiling convention tests.
+
+"""
+from json import loads
+from time import time
+
+from hamcrest import (
+    assert_that,
+    contains,
+    contains_string,
+    equal_to,
+    has_entries,
+    is_,
+)
+
+from microcosm.api import create_object_graph
+from microcosm_flask.basic_auth import encode_basic_auth
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+from microcosm_flask.profiling import PROFILE_HEADER, sign_request
+
+
+def make_graph(**kwargs):
+    def loader(metadata):
+        return dict(
+            profiler=dict(
+                secret="profiling-secret",
+                **kwargs
+            ),
+            route=dict(
+                enable_profiling=True,
+            ),
+        )
+
+    graph = create_object_graph(name="example", testing=True, loader=loader)
+    graph.use("discovery_convention", "profiling_convention")
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        return "ok"
+
+    return graph
+
+
+class TestProfiling(object):
+
+    def setup(self):
+        self.graph = make_graph()
+        self.client = self.graph.flask.test_client()
+        self.headers = dict(Authorization=encode_basic_auth("default", "secret"))
+
+    def search_profiles(self):
+        response = self.client.get("/api/profile", headers=self.headers)
+        assert_that(response.status_code, is_(equal_to(200)))
+        return loads(response.get_data().decode("utf-8"))["items"]
+
+    def test_unsigned_requests_are_not_profiled(self):
+        self.client.get("/api/foo")
+        self.client.get("/api/foo", headers={PROFILE_HEADER: "invalid"})
+        assert_that(self.search_profiles(), is_(equal_to([])))
+
+    def test_signed_request_is_profiled(self):
+        signature = sign_request("profiling-secret", "GET", "/api/foo")
+        response = self.client.get("/api/foo", headers={PROFILE_HEADER: signature})
+        assert_that(response.status_code, is_(equal_to(200)))
+
+        profiles = self.search_profiles()
+        assert_that(profiles, contains(has_entries(
+            endpoint="foo.search.v1",
+            format="pstats",
+        )))
+
+        response = self.client.get("/api/profile/{}".format(profiles[0]["id"]), headers=self.headers)
+        assert_that(response.status_code, is_(equal_to(200)))
+        assert_that(response.get_data().decode("utf-8"), contains_string("search_foo"))
+
+    def test_expired_signature_is_rejected(self):
+        signature = sign_request("profiling-secret", "GET", "/api/foo", int(time()) - 120)
+        self.client.get("/api/foo", headers={PROFILE_HEADER: signature})
+        assert_that(self.search_profiles(), is_(equal_to([])))
+
+    def test_signature_is_bound_to_the_request(self):
+        signature = sign_request("profiling-secret", "GET", "/api/bar")
+        self.client.get("/api/foo", headers={PROFILE_HEADER: signature})
+        assert_that(self.search_profiles(), is_(equal_to([])))
+
+    def test_profiles_are_not_discoverable(self):
+        response = self.client.get("/api/")
+        assert_that(response.status_code, is_(equal_to(200)))
+        assert_that(
+            [link["type"] for link in loads(response.get_data().decode("utf-8"))["_links"]["search"]],
+            is_(equal_to(["foo"])),
+        )
+
+    def test_profiles_require_basic_auth(self):
+        response = self.client.get("/api/profile")
+        assert_that(response.status_code, is_(equal_to(401)))
+
+
+def test_sampled_requests_are_profiled():
+    graph = make_graph(kind="sample", sample_rate=1.0)
+    client = graph.flask.test_client()
+    client.get("/api/foo")
+
+    profiles = graph.profiler.store.all()
+    assert_that([profile.format for profile in profiles], is_(equal_to(["collapsed"])))
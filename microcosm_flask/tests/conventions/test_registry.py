@@ -0,0 +1,102 @@
+"""
+Endpoint registry tests.
+
+"""
+from hamcrest import (
+    assert_that,
+    contains,
+    equal_to,
+    is_,
+    none,
+)
+from microcosm.api import create_object_graph
+
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+
+
+class TestEndpointRegistry(object):
+
+    def setup(self):
+        self.graph = create_object_graph(name="example", testing=True)
+        self.foo_ns = Namespace(subject="foo")
+        self.bar_ns = Namespace(subject="bar", version="v2")
+        self.relation_ns = Namespace(subject="foo", object_="bar")
+
+        for ns, path, operation in [
+            (self.foo_ns, self.foo_ns.collection_path, Operation.Search),
+            (self.bar_ns, self.bar_ns.collection_path, Operation.Search),
+            (self.foo_ns, self.foo_ns.instance_path, Operation.Retrieve),
+            (self.relation_ns, self.relation_ns.relation_path, Operation.SearchFor),
+        ]:
+            self.graph.route(path, operation, ns)(lambda **kwargs: None)
+
+        @self.graph.app.route("/other")
+        def other():
+            pass
+
+    def endpoints(self, **kwargs):
+        return [
+            ns.endpoint_for(operation)
+            for operation, ns, rule, func in self.graph.endpoint_registry.find(**kwargs)
+        ]
+
+    def test_find_all(self):
+        assert_that(self.endpoints(), contains(
+            "foo.search.v1",
+            "bar.search.v2",
+            "foo.retrieve.v1",
+            "foo.search_for.bar.v1",
+        ))
+
+    def test_version_changes_on_registration(self):
+        version = self.graph.endpoint_registry.version
+        ns = Namespace(subject="baz")
+        self.graph.route(ns.collection_path, Operation.Search, ns)(lambda: None)
+        assert_that(self.graph.endpoint_registry.version, is_(equal_to(version + 1)))
+
+    def test_find_by_operation(self):
+        assert_that(
+            self.endpoints(operations=[Operation.Search, Operation.SearchFor]),
+            contains("foo.search.v1", "bar.search.v2", "foo.search_for.bar.v1"),
+        )
+
+    def test_find_by_subject_and_version(self):
+        assert_that(self.endpoints(subject="foo", version="v1"), contains(
+            "foo.search.v1",
+            "foo.retrieve.v1",
+            "foo.search_for.bar.v1",
+        ))
+        assert_that(self.endpoints(subject="bar", version="v1"), is_(equal_to([])))
+
+    def test_find_by_path_prefix(self):
+        assert_that(
+            self.endpoints(operations=[Operation.Search], path_prefix="/api/v2"),
+            contains("bar.search.v2"),
+        )
+
+    def test_find_by_whole_segment_path_prefix(self):
+        assert_that(self.endpoints(path_prefix="/api/foo"), contains(
+            "foo.search.v1",
+            "foo.retrieve.v1",
+            "foo.search_for.bar.v1",
+        ))
+        assert_that(self.endpoints(path_prefix="/api/fo"), is_(equal_to([])))
+
+    def test_find_rules_added_without_the_route_decorator(self):
+        version = self.graph.endpoint_registry.version
+        self.graph.app.add_url_rule("/api/baz", "baz.search.v1", lambda: None)
+
+        assert_that(self.endpoints(operations=[Operation.Search]), contains(
+            "foo.search.v1",
+            "bar.search.v2",
+            "baz.search.v1",
+        ))
+        assert_that(self.graph.endpoint_registry.version, is_(equal_to(version + 1)))
+
+    def test_get(self):
+        operation, ns, rule, func = self.graph.endpoint_registry.get("foo.retrieve.v1")
+        assert_that(operation, is_(equal_to(Operation.Retrieve)))
+        assert_that(rule.rule, is_(equal_to("/api/foo/<uuid:foo_id>")))
+        assert_that(func, is_(equal_to(self.graph.app.view_functions["foo.retrieve.v1"])))
+        assert_that(self.graph.endpoint_registry.get("other"), is_(none()))
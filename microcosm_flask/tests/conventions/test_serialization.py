@@ -0,0 +1,142 @@
+"""
+Compiled serialization tests.
+
+"""
+from marshmallow import fields, post_dump, Schema
+from hamcrest import (
+    assert_that,
+    calling,
+    equal_to,
+    instance_of,
+    is_,
+    raises,
+    same_instance,
+)
+from mock import patch
+
+from microcosm.api import create_object_graph
+from microcosm_flask.conventions.crud import configure_crud
+from microcosm_flask.conventions.encoding import remove_null_values
+from microcosm_flask.conventions.serialization import CompiledSchema, compile_schema
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+from microcosm_flask.paging import Page, PageSchema, PaginatedList, make_paginated_list_schema
+from microcosm_flask.tests.conventions.fixtures import (
+    person_retrieve,
+    person_search,
+    Person,
+    PersonSchema,
+    PERSON_1,
+)
+
+
+class ExampleSchema(Schema):
+    name = fields.String(attribute="label")
+    count = fields.Integer()
+    flag = fields.Boolean(default=False)
+    tags = fields.List(fields.String())
+    value = fields.Float()
+    parent = fields.Nested("ExampleSchema", exclude=("parent",))
+    secret = fields.String(load_only=True)
+
+
+class PostDumpSchema(Schema):
+    name = fields.String()
+
+    @post_dump
+    def upper(self, data):
+        return dict(name=data["name"].upper())
+
+
+def test_compiled_dump_matches_schema():
+    schema = ExampleSchema()
+    compiled = compile_schema(schema)
+    assert_that(compiled, is_(instance_of(CompiledSchema)))
+
+    for obj in [
+        dict(label="foo", count=1, flag=True, tags=["a", "b"], value=1.5, secret="x"),
+        dict(label=None, count="2", flag=1, tags="a", parent=dict(label="bar", count=None)),
+        dict(),
+    ]:
+        assert_that(compiled.dump(obj).data, is_(equal_to(schema.dump(obj).data)))
+
+
+def test_compiled_dump_many():
+    schema = ExampleSchema(many=True)
+    objs = [dict(label="foo"), dict(label="bar", count=3)]
+    assert_that(compile_schema(schema).dump(objs).data, is_(equal_to(schema.dump(objs).data)))
+
+
+def test_compiled_dump_errors():
+    schema = ExampleSchema()
+    obj = dict(count="not-a-number")
+    assert_that(compile_schema(schema).dump(obj), is_(equal_to(schema.dump(obj))))
+
+
+def test_compiled_dump_errors_for_one_shot_items():
+    schema = ExampleSchema(many=True)
+    objs = [dict(label="foo"), dict(count="not-a-number"), dict(label="bar")]
+
+    with patch("microcosm_flask.conventions.serialization.logger") as logger:
+        result = compile_schema(schema).dump(iter(objs))
+
+    assert_that(result, is_(equal_to(schema.dump(objs))))
+    assert_that(logger.warning.call_count, is_(equal_to(1)))
+
+
+def test_compiled_dump_propagates_unexpected_errors():
+    class Broken(object):
+        @property
+        def count(self):
+            raise RuntimeError("broken")
+
+    assert_that(calling(compile_schema(ExampleSchema()).dump).with_args(Broken()), raises(RuntimeError))
+
+
+def test_compiled_dump_without_nulls():
+    schema = ExampleSchema()
+    compiled = compile_schema(schema).without_nulls
+
+    for obj in [
+        dict(label="foo", count=None, tags=["a", None], parent=dict(label=None, count=1)),
+        dict(label=None, count="2", flag=1, tags="a", parent=None),
+        dict(),
+    ]:
+        assert_that(compiled.dump(obj).data, is_(equal_to(remove_null_values(schema.dump(obj).data))))
+
+
+def test_remove_null_values_copies_on_write():
+    data = dict(items=[dict(name="foo", tags=("a", "b"))], nested=dict(value=1))
+    assert_that(remove_null_values(data), is_(same_instance(data)))
+
+    data["items"].append(dict(name=None))
+    result = remove_null_values(data)
+    assert_that(result, is_(equal_to(dict(
+        items=[dict(name="foo", tags=("a", "b")), dict()],
+        nested=dict(value=1),
+    ))))
+    assert_that(result["items"][0], is_(same_instance(data["items"][0])))
+    assert_that(result["nested"], is_(same_instance(data["nested"])))
+    assert_that(data["items"][1], is_(equal_to(dict(name=None))))
+
+
+def test_processors_are_not_compiled():
+    schema = PostDumpSchema()
+    assert_that(compile_schema(schema), is_(equal_to(schema)))
+
+
+def test_compiled_paginated_list():
+    graph = create_object_graph(name="example", testing=True)
+    ns = Namespace(subject=Person)
+    configure_crud(graph, ns, {
+        Operation.Retrieve: (person_retrieve, PersonSchema()),
+        Operation.Search: (person_search, PageSchema(), PersonSchema()),
+    })
+    schema = make_paginated_list_schema(ns, PersonSchema())()
+
+    with graph.flask.test_request_context():
+        paginated_list = PaginatedList(ns, Page(0, 10), [PERSON_1] * 3, 3)
+        assert_that(
+            compile_schema(schema).dump(paginated_list).data,
+            is_(equal_to(schema.dump(paginated_list).data)),
+        )
@@ -0,0 +1,78 @@
+"""
+Swagger convention tests.
+
+"""
+from json import loads
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_key,
+    is_,
+    is_not,
+)
+
+from microcosm.api import create_object_graph
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+
+
+class TestSwagger(object):
+
+    def setup(self):
+        def loader(metadata):
+            return dict(
+                swagger_convention=dict(
+                    version="v1",
+                ),
+            )
+
+        self.graph = create_object_graph(name="example", testing=True, loader=loader)
+        self.graph.use("swagger_convention")
+        self.client = self.graph.flask.test_client()
+
+        self.register_search(Namespace(subject="foo", version="v1"))
+
+    def register_search(self, ns):
+        @self.graph.route(ns.collection_path, Operation.Search, ns)
+        def search():
+            pass
+
+    def test_etag(self):
+        """
+        Swagger responses include an ETag.
+
+        """
+        response = self.client.get("/api/v1/swagger")
+        assert_that(response.status_code, is_(equal_to(200)))
+        assert_that(response.headers, has_key("ETag"))
+
+    def test_if_none_match(self):
+        """
+        Swagger responses are not resent if unchanged.
+
+        """
+        response = self.client.get("/api/v1/swagger")
+        etag = response.headers["ETag"]
+
+        response = self.client.get("/api/v1/swagger", headers={"If-None-Match": etag})
+        assert_that(response.status_code, is_(equal_to(304)))
+        assert_that(response.get_data(), is_(equal_to(b"")))
+
+    def test_cache_invalidation(self):
+        """
+        Registering new routes changes the swagger definition.
+
+        """
+        response = self.client.get("/api/v1/swagger")
+        etag = response.headers["ETag"]
+        swagger = loads(response.get_data().decode("utf-8"))
+        assert_that(list(swagger["paths"].keys()), is_(equal_to(["/foo"])))
+
+        self.register_search(Namespace(subject="bar", version="v1"))
+
+        response = self.client.get("/api/v1/swagger", headers={"If-None-Match": etag})
+        assert_that(response.status_code, is_(equal_to(200)))
+        assert_that(response.headers["ETag"], is_not(equal_to(etag)))
+        swagger = loads(response.get_data().decode("utf-8"))
+        assert_that(sorted(swagger["paths"].keys()), is_(equal_to(["/bar", "/foo"])))
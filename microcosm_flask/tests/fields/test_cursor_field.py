@@ -0,0 +1,37 @@
+"""
+Test cursor field.
+
+"""
+from uuid import uuid4
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_key,
+    is_,
+)
+from marshmallow import Schema
+from microcosm_flask.fields import CursorField
+from microcosm_flask.fields.cursor_field import encode_cursor
+
+
+class CursorSchema(Schema):
+    cursor = CursorField()
+
+
+def test_round_trip():
+    uid = uuid4()
+    result = CursorSchema().load(dict(cursor=encode_cursor([10, uid])))
+    assert_that(result.data["cursor"], is_(equal_to([10, str(uid)])))
+
+
+def test_dump():
+    result = CursorSchema().dump(dict(cursor=["foo"]))
+    assert_that(result.data["cursor"], is_(equal_to(encode_cursor(["foo"]))))
+    assert_that("=" in result.data["cursor"], is_(equal_to(False)))
+
+
+def test_invalid_cursor():
+    for cursor in ["not-a-cursor!", encode_cursor([])[:-1] + "$", "eyJmb28iOiAxfQ"]:
+        result = CursorSchema().load(dict(cursor=cursor))
+        assert_that(result.errors, has_key("cursor"))
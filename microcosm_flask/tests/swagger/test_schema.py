@@ -12,6 +12,7 @@ from enum import Enum, IntEnum, unique
 from marshmallow import Schema, fields
 
 from microcosm_flask.fields import EnumField
+from microcosm_flask.paging import CursorPageSchema
 from microcosm_flask.swagger.schema import build_schema, build_parameter
 from microcosm_flask.tests.conventions.fixtures import NewPersonSchema
 
@@ -132,3 +133,10 @@ def test_field_nested():
     assert_that(parameter, is_(equal_to({
         "$ref": "#/definitions/NewPerson",
     })))
+
+
+def test_field_cursor():
+    parameter = build_parameter(CursorPageSchema().fields["cursor"])
+    assert_that(parameter, is_(equal_to({
+        "type": "string",
+    })))
@@ -0,0 +1,92 @@
+"""
+Sync format tests.
+
+"""
+from io import StringIO
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    is_,
+)
+from nose.plugins.skip import SkipTest
+
+from microcosm_flask.sync.formats import (
+    ZstdCompressor,
+    dump_path,
+    dump_yaml,
+    is_jsonl,
+    load_path,
+    load_yaml,
+)
+
+
+RESOURCES = [
+    (
+        "http://localhost/api/foo/{}".format(index),
+        dict(
+            id=index,
+            name=u"föö",
+            _links=dict(
+                self=dict(href="http://localhost/api/foo/{}".format(index)),
+            ),
+        ),
+    )
+    for index in range(3)
+]
+
+
+class TestFormats(object):
+
+    def setup(self):
+        self.directory = mkdtemp()
+
+    def teardown(self):
+        rmtree(self.directory)
+
+    def test_is_jsonl(self):
+        assert_that(is_jsonl("resources.jsonl"), is_(equal_to(True)))
+        assert_that(is_jsonl("resources.jsonl.gz"), is_(equal_to(True)))
+        assert_that(is_jsonl("resources.jsonl.zst"), is_(equal_to(True)))
+        assert_that(is_jsonl("resources.yaml.gz"), is_(equal_to(False)))
+
+    def round_trip(self, name):
+        path = join(self.directory, name)
+        dump_path(iter(RESOURCES), path)
+        assert_that(list(load_path(path)), is_(equal_to(RESOURCES)))
+
+    def test_round_trip_yaml(self):
+        self.round_trip("resources.yaml")
+
+    def test_round_trip_yaml_gz(self):
+        self.round_trip("resources.yaml.gz")
+
+    def test_round_trip_jsonl(self):
+        self.round_trip("resources.jsonl")
+
+    def test_round_trip_jsonl_gz(self):
+        self.round_trip("resources.jsonl.gz")
+
+    def test_round_trip_yaml_zst(self):
+        if ZstdCompressor is None:
+            raise SkipTest("zstandard is not installed")
+        self.round_trip("resources.yaml.zst")
+
+    def test_round_trip_jsonl_zst(self):
+        if ZstdCompressor is None:
+            raise SkipTest("zstandard is not installed")
+        self.round_trip("resources.jsonl.zst")
+
+    def test_dump_yaml_to_text_stream(self):
+        destination = StringIO()
+        dump_yaml(iter(RESOURCES), destination)
+        assert_that(list(load_yaml(StringIO(destination.getvalue()))), is_(equal_to(RESOURCES)))
+
+    def test_jsonl_is_line_delimited(self):
+        path = join(self.directory, "resources.jsonl")
+        dump_path(iter(RESOURCES), path)
+        with open(path) as file_:
+            assert_that(len(file_.readlines()), is_(equal_to(len(RESOURCES))))
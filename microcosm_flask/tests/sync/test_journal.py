@@ -0,0 +1,61 @@
+"""
+Sync journal tests.
+
+"""
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from hamcrest import (
+    assert_that,
+    calling,
+    contains,
+    equal_to,
+    is_,
+    raises,
+)
+
+from microcosm_flask.sync.journal import Journal
+
+
+class TestJournal(object):
+
+    def setup(self):
+        self.state_dir = mkdtemp()
+
+    def teardown(self):
+        rmtree(self.state_dir)
+
+    def test_record_and_resume(self):
+        journal = Journal.open(self.state_dir, "http://source", "http://destination")
+        journal.record_frontier(["/"])
+        journal.record_crawl("/", [("/foo/1", dict(id=1))], ["/foo?offset=1"])
+        journal.record_push(["/foo/1"])
+        journal.close()
+
+        journal = Journal.open(self.state_dir, "http://source", "http://destination")
+        assert_that(journal.frontier(), contains("/foo?offset=1"))
+        assert_that(journal.crawled(), contains("/"))
+        assert_that(list(journal.resources()), contains(("/foo/1", dict(id=1))))
+        assert_that(journal.pushed(), is_(equal_to({"/foo/1"})))
+
+        journal.remove()
+        assert_that(exists(join(self.state_dir, "sync.db")), is_(equal_to(False)))
+
+    def test_resources_are_read_in_chunks(self):
+        journal = Journal.open(self.state_dir, "http://source", "http://destination")
+        journal.record_crawl("/foo", [("/foo/{}".format(index), dict(id=index)) for index in range(5)], [])
+
+        resources = journal.resources(chunk_size=2)
+        assert_that(next(resources), is_(equal_to(("/foo/0", dict(id=0)))))
+        # the journal remains writable while resources are iterated
+        journal.record_push(["/foo/0"])
+        assert_that([href for href, resource in resources], contains("/foo/1", "/foo/2", "/foo/3", "/foo/4"))
+        journal.close()
+
+    def test_mismatched_sync(self):
+        Journal.open(self.state_dir, "http://source", "http://destination").close()
+        assert_that(
+            calling(Journal.open).with_args(self.state_dir, "http://source", "http://elsewhere"),
+            raises(Exception, "belongs to a sync"),
+        )
@@ -0,0 +1,151 @@
+"""
+Sync pull tests.
+
+"""
+from argparse import Namespace as Args
+from itertools import islice
+from os.path import join
+import re
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import current_thread
+
+from hamcrest import (
+    assert_that,
+    contains_inanyorder,
+    equal_to,
+    has_length,
+    is_,
+)
+from mock import Mock, patch
+
+from microcosm_flask.sync.journal import Journal
+from microcosm_flask.sync.pull import pull_json
+
+
+BASE_URL = "http://localhost/api"
+
+
+def link(href):
+    return dict(href="{}{}".format(BASE_URL, href))
+
+
+def item(index):
+    return dict(
+        id=index,
+        _links=dict(
+            self=link("/foo/{}".format(index)),
+        ),
+    )
+
+
+RESOURCES = {
+    "": dict(
+        _links=dict(
+            self=link(""),
+            search=[link("/foo")],
+        ),
+    ),
+    "/foo": dict(
+        items=[item(1), item(2)],
+        _links=dict(
+            self=link("/foo"),
+            next=link("/foo?offset=2"),
+        ),
+    ),
+    "/foo?offset=2": dict(
+        items=[item(3)],
+        _links=dict(
+            self=link("/foo?offset=2"),
+            # duplicate links are fetched once
+            prev=link("/foo"),
+            next=link("/foo?offset=2"),
+        ),
+    ),
+}
+
+
+def make_session():
+    def get(uri):
+        response = Mock()
+        response.json.return_value = RESOURCES[uri[len(BASE_URL):]]
+        return response
+
+    session = Mock()
+    session.get.side_effect = get
+    return session
+
+
+def pull(concurrency, journal=None, limit=None):
+    args = Args(
+        concurrency=concurrency,
+        exclude_first=True,
+        journal=journal,
+        relation_patterns=[re.compile(pattern) for pattern in ["search", "next", "prev"]],
+    )
+    session = make_session()
+    with patch("microcosm_flask.sync.pull.make_session", return_value=session):
+        resources = list(islice(pull_json(args, BASE_URL), limit))
+    return resources, session
+
+
+def test_pull():
+    for concurrency in (1, 4):
+        resources, session = pull(concurrency)
+
+        assert_that([href for href, resource in resources], contains_inanyorder(
+            "http://localhost/api/foo/1",
+            "http://localhost/api/foo/2",
+            "http://localhost/api/foo/3",
+        ))
+        assert_that(session.get.call_count, is_(equal_to(3)))
+
+
+def test_pull_concurrently_uses_a_session_per_thread():
+    sessions = []
+
+    def make_thread_session():
+        session = make_session()
+        session.thread = current_thread()
+        get = session.get.side_effect
+
+        def get_from_owning_thread(uri):
+            assert_that(current_thread(), is_(equal_to(session.thread)))
+            return get(uri)
+
+        session.get.side_effect = get_from_owning_thread
+        sessions.append(session)
+        return session
+
+    args = Args(
+        concurrency=4,
+        exclude_first=True,
+        relation_patterns=[re.compile(pattern) for pattern in ["search", "next", "prev"]],
+    )
+    with patch("microcosm_flask.sync.pull.make_session", side_effect=make_thread_session):
+        resources = list(pull_json(args, BASE_URL))
+
+    assert_that(resources, has_length(3))
+    assert_that(len({session.thread for session in sessions}), is_(equal_to(len(sessions))))
+    assert_that(sum(session.get.call_count for session in sessions), is_(equal_to(3)))
+
+
+def test_pull_resumes_from_journal():
+    for concurrency in (1, 4):
+        state_dir = mkdtemp()
+        try:
+            journal = Journal(join(state_dir, "sync.db"))
+            # interrupt the pull after the first page of items
+            resources, session = pull(concurrency, journal=journal, limit=2)
+            assert_that(resources, has_length(2))
+
+            resources, session = pull(concurrency, journal=journal)
+            assert_that([href for href, resource in resources], contains_inanyorder(
+                "http://localhost/api/foo/1",
+                "http://localhost/api/foo/2",
+                "http://localhost/api/foo/3",
+            ))
+            assert_that(session.get.call_count, is_(equal_to(1)))
+            journal.close()
+        finally:
+            rmtree(state_dir)
@@ -0,0 +1,163 @@
+"""
+Sync push tests.
+
+"""
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import current_thread, Lock
+from time import sleep
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    is_,
+    less_than_or_equal_to,
+)
+from mock import Mock, patch
+from requests.exceptions import ConnectionError, HTTPError
+
+from microcosm_flask.sync.journal import Journal
+from microcosm_flask.sync.push import backoff_delay, push_json
+
+
+BASE_URL = "http://localhost"
+
+
+def resource(href, parent=None):
+    links = dict(self=dict(href=href))
+    if parent is not None:
+        links["parent"] = dict(href=parent)
+    return href, dict(id=href, _links=links)
+
+
+class RecordingSession(object):
+    """
+    Record the start and end of each request.
+
+    """
+    def __init__(self):
+        self.events = []
+        self.lock = Lock()
+
+    def put(self, uri, **kwargs):
+        with self.lock:
+            self.events.append(("start", uri))
+        sleep(0.01)
+        with self.lock:
+            self.events.append(("end", uri))
+        return Mock()
+
+
+def test_backoff_delay():
+    for attempt in range(10):
+        assert_that(backoff_delay(attempt, base=0.1, cap=1.0), is_(less_than_or_equal_to(min(1.0, 0.1 * 2 ** attempt))))
+
+
+def test_push_concurrently_respects_dependencies():
+    inputs = [
+        resource("/parent/1"),
+        resource("/parent/2"),
+        resource("/child/1", parent="/parent/1"),
+        resource("/child/2", parent="/parent/2"),
+        resource("/grandchild/1", parent="/child/1"),
+    ]
+    session = RecordingSession()
+
+    with patch("microcosm_flask.sync.push.make_session", return_value=session):
+        push_json(inputs, BASE_URL, batch_size=1, concurrency=4)
+
+    events = session.events
+    assert_that(len(events), is_(equal_to(10)))
+    for child, parent in [
+        ("/child/1", "/parent/1"),
+        ("/child/2", "/parent/2"),
+        ("/grandchild/1", "/child/1"),
+    ]:
+        started = events.index(("start", BASE_URL + child))
+        ended = events.index(("end", BASE_URL + parent))
+        assert_that(ended < started, is_(equal_to(True)))
+
+    # independent parents are pushed in parallel
+    assert_that(events[:2], is_(equal_to([
+        ("start", BASE_URL + "/parent/1"),
+        ("start", BASE_URL + "/parent/2"),
+    ])))
+
+
+def test_push_retries_gateway_errors():
+    unavailable = Mock()
+    unavailable.raise_for_status.side_effect = HTTPError(response=Mock(status_code=503))
+    session = Mock()
+    session.put.side_effect = [unavailable, Mock()]
+
+    with patch("microcosm_flask.sync.push.sleep") as mocked_sleep:
+        with patch("microcosm_flask.sync.push.requests.Session", return_value=session):
+            push_json([resource("/foo/1")], BASE_URL, batch_size=1, enable_sessions=True)
+
+    assert_that(session.put.call_count, is_(equal_to(2)))
+    assert_that(mocked_sleep.call_count, is_(equal_to(1)))
+
+
+def test_push_concurrently_uses_a_session_per_thread():
+    sessions = []
+
+    def make_thread_session():
+        session = RecordingSession()
+        session.thread = current_thread()
+        put = session.put
+
+        def put_from_owning_thread(uri, **kwargs):
+            assert_that(current_thread(), is_(equal_to(session.thread)))
+            return put(uri, **kwargs)
+
+        session.put = put_from_owning_thread
+        sessions.append(session)
+        return session
+
+    inputs = [resource("/foo/{}".format(index)) for index in range(8)]
+    with patch("microcosm_flask.sync.push.make_session", side_effect=make_thread_session):
+        push_json(inputs, BASE_URL, batch_size=1, concurrency=4)
+
+    assert_that(len({session.thread for session in sessions}), is_(equal_to(len(sessions))))
+    assert_that(sum(len(session.events) for session in sessions), is_(equal_to(16)))
+
+
+def test_push_concurrently_recreates_session_on_retry():
+    failing, working = Mock(), Mock()
+    failing.put.side_effect = ConnectionError()
+
+    with patch("microcosm_flask.sync.push.sleep"):
+        with patch("microcosm_flask.sync.push.make_session", side_effect=[failing, working]):
+            push_json([resource("/foo/1")], BASE_URL, batch_size=1, concurrency=2)
+
+    assert_that(failing.put.call_count, is_(equal_to(1)))
+    assert_that(working.put.call_count, is_(equal_to(1)))
+
+
+def test_push_skips_journaled_resources():
+    for concurrency in (1, 2):
+        state_dir = mkdtemp()
+        try:
+            journal = Journal(join(state_dir, "sync.db"))
+            journal.record_push(["/foo/1"])
+
+            session = RecordingSession()
+            with patch("microcosm_flask.sync.push.make_session", return_value=session):
+                with patch("microcosm_flask.sync.push.requests", session):
+                    push_json(
+                        [resource("/foo/1"), resource("/foo/2")],
+                        BASE_URL,
+                        batch_size=1,
+                        concurrency=concurrency,
+                        journal=journal,
+                    )
+
+            assert_that(session.events, is_(equal_to([
+                ("start", BASE_URL + "/foo/2"),
+                ("end", BASE_URL + "/foo/2"),
+            ])))
+            assert_that(journal.pushed(), is_(equal_to({"/foo/1", "/foo/2"})))
+            journal.close()
+        finally:
+            rmtree(state_dir)
@@ -0,0 +1,85 @@
+"""
+Sync toposort tests.
+
+"""
+from hamcrest import (
+    assert_that,
+    calling,
+    contains,
+    equal_to,
+    is_,
+    raises,
+)
+
+from microcosm_flask.sync.toposort import TopologicalScheduler, toposorted
+
+
+def resource(href, *parents):
+    links = dict(self=dict(href=href))
+    if parents:
+        links["parent"] = [dict(href=parent) for parent in parents]
+    return href, dict(id=href, _links=links)
+
+
+def hrefs(items):
+    return [href for href, _ in items]
+
+
+def test_toposorted_releases_parents_first():
+    inputs = [
+        resource("/grandchild", "/child"),
+        resource("/child", "/parent"),
+        resource("/other"),
+        resource("/parent"),
+    ]
+    assert_that(hrefs(toposorted(inputs)), contains("/other", "/parent", "/child", "/grandchild"))
+
+
+def test_toposorted_is_incremental():
+    scheduler = TopologicalScheduler()
+    assert_that(hrefs(scheduler.add(*resource("/child", "/parent"))), is_(equal_to([])))
+    assert_that(hrefs(scheduler.add(*resource("/parent"))), contains("/parent", "/child"))
+    assert_that(hrefs(scheduler.add(*resource("/sibling", "/parent"))), contains("/sibling"))
+    assert_that(hrefs(scheduler.finish()), is_(equal_to([])))
+
+
+def test_toposorted_releases_children_of_missing_parents_last():
+    inputs = [
+        resource("/child", "/missing"),
+        resource("/grandchild", "/child", "/parent"),
+        resource("/parent"),
+    ]
+    assert_that(hrefs(toposorted(inputs)), contains("/parent", "/child", "/grandchild"))
+
+
+def test_toposorted_deep_chain():
+    depth = 5000
+    inputs = [
+        resource("/{}".format(index), "/{}".format(index - 1))
+        for index in reversed(range(1, depth))
+    ] + [resource("/0")]
+    assert_that(
+        hrefs(toposorted(inputs)),
+        is_(equal_to(["/{}".format(index) for index in range(depth)])),
+    )
+
+
+def test_toposorted_spills_to_disk():
+    inputs = [
+        resource("/child/{}".format(index), "/parent")
+        for index in range(10)
+    ] + [resource("/parent")]
+    sorted_items = list(toposorted(inputs, max_nodes=2))
+    assert_that(hrefs(sorted_items), is_(equal_to(["/parent"] + [
+        "/child/{}".format(index)
+        for index in range(10)
+    ])))
+    assert_that(sorted_items, is_(equal_to([inputs[-1]] + inputs[:-1])))
+
+
+def test_toposorted_cycle():
+    inputs = [
+        resource("/first", "/second"),
+        resource("/second", "/first"),
+    ]
+    assert_that(calling(list).with_args(toposorted(inputs)), raises(Exception, "Found cycle"))
@@ -0,0 +1,124 @@
+"""
+Audit tests.
+
+"""
+from json import dumps
+
+from flask import g, jsonify, request
+from hamcrest import (
+    assert_that,
+    equal_to,
+    is_,
+)
+from marshmallow import fields, Schema
+from mock import Mock, patch
+from microcosm.api import create_object_graph
+
+from microcosm_flask.audit import AuditSampler
+from microcosm_flask.conventions.encoding import dump_response_data, load_request_data
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+
+
+class AuditedSchema(Schema):
+    name = fields.String()
+    secret = fields.String()
+
+
+def test_audit_reuses_parsed_bodies():
+    graph = create_object_graph(name="example", debug=True, testing=True)
+    graph.use("audit", "flask")
+    graph.audit_sink.logger = Mock()
+    request_bodies = []
+
+    @graph.app.route("/example", methods=["POST"])
+    @graph.audit
+    def create():
+        g.hide_request_fields = ["secret"]
+        g.hide_response_fields = ["secret"]
+        request_data = load_request_data(AuditedSchema())
+        request_bodies.append(request.get_json())
+        return dump_response_data(AuditedSchema(), request_data, 201)
+
+    client = graph.app.test_client()
+    with patch("microcosm_flask.audit.loads") as mocked_loads:
+        response = client.post("/example", data=dumps(dict(name="foo", secret="bar")))
+    assert_that(response.status_code, is_(equal_to(201)))
+    assert_that(mocked_loads.called, is_(equal_to(False)))
+
+    audit_dict = graph.audit_sink.logger.info.call_args[0][0]
+    assert_that(audit_dict["request_body"], is_(equal_to(dict(name="foo"))))
+    assert_that(audit_dict["response_body"], is_(equal_to(dict(name="foo"))))
+
+    # hidden fields are not removed from the shared request body
+    assert_that(request_bodies, is_(equal_to([dict(name="foo", secret="bar")])))
+
+
+def test_audit_does_not_share_response_bodies_within_an_app_context():
+    graph = create_object_graph(name="example", debug=True, testing=True)
+    graph.use("audit", "flask")
+    graph.audit_sink.logger = Mock()
+
+    @graph.app.route("/dumped")
+    @graph.audit
+    def dumped():
+        return dump_response_data(AuditedSchema(), dict(name="foo"))
+
+    @graph.app.route("/plain")
+    @graph.audit
+    def plain():
+        return jsonify(name="bar")
+
+    client = graph.app.test_client()
+    with graph.app.app_context():
+        client.get("/dumped")
+        client.get("/plain")
+
+    audit_dict = graph.audit_sink.logger.info.call_args[0][0]
+    assert_that(audit_dict["response_body"], is_(equal_to(dict(name="bar"))))
+
+
+def test_sampler_rates():
+    sampler = AuditSampler(
+        sample_rate=0.5,
+        sample_rates={
+            "search": 0.01,
+            "foo": 0.1,
+            "foo.search.v1": 1.0,
+        },
+    )
+    assert_that(sampler.rate_for("foo.search.v1"), is_(equal_to(1.0)))
+    assert_that(sampler.rate_for("foo.retrieve.v1"), is_(equal_to(0.1)))
+    assert_that(sampler.rate_for("bar.search.v1"), is_(equal_to(0.01)))
+    assert_that(sampler.rate_for("bar.retrieve.v1"), is_(equal_to(0.5)))
+    assert_that(sampler.rate_for("static"), is_(equal_to(0.5)))
+
+
+def test_audit_samples_successes_only():
+    def loader(metadata):
+        return dict(
+            audit=dict(
+                sample_rates=dict(
+                    search=0.0,
+                ),
+            ),
+        )
+
+    graph = create_object_graph(name="example", testing=True, loader=loader)
+    graph.use("audit", "flask")
+    graph.audit_sink.logger = Mock()
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        if request.args.get("fail"):
+            raise Exception("failure!")
+        return ""
+
+    client = graph.app.test_client()
+    assert_that(client.get("/api/foo").status_code, is_(equal_to(200)))
+    assert_that(graph.audit_sink.logger.info.called, is_(equal_to(False)))
+
+    assert_that(client.get("/api/foo?fail=true").status_code, is_(equal_to(500)))
+    audit_dict = graph.audit_sink.logger.info.call_args[0][0]
+    assert_that(audit_dict["status_code"], is_(equal_to(500)))
@@ -0,0 +1,212 @@
+"""
+Audit sink tests.
+
+"""
+from sys import exc_info
+from threading import Event, Thread
+
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_string,
+    equal_to,
+    has_entries,
+    is_,
+    none,
+    raises,
+    same_instance,
+)
+from mock import Mock
+from microcosm.api import create_object_graph
+
+from microcosm_flask.audit_sink import AsyncAuditSink, AuditSink, TokenBucket
+from microcosm_flask.timing import clock
+
+
+def make_exc_info():
+    try:
+        raise Exception("failure!")
+    except Exception:
+        return exc_info()
+
+
+def test_sync_sink_formats_stack_trace():
+    logger = Mock()
+    sink = AuditSink(logger=logger)
+    sink.emit(dict(operation="foo", stack_trace=None), make_exc_info())
+
+    audit_dict = logger.info.call_args[0][0]
+    assert_that(audit_dict["operation"], is_(equal_to("foo")))
+    assert_that(audit_dict["stack_trace"], contains_string("Exception: failure!"))
+
+
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, burst=3, clock=lambda: now[0])
+    assert_that([bucket.consume() for _ in range(4)], is_(equal_to([True, True, True, False])))
+
+    now[0] = 1.0
+    assert_that([bucket.consume() for _ in range(3)], is_(equal_to([True, True, False])))
+    assert_that(bucket.rejected, is_(equal_to(2)))
+
+
+def test_token_bucket_uses_monotonic_clock():
+    assert_that(TokenBucket(rate=1, burst=1).clock, is_(same_instance(clock)))
+
+
+def test_sink_limits_stack_traces():
+    logger = Mock()
+    sink = AuditSink(logger=logger, stack_traces=TokenBucket(rate=0, burst=1))
+    sink.emit(dict(stack_trace=None), make_exc_info())
+    sink.emit(dict(stack_trace=None), make_exc_info())
+
+    records = [call[0][0] for call in logger.info.call_args_list]
+    assert_that(records[0]["stack_trace"], contains_string("Exception: failure!"))
+    assert_that(records[1]["stack_trace"], is_(none()))
+    assert_that(sink.suppressed_stack_traces, is_(equal_to(1)))
+
+
+def test_async_sink_flush():
+    logger = Mock()
+    sink = AsyncAuditSink(queue_size=100, batch_size=10, logger=logger)
+    for index in range(25):
+        sink.emit(dict(index=index))
+    sink.emit(dict(index=25), make_exc_info())
+    sink.flush()
+
+    records = [call[0][0] for call in logger.info.call_args_list]
+    assert_that([record["index"] for record in records], is_(equal_to(list(range(26)))))
+    assert_that(records[-1]["stack_trace"], contains_string("Exception: failure!"))
+    assert_that(sink.dropped, is_(equal_to(0)))
+
+    sink.close()
+    sink.emit(dict(index=26))
+    assert_that(logger.info.call_count, is_(equal_to(27)))
+
+
+def test_async_sink_drops_on_overflow():
+    logger = Mock()
+    blocked, released = Event(), Event()
+
+    def block(record):
+        blocked.set()
+        released.wait()
+
+    logger.info.side_effect = block
+    sink = AsyncAuditSink(queue_size=2, batch_size=1, overflow_policy="drop", logger=logger)
+
+    # wait until the worker is busy with the first record; then fill the queue
+    sink.emit(dict(index=0))
+    blocked.wait()
+    for index in range(1, 5):
+        sink.emit(dict(index=index))
+
+    assert_that(sink.dropped, is_(equal_to(2)))
+    released.set()
+    sink.close()
+    assert_that(logger.info.call_count, is_(equal_to(3)))
+    logger.warning.assert_called_once_with("Dropped 2 audit records on queue overflow")
+
+
+def test_async_sink_logs_records_emitted_while_closing():
+    logger = Mock()
+    blocked, released = Event(), Event()
+
+    def block(record):
+        if record["index"] == 0:
+            blocked.set()
+            released.wait()
+
+    logger.info.side_effect = block
+    sink = AsyncAuditSink(queue_size=10, batch_size=1, logger=logger)
+
+    # close while the worker is busy; records emitted before the worker stops are not lost
+    sink.emit(dict(index=0))
+    blocked.wait()
+    closer = Thread(target=sink.close)
+    closer.start()
+    while not sink.closed:
+        pass
+    sink.emit(dict(index=1))
+    released.set()
+    closer.join()
+
+    records = [call[0][0] for call in logger.info.call_args_list]
+    assert_that(sorted(record["index"] for record in records), is_(equal_to([0, 1])))
+    assert_that(logger.warning.call_count, is_(equal_to(0)))
+
+
+def test_async_sink_blocked_producers_do_not_hold_the_lock():
+    logger = Mock()
+    blocked, released = Event(), Event()
+
+    def block(record):
+        if record["index"] == 0:
+            blocked.set()
+            released.wait()
+
+    logger.info.side_effect = block
+    sink = AsyncAuditSink(queue_size=1, batch_size=1, overflow_policy="block", logger=logger)
+
+    # fill the queue while the worker is busy; the next producer blocks
+    sink.emit(dict(index=0))
+    blocked.wait()
+    sink.emit(dict(index=1))
+    producer = Thread(target=sink.emit, args=(dict(index=2),))
+    producer.start()
+    while not sink.producers:
+        pass
+
+    # closing (and emitting after close) does not wait behind the blocked producer
+    closer = Thread(target=sink.close)
+    closer.start()
+    while not sink.closed:
+        pass
+    sink.emit(dict(index=3))
+    assert_that(logger.info.call_args[0][0]["index"], is_(equal_to(3)))
+
+    released.set()
+    producer.join()
+    closer.join()
+
+    records = [call[0][0] for call in logger.info.call_args_list]
+    assert_that(sorted(record["index"] for record in records), is_(equal_to([0, 1, 2, 3])))
+
+
+def test_async_sink_unsupported_policy():
+    assert_that(
+        calling(AsyncAuditSink).with_args(queue_size=1, batch_size=1, overflow_policy="retry"),
+        raises(ValueError),
+    )
+
+
+def test_async_audit():
+    def loader(metadata):
+        return dict(
+            audit_sink=dict(
+                enable_async=True,
+            ),
+        )
+
+    graph = create_object_graph(name="example", testing=True, loader=loader)
+    graph.use("audit", "flask")
+    graph.audit_sink.logger = Mock()
+
+    @graph.app.route("/fail")
+    @graph.audit
+    def fail():
+        raise Exception("failure!")
+
+    client = graph.app.test_client()
+    response = client.get("/fail")
+    assert_that(response.status_code, is_(equal_to(500)))
+
+    graph.audit_sink.flush()
+    audit_dict = graph.audit_sink.logger.info.call_args[0][0]
+    assert_that(audit_dict, has_entries(
+        func="fail",
+        success=False,
+        status_code=500,
+    ))
+    assert_that(audit_dict["stack_trace"], contains_string("Exception: failure!"))
+    graph.audit_sink.close()
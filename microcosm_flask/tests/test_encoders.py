@@ -0,0 +1,73 @@
+"""
+JSON encoder backend tests.
+
+"""
+from datetime import datetime
+from json import loads
+from uuid import uuid4
+
+from hamcrest import (
+    assert_that,
+    calling,
+    equal_to,
+    is_,
+    raises,
+)
+from microcosm.api import create_object_graph
+
+from microcosm_flask.conventions.encoding import make_response
+from microcosm_flask.encoders import iter_json_backends
+
+
+ID = uuid4()
+
+DATA = {
+    "id": ID,
+    "created": datetime(2016, 1, 1),
+    "name": u"café",
+    "items": [{"value": 1, "empty": None}],
+    "empty": None,
+}
+
+
+def make_graph(json_encoder):
+    def loader(metadata):
+        return dict(
+            flask=dict(
+                json_encoder=json_encoder,
+            ),
+        )
+
+    return create_object_graph(name="example", testing=True, loader=loader)
+
+
+def encode(json_encoder, headers=None):
+    graph = make_graph(json_encoder)
+    with graph.flask.test_request_context(headers=headers):
+        response = make_response(DATA, status_code=201, headers={"X-Foo": "bar"})
+
+    assert_that(response.status_code, is_(equal_to(201)))
+    assert_that(response.headers["Content-Type"], is_(equal_to("application/json")))
+    assert_that(response.headers["X-Foo"], is_(equal_to("bar")))
+    return loads(response.get_data().decode("utf-8"))
+
+
+def test_backends_are_equivalent():
+    expected = encode("flask")
+    assert_that(expected["id"], is_(equal_to(str(ID))))
+
+    for json_encoder in iter_json_backends():
+        assert_that(encode(json_encoder), is_(equal_to(expected)))
+
+
+def test_backends_skip_null():
+    headers = {"X-Response-Skip-Null": "true"}
+    expected = encode("flask", headers=headers)
+    assert_that(expected["items"], is_(equal_to([{"value": 1}])))
+
+    for json_encoder in iter_json_backends():
+        assert_that(encode(json_encoder, headers=headers), is_(equal_to(expected)))
+
+
+def test_unsupported_backend():
+    assert_that(calling(make_graph("unknown").use).with_args("flask"), raises(ValueError))
@@ -0,0 +1,82 @@
+"""
+Metrics tests.
+
+"""
+from flask import Flask
+from hamcrest import (
+    assert_that,
+    contains,
+    equal_to,
+    is_,
+)
+from mock import patch
+
+from microcosm_flask.metrics import (
+    describe_response,
+    Histogram,
+    instrument,
+    log_linear_bounds,
+    MetricsRegistry,
+)
+
+
+def test_log_linear_bounds():
+    assert_that(log_linear_bounds(-2, 0, (1, 5)), is_(equal_to([0.01, 0.05, 0.1, 0.5, 1.0])))
+
+
+def test_histogram():
+    histogram = Histogram([0.1, 1.0])
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+
+    assert_that(list(histogram.iter_cumulative_counts()), contains(
+        (0.1, 2),
+        (1.0, 3),
+        (None, 4),
+    ))
+    assert_that(histogram.count, is_(equal_to(4)))
+    assert_that(histogram.sum, is_(equal_to(2.65)))
+
+
+def test_describe_response():
+    assert_that(describe_response("foo"), is_(equal_to((200, 3))))
+    assert_that(describe_response(("foo", 201)), is_(equal_to((201, 3))))
+    assert_that(describe_response(dict()), is_(equal_to((200, None))))
+
+
+def test_to_prometheus():
+    registry = MetricsRegistry()
+    registry.for_endpoint("foo.search.v1").observe(0.002, 200, None, 1234)
+    registry.for_endpoint("foo.search.v1").observe(0.5, 500)
+
+    lines = registry.to_prometheus().splitlines()
+    assert_that(lines[:2], contains(
+        "# HELP http_request_duration_seconds Request latency by endpoint.",
+        "# TYPE http_request_duration_seconds histogram",
+    ))
+    for line in [
+        'http_request_duration_seconds_bucket{endpoint="foo.search.v1",le="0.001"} 0',
+        'http_request_duration_seconds_bucket{endpoint="foo.search.v1",le="0.0025"} 1',
+        'http_request_duration_seconds_bucket{endpoint="foo.search.v1",le="+Inf"} 2',
+        'http_request_duration_seconds_sum{endpoint="foo.search.v1"} 0.502',
+        'http_request_duration_seconds_count{endpoint="foo.search.v1"} 2',
+        'http_request_size_bytes_count{endpoint="foo.search.v1"} 0',
+        'http_response_size_bytes_bucket{endpoint="foo.search.v1",le="1000.0"} 0',
+        'http_response_size_bytes_bucket{endpoint="foo.search.v1",le="2500.0"} 1',
+        'http_requests_total{endpoint="foo.search.v1",status_code="200"} 1',
+        'http_requests_total{endpoint="foo.search.v1",status_code="500"} 1',
+    ]:
+        assert_that(line in lines, is_(equal_to(True)), line)
+
+
+def test_instrument_uses_monotonic_clock():
+    registry = MetricsRegistry()
+    func = instrument(registry, "foo.search.v1", lambda: "foo")
+
+    with Flask(__name__).test_request_context("/api/foo"):
+        with patch("microcosm_flask.metrics.clock", side_effect=[10.0, 10.25]):
+            func()
+
+    latency = registry.for_endpoint("foo.search.v1").latency
+    assert_that(latency.count, is_(equal_to(1)))
+    assert_that(latency.sum, is_(equal_to(0.25)))
@@ -4,15 +4,20 @@ Namespace tests.
 """
 from hamcrest import (
     assert_that,
+    calling,
     equal_to,
+    has_key,
     is_,
+    is_not,
     none,
+    raises,
+    same_instance,
 )
 from mock import Mock
 
 from microcosm.api import create_object_graph
 from microcosm_flask.matchers import matches_uri
-from microcosm_flask.namespaces import Namespace
+from microcosm_flask.namespaces import INTERNED_NAMESPACES, PARSED_ENDPOINTS, Namespace
 from microcosm_flask.operations import Operation
 
 
@@ -158,3 +163,76 @@ def test_namespace_accepts_controller():
         url = ns.url_for(Operation.Search)
         assert_that(url, is_(equal_to("http://localhost/api/foo")))
         assert_that(ns.controller, is_(equal_to(controller)))
+
+
+def test_namespace_is_immutable():
+    """
+    Namespaces cannot be modified.
+
+    """
+    ns = Namespace(subject="foo")
+    assert_that(calling(setattr).with_args(ns, "version", "v2"), raises(AttributeError))
+    assert_that(ns.version, is_(none()))
+
+
+def test_namespace_equality():
+    """
+    Namespaces are compared (and hashed) by value.
+
+    """
+    ns = Namespace(subject="foo", object_="bar", path="/api", version="v2")
+    other = Namespace(subject="foo", object_="bar", path="/api", version="v2")
+
+    assert_that(ns, is_(equal_to(other)))
+    assert_that(hash(ns), is_(equal_to(hash(other))))
+    assert_that(ns, is_not(equal_to(Namespace(subject="foo", object_="bar", path="/api"))))
+    assert_that(ns, is_not(equal_to(Namespace(subject="foo", object_="bar", controller=Mock()))))
+
+
+def test_namespace_derived_names():
+    """
+    Derived names and paths are computed when the namespace is created.
+
+    """
+    class FooBar(object):
+        pass
+
+    ns = Namespace(subject=FooBar, object_="baz", path="/api", version="v2")
+    assert_that(ns.__dict__["subject_name"], is_(equal_to("foo_bar")))
+    assert_that(ns.collection_path, is_(equal_to("/api/v2/foo_bar")))
+    assert_that(ns.instance_path, is_(equal_to("/api/v2/foo_bar/<uuid:foo_bar_id>")))
+    assert_that(ns.relation_path, is_(equal_to("/api/v2/foo_bar/<uuid:foo_bar_id>/baz")))
+    assert_that(ns.endpoint_for(Operation.SearchFor), is_(equal_to("foo_bar.search_for.baz.v2")))
+
+
+def test_make_is_interned():
+    """
+    Namespaces made from values are shared.
+
+    """
+    assert_that(Namespace.make("foo"), is_(same_instance(Namespace.make("foo"))))
+    assert_that(Namespace.make(("foo", "bar")), is_(same_instance(Namespace.make(["foo", "bar"]))))
+    assert_that(Namespace.make("foo", path="/api"), is_not(same_instance(Namespace.make("foo"))))
+
+
+def test_parse_endpoint_is_interned():
+    """
+    Parsed endpoints are shared.
+
+    """
+    operation, ns = Namespace.parse_endpoint("foo.search_for.bar.v1")
+    assert_that(Namespace.parse_endpoint("foo.search_for.bar.v1")[1], is_(same_instance(ns)))
+    assert_that(ns.object_ns, is_(same_instance(ns.object_ns)))
+
+
+def test_parsed_endpoints_are_bounded():
+    """
+    Parsing arbitrary endpoints does not grow the interning caches without bound.
+
+    """
+    for index in range(2048):
+        Namespace.parse_endpoint("foo{}.search.v1".format(index))
+
+    assert_that(len(PARSED_ENDPOINTS), is_(equal_to(PARSED_ENDPOINTS.maxsize)))
+    assert_that(len(INTERNED_NAMESPACES), is_(equal_to(INTERNED_NAMESPACES.maxsize)))
+    assert_that(Namespace(subject="foo").__dict__, is_not(has_key("endpoints")))
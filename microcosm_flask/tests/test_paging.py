@@ -15,7 +15,18 @@ from microcosm.api import create_object_graph
 from microcosm_flask.conventions.encoding import load_query_string_data
 from microcosm_flask.namespaces import Namespace
 from microcosm_flask.operations import Operation
-from microcosm_flask.paging import Page, PageSchema, PaginatedList
+from microcosm_flask.fields.cursor_field import encode_cursor
+from microcosm_flask.paging import (
+    CountMode,
+    CursorPage,
+    CursorPageSchema,
+    CursorPaginatedList,
+    OptionalCountPageSchema,
+    Page,
+    PageItems,
+    PageSchema,
+    PaginatedList,
+)
 
 
 def test_page_from_query_string():
@@ -174,3 +185,175 @@ def test_custom_paginated_list():
             "uid": str(uid),
             "value": "ONE",
         })))
+
+
+def test_cursor_page_from_query_string():
+    graph = create_object_graph(name="example", testing=True)
+    cursor = encode_cursor(["2"])
+
+    with graph.flask.test_request_context("/?cursor={}&limit=2".format(cursor)):
+        qs = load_query_string_data(CursorPageSchema())
+        page = CursorPage.from_query_string(qs)
+        assert_that(page.cursor, is_(equal_to(["2"])))
+        assert_that(page.limit, is_(equal_to(2)))
+        assert_that(page.to_dict(), is_(equal_to(dict(cursor=cursor, limit=2))))
+
+
+def test_cursor_paginated_list_to_dict():
+    graph = create_object_graph(name="example", testing=True)
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        pass
+
+    items = [dict(id=str(index)) for index in range(3, 6)]
+    paginated_list = CursorPaginatedList(ns, CursorPage(["2"], 2), items)
+
+    with graph.flask.test_request_context():
+        assert_that(paginated_list.to_dict(), is_(equal_to({
+            "count": None,
+            "cursor": encode_cursor(["2"]),
+            "items": [
+                dict(id="3"),
+                dict(id="4"),
+            ],
+            "limit": 2,
+            "_links": {
+                "self": {
+                    "href": "http://localhost/api/foo?cursor={}&limit=2".format(encode_cursor(["2"])),
+                },
+                "next": {
+                    "href": "http://localhost/api/foo?cursor={}&limit=2".format(encode_cursor(["4"])),
+                },
+            }
+        })))
+
+
+def test_cursor_paginated_list_last_page():
+    graph = create_object_graph(name="example", testing=True)
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        pass
+
+    paginated_list = CursorPaginatedList(ns, CursorPage(None, 2), [dict(id="1")], count=1)
+
+    with graph.flask.test_request_context():
+        assert_that(paginated_list.to_dict(), is_(equal_to({
+            "count": 1,
+            "cursor": None,
+            "items": [
+                dict(id="1"),
+            ],
+            "limit": 2,
+            "_links": {
+                "self": {
+                    "href": "http://localhost/api/foo?limit=2",
+                },
+            }
+        })))
+
+
+def test_optional_count_page_from_query_string():
+    graph = create_object_graph(name="example", testing=True)
+
+    with graph.flask.test_request_context("/?count=false"):
+        page = Page.from_query_string(load_query_string_data(OptionalCountPageSchema()))
+        assert_that(page.count_mode, is_(equal_to(CountMode.skip)))
+        assert_that(page.to_tuples(), is_(equal_to([
+            ("offset", 0),
+            ("limit", 20),
+            ("count", "false"),
+        ])))
+
+    with graph.flask.test_request_context("/"):
+        page = Page.from_query_string(load_query_string_data(OptionalCountPageSchema()))
+        assert_that(page.count_mode, is_(equal_to(CountMode.exact)))
+
+    with graph.flask.test_request_context("/?count=maybe"):
+        result = OptionalCountPageSchema().load(dict(count="maybe"))
+        assert_that(list(result.errors), is_(equal_to(["count"])))
+
+
+def test_paginated_list_without_count():
+    graph = create_object_graph(name="example", testing=True)
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        pass
+
+    # the search fetched one more item than the limit
+    paginated_list = PaginatedList(ns, Page(2, 2, count=CountMode.skip), ["1", "2", "3"], None)
+
+    with graph.flask.test_request_context():
+        assert_that(paginated_list.to_dict(), is_(equal_to({
+            "count": None,
+            "items": [
+                "1",
+                "2",
+            ],
+            "offset": 2,
+            "limit": 2,
+            "_links": {
+                "self": {
+                    "href": "http://localhost/api/foo?offset=2&limit=2&count=false",
+                },
+                "next": {
+                    "href": "http://localhost/api/foo?offset=4&limit=2&count=false",
+                },
+                "prev": {
+                    "href": "http://localhost/api/foo?offset=0&limit=2&count=false",
+                },
+            }
+        })))
+
+
+def test_paginated_list_with_estimated_count():
+    graph = create_object_graph(name="example", testing=True)
+    ns = Namespace(subject="foo")
+
+    @graph.route(ns.collection_path, Operation.Search, ns)
+    def search_foo():
+        pass
+
+    # the estimate is too high, but there is no next item
+    paginated_list = PaginatedList(ns, Page(0, 2, count=CountMode.estimate), ["1", "2"], 100)
+
+    with graph.flask.test_request_context():
+        assert_that(paginated_list.count, is_(equal_to(100)))
+        assert_that(paginated_list.links.to_dict(), is_(equal_to({
+            "self": {
+                "href": "http://localhost/api/foo?offset=0&limit=2&count=estimate",
+            },
+        })))
+
+
+def test_page_items_streams_with_look_ahead():
+    produced = []
+
+    def generate():
+        for item in ["1", "2", "3", "4"]:
+            produced.append(item)
+            yield item
+
+    items = PageItems(generate(), 2)
+    assert_that(produced, is_(equal_to([])))
+
+    iterator = iter(items)
+    assert_that(next(iterator), is_(equal_to("1")))
+    assert_that(produced, is_(equal_to(["1"])))
+    assert_that(list(iterator), is_(equal_to(["2"])))
+    # only one item of look-ahead is read
+    assert_that(produced, is_(equal_to(["1", "2", "3"])))
+    assert_that(items.has_next, is_(equal_to(True)))
+    assert_that(items.last, is_(equal_to("2")))
+
+
+def test_page_items_buffers_if_has_next_is_needed_first():
+    items = PageItems(iter(["1", "2"]), 2)
+    assert_that(items.has_next, is_(equal_to(False)))
+    assert_that(list(items), is_(equal_to(["1", "2"])))
+    assert_that(items.last, is_(equal_to("2")))
@@ -0,0 +1,59 @@
+"""
+Profiling tests.
+
+"""
+from time import sleep
+
+from hamcrest import (
+    assert_that,
+    calling,
+    contains,
+    contains_string,
+    equal_to,
+    is_,
+    none,
+    raises,
+)
+
+from microcosm_flask.profiling import (
+    Profile,
+    Profiler,
+    ProfileStore,
+    StackSampler,
+)
+
+
+def slow_function():
+    sleep(0.05)
+
+
+def test_profile_store_is_bounded():
+    store = ProfileStore(max_profiles=2)
+    profiles = [Profile("foo.search.v1", 0.1, stacks={}) for _ in range(3)]
+    for profile in profiles:
+        store.add(profile)
+
+    assert_that(store.all(), contains(profiles[2], profiles[1]))
+    assert_that(store.get(profiles[0].id), is_(none()))
+    assert_that(store.get(profiles[1].id), is_(equal_to(profiles[1])))
+
+
+def test_stack_sampler():
+    sampler = StackSampler(interval=0.005)
+    sampler.start()
+    slow_function()
+    stacks = sampler.stop()
+
+    assert_that(sum(stacks.values()) > 0, is_(equal_to(True)))
+    assert_that(max(stacks, key=stacks.get), contains_string(":test_stack_sampler;"))
+
+    profile = Profile("foo.search.v1", 0.05, stacks=stacks)
+    assert_that(profile.format, is_(equal_to("collapsed")))
+    assert_that(profile.render(), contains_string(":slow_function "))
+
+
+def test_unsupported_profiler():
+    assert_that(
+        calling(Profiler).with_args(store=ProfileStore(1), kind="perf"),
+        raises(ValueError),
+    )
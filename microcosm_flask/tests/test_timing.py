@@ -0,0 +1,126 @@
+"""
+Phase timing tests.
+
+"""
+from collections import OrderedDict
+from json import dumps
+
+from flask import g
+from hamcrest import (
+    assert_that,
+    contains,
+    contains_inanyorder,
+    equal_to,
+    has_item,
+    is_,
+    none,
+)
+from mock import Mock, patch
+from microcosm.api import create_object_graph
+
+from microcosm_flask.conventions.crud import configure_crud
+from microcosm_flask.operations import Operation
+from microcosm_flask.paging import PageSchema
+from microcosm_flask.tests.conventions.fixtures import (
+    NewPersonSchema,
+    Person,
+    PersonSchema,
+    person_create,
+    person_retrieve,
+    person_search,
+)
+from microcosm_flask.timing import (
+    format_server_timing,
+    record_timing,
+    timing,
+    TIMINGS,
+)
+
+
+PERSON_MAPPINGS = {
+    Operation.Create: (person_create, NewPersonSchema(), PersonSchema()),
+    Operation.Retrieve: (person_retrieve, PersonSchema()),
+    Operation.Search: (person_search, PageSchema(), PersonSchema()),
+}
+
+
+def parse_server_timing(header):
+    return [entry.split(";")[0] for entry in header.split(", ")]
+
+
+def test_format_server_timing():
+    timings = OrderedDict([("load", 0.0012), ("func", 0.25)])
+    assert_that(format_server_timing(timings), is_(equal_to("load;dur=1.200, func;dur=250.000")))
+
+
+def test_timing_accumulates():
+    graph = create_object_graph(name="example", testing=True)
+
+    with graph.app.test_request_context():
+        record_timing("func", 0.5)
+        record_timing("func", 0.25)
+        with timing("dump"):
+            pass
+
+        timings = getattr(g, TIMINGS)
+        assert_that(list(timings), contains("func", "dump"))
+        assert_that(timings["func"], is_(equal_to(0.75)))
+
+
+def test_timing_excludes_nested_phases():
+    graph = create_object_graph(name="example", testing=True)
+
+    with graph.app.test_request_context():
+        # dump: 0.0 - 10.0, links: 1.0 - 3.0
+        with patch("microcosm_flask.timing.clock", side_effect=[0.0, 1.0, 3.0, 10.0]):
+            with timing("dump"):
+                with timing("links"):
+                    pass
+
+        timings = getattr(g, TIMINGS)
+        assert_that(timings, is_(equal_to({"links": 2.0, "dump": 8.0})))
+
+
+def test_timing_outside_of_context():
+    with timing("func"):
+        pass
+
+
+class TestConventionTiming(object):
+
+    def setup(self):
+        def loader(metadata):
+            return dict(
+                route=dict(
+                    enable_server_timing=True,
+                ),
+            )
+
+        self.graph = create_object_graph(name="example", testing=True, loader=loader)
+        self.graph.use("audit")
+        self.graph.audit_sink.logger = Mock()
+        configure_crud(self.graph, Person, PERSON_MAPPINGS)
+        self.client = self.graph.flask.test_client()
+
+    def test_create(self):
+        response = self.client.post("/api/person", data=dumps(dict(firstName="Bob", lastName="Jones")))
+        assert_that(response.status_code, is_(equal_to(201)))
+        assert_that(
+            parse_server_timing(response.headers["Server-Timing"]),
+            contains("load", "func", "dump", "encode"),
+        )
+
+        audit_dict = self.graph.audit_sink.logger.info.call_args[0][0]
+        assert_that(list(audit_dict["timings"]), contains_inanyorder("load", "func", "dump", "encode"))
+
+    def test_search(self):
+        response = self.client.get("/api/person")
+        assert_that(response.status_code, is_(equal_to(200)))
+        assert_that(parse_server_timing(response.headers["Server-Timing"]), has_item("links"))
+
+    def test_disabled(self):
+        graph = create_object_graph(name="example", testing=True)
+        configure_crud(graph, Person, PERSON_MAPPINGS)
+        response = graph.flask.test_client().get("/api/person")
+        assert_that(response.status_code, is_(equal_to(200)))
+        assert_that(response.headers.get("Server-Timing"), is_(none()))
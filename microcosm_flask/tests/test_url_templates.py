@@ -0,0 +1,123 @@
+"""
+URL template tests.
+
+"""
+from uuid import uuid4
+
+from flask import url_for
+from hamcrest import (
+    assert_that,
+    equal_to,
+    is_,
+    none,
+)
+from mock import patch
+from microcosm.api import create_object_graph
+
+from microcosm_flask.linking import Link
+from microcosm_flask.namespaces import Namespace
+from microcosm_flask.operations import Operation
+from microcosm_flask.url_templates import build_external_url, URL_TEMPLATES
+
+
+class TestURLTemplates(object):
+
+    def setup(self):
+        self.graph = create_object_graph(name="example", testing=True)
+        self.graph.use("port_forwarding")
+        self.ns = Namespace(subject="foo")
+        self.relation_ns = Namespace(subject="foo", object_="bar", version="v2")
+
+        @self.graph.route(self.ns.collection_path, Operation.Search, self.ns)
+        def search_foo():
+            pass
+
+        @self.graph.route(self.ns.instance_path, Operation.Retrieve, self.ns)
+        def retrieve_foo(foo_id):
+            pass
+
+        @self.graph.route(self.relation_ns.relation_path, Operation.SearchFor, self.relation_ns)
+        def search_for_bar(foo_id):
+            pass
+
+    def test_matches_url_for(self):
+        foo_id = uuid4()
+        with self.graph.flask.test_request_context():
+            for ns, operation, kwargs in [
+                (self.ns, Operation.Search, dict()),
+                (self.ns, Operation.Retrieve, dict(foo_id=foo_id)),
+                (self.relation_ns, Operation.SearchFor, dict(foo_id=foo_id)),
+            ]:
+                endpoint = ns.endpoint_for(operation)
+                # once to compile and verify; once more to use the template
+                for _ in range(2):
+                    assert_that(
+                        build_external_url(endpoint, kwargs),
+                        is_(equal_to(url_for(endpoint, _external=True, **kwargs))),
+                    )
+
+    def test_missing_werkzeug_internals(self):
+        """
+        URLs are built by `url_for` if werkzeug internals are unavailable.
+
+        """
+        foo_id = uuid4()
+        endpoint = self.ns.endpoint_for(Operation.Retrieve)
+        url_map = self.graph.flask.url_map
+        rule = url_map._rules_by_endpoint[endpoint][0]
+
+        for target, attribute in [
+            (url_map, "_rules_by_endpoint"),
+            (rule, "_trace"),
+            (rule, "_converters"),
+        ]:
+            self.graph.flask.extensions.pop(URL_TEMPLATES, None)
+            with self.graph.flask.test_request_context():
+                with patch.object(target, attribute, None):
+                    assert_that(build_external_url(endpoint, dict(foo_id=foo_id)), is_(none()))
+                assert_that(
+                    self.ns.href_for(Operation.Retrieve, foo_id=foo_id),
+                    is_(equal_to("http://localhost/api/foo/{}".format(foo_id))),
+                )
+
+        # `url_for` needs the adapter's host; only the template is affected
+        self.graph.flask.extensions.pop(URL_TEMPLATES, None)
+        with self.graph.flask.test_request_context():
+            with patch("werkzeug.routing.MapAdapter.get_host", None):
+                assert_that(build_external_url(endpoint, dict(foo_id=foo_id)), is_(none()))
+
+    def test_unsupported_values(self):
+        endpoint = self.ns.endpoint_for(Operation.Retrieve)
+        with self.graph.flask.test_request_context():
+            assert_that(build_external_url(endpoint, dict()), is_(none()))
+            assert_that(build_external_url(endpoint, dict(foo_id=None)), is_(none()))
+            assert_that(build_external_url(endpoint, dict(foo_id=uuid4(), offset=0)), is_(none()))
+
+    def test_query_string_arguments(self):
+        with self.graph.flask.test_request_context():
+            url = self.ns.href_for(Operation.Search, offset=0, qs=dict(limit=10))
+        assert_that(url, is_(equal_to("http://localhost/api/foo?offset=0&limit=10")))
+
+    def test_templated_link(self):
+        with self.graph.flask.test_request_context():
+            link = Link.for_(Operation.Retrieve, self.ns, allow_templates=True)
+        assert_that(link.templated, is_(equal_to(True)))
+        assert_that(link.href, is_(equal_to("http://localhost/api/foo/{foo_id}")))
+
+    def test_forwarded_port(self):
+        foo_id = uuid4()
+
+        @self.graph.app.route("/link")
+        def link():
+            return self.ns.href_for(Operation.Retrieve, foo_id=foo_id)
+
+        client = self.graph.app.test_client()
+        for port in ["8080", "9090"]:
+            response = client.get("/link", headers={"X-Forwarded-Port": port})
+            assert_that(
+                response.data.decode("utf-8"),
+                is_(equal_to("http://localhost:{}/api/foo/{}".format(port, foo_id))),
+            )
+
+        response = client.get("/link")
+        assert_that(response.data.decode("utf-8"), is_(equal_to("http://localhost/api/foo/{}".format(foo_id))))
@@ -0,0 +1,110 @@
+"""
+Phase-level request timing.
+
+Conventions time the phases of handling a request (e.g. loading request data, calling the
+definition's function, dumping and encoding response data) with a monotonic clock and
+accumulate the elapsed seconds by phase on `flask.g`.
+
+Phases may nest (e.g. links are built while response data is dumped); time spent in a nested
+phase is only counted for that phase, so that phase timings never sum to more than the request.
+
+Timings are included in the audit record and, if `route.enable_server_timing` is enabled,
+returned in a `Server-Timing` response header.
+
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+
+try:
+    from time import monotonic as clock
+except ImportError:
+    # python 2
+    from time import time as clock
+
+
+# key used to accumulate phase timings via `flask.g`
+TIMINGS = "_microcosm_flask_timings"
+# key used to track the time spent in nested phases of active phases via `flask.g`
+NESTED_TIMINGS = "_microcosm_flask_nested_timings"
+
+
+def record_timing(phase, elapsed):
+    """
+    Add elapsed time (in seconds) to a phase of the current request.
+
+    Does nothing outside of an application context.
+
+    """
+    if not has_app_context():
+        return
+
+    timings = g.get(TIMINGS)
+    if timings is None:
+        timings = OrderedDict()
+        setattr(g, TIMINGS, timings)
+    timings[phase] = timings.get(phase, 0.0) + elapsed
+
+
+@contextmanager
+def timing(phase):
+    """
+    Time a phase of the current request, excluding time spent in nested phases.
+
+    Usage:
+
+        with timing("func"):
+            definition.func(**request_data)
+
+    """
+    nested = None
+    if has_app_context():
+        nested = g.get(NESTED_TIMINGS)
+        if nested is None:
+            nested = []
+            setattr(g, NESTED_TIMINGS, nested)
+        nested.append(0.0)
+
+    start_time = clock()
+    try:
+        yield
+    finally:
+        elapsed = clock() - start_time
+        if nested is None:
+            record_timing(phase, elapsed)
+        else:
+            nested_elapsed = nested.pop()
+            if nested:
+                nested[-1] += elapsed
+            record_timing(phase, elapsed - nested_elapsed)
+
+
+def get_timings():
+    """
+    Get the phase timings of the current request (if any).
+
+    """
+    return g.get(TIMINGS)
+
+
+def format_server_timing(timings):
+    """
+    Format phase timings as a `Server-Timing` header value (with durations in milliseconds).
+
+    """
+    return ", ".join(
+        "{};dur={:.3f}".format(phase, elapsed * 1000)
+        for phase, elapsed in timings.items()
+    )
+
+
+def add_server_timing(response):
+    """
+    Add a `Server-Timing` header to a response (e.g. via `after_request`).
+
+    """
+    timings = get_timings()
+    if timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
@@ -0,0 +1,170 @@
+"""
+Precompiled URL building for HAL links.
+
+Building an external URL with `flask.url_for` selects a rule from the URL map, applies
+URL defaults, and quotes every static part of the rule on every call. HAL responses build
+many links to the same few endpoints (e.g. a `self` link for every item in a page), so this
+cost dominates link generation.
+
+A URL template compiles an endpoint's rule once into its (pre-quoted) static parts and its
+converters; building a URL is then a join of strings and converted values. The scheme, host,
+and script root are read from the current URL adapter on every call, so that per-request
+changes (such as the `X-Forwarded-Port` handling in `forwarding.py`) are honored.
+
+Only the common case is compiled: an endpoint with a single rule without defaults or
+subdomains that is built with exactly its (non-null) arguments. Everything else falls back
+to `url_for`, as does any rule whose compiled output disagrees with `url_for`.
+
+Compilation relies on werkzeug internals (such as `Rule._trace`); if these are missing (as
+they may be in other werkzeug versions), URLs are likewise built by `url_for`.
+
+"""
+from flask import _request_ctx_stack, url_for
+from werkzeug.routing import ValidationError
+
+try:
+    from werkzeug.urls import url_quote
+except ImportError:
+    url_quote = None
+
+
+# key used to store compiled templates in `Flask.extensions`
+URL_TEMPLATES = "microcosm_flask.url_templates"
+
+
+class URLTemplate(object):
+    """
+    A rule compiled into alternating static parts and converted arguments.
+
+    """
+    def __init__(self, rule, segments, suffix):
+        self.rule = rule
+        self.arguments = frozenset(rule.arguments)
+        self.segments = segments
+        self.suffix = suffix
+        self.verified = False
+
+    def build_path(self, values):
+        """
+        Build the (relative) path for the given values.
+
+        :returns: the path or None if a value cannot be converted
+
+        """
+        parts = []
+        try:
+            for static, name, to_url in self.segments:
+                parts.append(static)
+                parts.append(to_url(values[name]))
+        except ValidationError:
+            return None
+        parts.append(self.suffix)
+        return "".join(parts).lstrip("/")
+
+
+def compile_url_template(rule):
+    """
+    Compile a URL template from a (bound) rule.
+
+    :returns: a `URLTemplate` or None if the rule is not supported
+
+    """
+    trace = getattr(rule, "_trace", None)
+    converters = getattr(rule, "_converters", None)
+    charset = getattr(rule.map, "charset", None)
+    if not trace or converters is None or charset is None or url_quote is None:
+        return None
+    if rule.defaults or rule.subdomain or rule.map.host_matching:
+        return None
+
+    segments = []
+    static = []
+    for is_dynamic, data in trace:
+        if is_dynamic:
+            segments.append(("".join(static), data, converters[data].to_url))
+            static = []
+        else:
+            static.append(url_quote(data, charset=charset, safe="/:|+"))
+
+    suffix = "".join(static)
+
+    # the domain part precedes the first "|"; without a subdomain it is always empty
+    if segments:
+        domain, path = segments[0][0].split("|", 1)
+        segments[0] = (path,) + segments[0][1:]
+    else:
+        domain, suffix = suffix.split("|", 1)
+
+    if domain:
+        return None
+
+    return URLTemplate(rule, segments, suffix)
+
+
+def get_url_template(app, url_map, endpoint):
+    """
+    Get the (cached) template for an endpoint.
+
+    Templates are recompiled if the endpoint's rule changes.
+
+    """
+    rules_by_endpoint = getattr(url_map, "_rules_by_endpoint", None)
+    if rules_by_endpoint is None:
+        return None
+
+    rules = rules_by_endpoint.get(endpoint)
+    if not rules or len(rules) != 1:
+        return None
+
+    templates = app.extensions.setdefault(URL_TEMPLATES, {})
+    rule, template = templates.get(endpoint, (None, None))
+    if rule is not rules[0]:
+        rule, template = rules[0], compile_url_template(rules[0])
+        templates[endpoint] = (rule, template)
+    return template
+
+
+def build_external_url(endpoint, values):
+    """
+    Build an external URL for an endpoint using a precompiled template, if possible.
+
+    Produces the same result as `url_for(endpoint, _external=True, **values)`.
+
+    :returns: the URL or None if the endpoint or values are not supported
+
+    """
+    context = _request_ctx_stack.top
+    if context is None or context.url_adapter is None:
+        return None
+
+    app, adapter = context.app, context.url_adapter
+    get_host = getattr(adapter, "get_host", None)
+    if get_host is None or not adapter.url_scheme or any(app.url_default_functions.values()):
+        return None
+
+    template = get_url_template(app, adapter.map, endpoint)
+    if template is None or template.arguments != frozenset(values):
+        return None
+
+    if any(value is None for value in values.values()):
+        return None
+
+    path = template.build_path(values)
+    if path is None:
+        return None
+
+    url = "{}://{}{}/{}".format(
+        adapter.url_scheme,
+        get_host(""),
+        adapter.script_name[:-1],
+        path,
+    )
+
+    if not template.verified:
+        # compare the first result against werkzeug; disable the template on any difference
+        if url != url_for(endpoint, _external=True, **values):
+            app.extensions[URL_TEMPLATES][endpoint] = (template.rule, None)
+            return None
+        template.verified = True
+
+    return url
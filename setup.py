@@ -29,6 +29,11 @@ setup(
         "PyYAML>=3.11",
         "rfc3986>=0.4.1",
     ],
+    extras_require={
+        "zstd": [
+            "zstandard>=0.13.0",
+        ],
+    },
     setup_requires=[
         "nose>=1.3.6",
     ],
@@ -42,12 +47,18 @@ setup(
         "microcosm.factories": [
             "app = microcosm_flask.factories:configure_flask_app",
             "audit = microcosm_flask.audit:configure_audit_decorator",
+            "audit_sink = microcosm_flask.audit_sink:configure_audit_sink",
             "basic_auth = microcosm_flask.basic_auth:configure_basic_auth_decorator",
             "discovery_convention = microcosm_flask.conventions.discovery:configure_discovery",
+            "endpoint_registry = microcosm_flask.conventions.registry:configure_endpoint_registry",
             "error_handlers = microcosm_flask.errors:configure_error_handlers",
             "flask = microcosm_flask.factories:configure_flask",
             "health_convention = microcosm_flask.conventions.health:configure_health",
+            "metrics = microcosm_flask.metrics:configure_metrics",
+            "metrics_convention = microcosm_flask.conventions.metrics:configure_metrics_convention",
             "port_forwarding = microcosm_flask.forwarding:configure_port_forwarding",
+            "profiler = microcosm_flask.profiling:configure_profiler",
+            "profiling_convention = microcosm_flask.conventions.profiling:configure_profiling_convention",
             "request_context = microcosm_flask.context:configure_request_context",
             "route = microcosm_flask.routing:configure_route_decorator",
             "swagger_convention = microcosm_flask.conventions.swagger:configure_swagger",